@@ -8,6 +8,7 @@ from .utils import init, print_debug
 from .patcher import patch_all
 from .constants import __version__, EPSAGON_HANDLER
 from .trace import trace_factory
+from .trace_encoder import register_serializer
 from .wrappers.custom import measure
 
 if os.getenv(EPSAGON_HANDLER):
@@ -100,6 +101,7 @@ __all__ = [
     'chalice_wrapper',
     'auto_load',
     'measure',
+    'register_serializer',
 ]
 
 
@@ -0,0 +1,288 @@
+"""
+asyncio trace transport, for applications running in an asyncio event loop.
+Python 3 only.
+"""
+
+import os
+import ssl
+import asyncio
+from urllib.parse import urlsplit
+from epsagon.constants import (
+    SEND_TIMEOUT,
+    ASYNC_TRANSPORT_QUEUE_SIZE,
+    ASYNC_TRANSPORT_BATCH_SIZE,
+    ASYNC_TRANSPORT_FLUSH_INTERVAL,
+    TRANSPORT_COMPRESSION,
+)
+from epsagon.trace_transports import (
+    to_json,
+    _gzip,
+    _request_headers,
+)
+
+HEADERS_END = (b'\r\n', b'\n', b'')
+# Responses without a body, whatever their headers say
+NO_BODY_STATUSES = (204, 304)
+
+
+class AsyncioBatchHTTPTransport(object):
+    """
+    send traces using http requests made by a background asyncio task.
+    Traces are serialized by the caller and put on a bounded queue, which a
+    single long-lived task of the event loop drains in batches, posting them
+    over a kept-alive connection. The caller never waits for the collector,
+    and traces are dropped (and counted) when the queue is full.
+    `send` must be called from the event loop thread. Matches the `send`
+    interface of `HTTPTransport`, without its urllib3 pool.
+    """
+
+    def __init__(
+        self,
+        dest,
+        token,
+        max_queue_size=ASYNC_TRANSPORT_QUEUE_SIZE,
+        max_batch_size=ASYNC_TRANSPORT_BATCH_SIZE,
+        flush_interval=ASYNC_TRANSPORT_FLUSH_INTERVAL,
+        compress=TRANSPORT_COMPRESSION,
+    ):
+        self.dest = dest
+        self.token = token
+        self.timeout = SEND_TIMEOUT
+        self.headers = _request_headers(token)
+        self.max_queue_size = max_queue_size
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.compress = compress
+        self.dropped_traces = 0
+        self.failed_traces = 0
+        self._loop = None
+        self._queue = None
+        self._task = None
+        self._reader = None
+        self._writer = None
+
+        url = urlsplit(dest)
+        self._use_ssl = url.scheme == 'https'
+        self._host = url.hostname
+        self._port = url.port or (443 if self._use_ssl else 80)
+        self._path = url.path or '/'
+        self._host_header = (
+            '[{}]'.format(self._host) if ':' in self._host else self._host
+        )
+        if url.port and url.port != (443 if self._use_ssl else 80):
+            self._host_header = '{}:{}'.format(self._host_header, url.port)
+        if url.query:
+            self._path = '{}?{}'.format(self._path, url.query)
+        self._ssl_context = None
+        if self._use_ssl:
+            self._ssl_context = ssl.create_default_context(
+                cafile=os.path.join(os.path.dirname(__file__), 'cacert.pem')
+            )
+
+    def _ensure_worker(self):
+        """
+        Starts the sender task if it isn't running in the current event loop.
+        """
+        loop = asyncio.get_event_loop()
+        if self._loop is loop and self._task and not self._task.done():
+            return
+        self._close_connection()
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._task = loop.create_task(self._run())
+
+    def send(self, trace, encoded_trace=None):
+        self._ensure_worker()
+        if encoded_trace is None:
+            encoded_trace = to_json(trace.to_dict())
+        try:
+            self._queue.put_nowait(encoded_trace)
+        except asyncio.QueueFull:
+            self.dropped_traces += 1
+
+    async def _run(self):
+        """
+        Sender task main loop.
+        """
+        trace_queue = self._queue
+        while True:
+            batch = [await trace_queue.get()]
+            try:
+                while len(batch) < self.max_batch_size:
+                    batch.append(await asyncio.wait_for(
+                        trace_queue.get(),
+                        self.flush_interval
+                    ))
+            except asyncio.TimeoutError:
+                pass
+
+            try:
+                await self._send_batch(batch)
+            finally:
+                for _ in batch:
+                    trace_queue.task_done()
+
+    async def _send_batch(self, batch):
+        """
+        Posts a batch of serialized traces, one request per trace, back to
+        back on the kept-alive connection.
+        :param batch: list of serialized traces
+        """
+        for trace_json in batch:
+            body = trace_json.encode('utf-8')
+            if self.compress:
+                body = _gzip(body)
+            try:
+                status = await asyncio.wait_for(self._post(body), self.timeout)
+                if status >= 400:
+                    self.failed_traces += 1
+            except Exception:  # pylint: disable=broad-except
+                self._close_connection()
+                self.failed_traces += 1
+
+    def _request_head(self, body):
+        """
+        Returns the HTTP request line and headers of a trace POST.
+        :param body: the request body
+        :return: bytes
+        """
+        lines = [
+            'POST {} HTTP/1.1'.format(self._path),
+            'Host: {}'.format(self._host_header),
+            'Content-Length: {}'.format(len(body)),
+        ]
+        lines.extend(
+            '{}: {}'.format(name, value)
+            for name, value in self.headers.items()
+        )
+        if self.compress:
+            lines.append('Content-Encoding: gzip')
+        return '{}\r\n\r\n'.format('\r\n'.join(lines)).encode('latin-1')
+
+    async def _post(self, body):
+        """
+        Posts a request body, reconnecting once if the kept-alive connection
+        was closed by the collector.
+        :param body: the request body
+        :return: the response status code
+        """
+        request = self._request_head(body) + body
+        reused_connection = self._writer is not None
+        while True:
+            if self._writer is None:
+                self._reader, self._writer = await asyncio.open_connection(
+                    self._host,
+                    self._port,
+                    ssl=self._ssl_context
+                )
+            try:
+                self._writer.write(request)
+                await self._writer.drain()
+                status, keep_alive = await self._read_response()
+            except (OSError, asyncio.IncompleteReadError):
+                self._close_connection()
+                if not reused_connection:
+                    raise
+                reused_connection = False
+                continue
+
+            if not keep_alive:
+                self._close_connection()
+            return status
+
+    async def _read_head(self):
+        """
+        Reads the status line and headers of an HTTP response.
+        :return: (HTTP version, status code, headers dict)
+        """
+        reader = self._reader
+        status_line = await reader.readline()
+        if not status_line:
+            raise asyncio.IncompleteReadError(status_line, None)
+        version, status = status_line.split()[:2]
+
+        headers = {}
+        line = await reader.readline()
+        while line not in HEADERS_END:
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip().lower()
+            line = await reader.readline()
+        return version, int(status), headers
+
+    async def _read_response(self):
+        """
+        Reads (and discards) an HTTP response from the connection.
+        Interim (1xx) responses are skipped.
+        :return: (status code, whether the connection can be reused)
+        """
+        reader = self._reader
+        version, status, headers = await self._read_head()
+        while 100 <= status < 200:
+            version, status, headers = await self._read_head()
+
+        if version == b'HTTP/1.0':
+            keep_alive = headers.get('connection') == 'keep-alive'
+        else:
+            keep_alive = headers.get('connection') != 'close'
+        if status in NO_BODY_STATUSES:
+            return status, keep_alive
+
+        if headers.get('transfer-encoding') == 'chunked':
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                if not size:
+                    line = await reader.readline()
+                    while line not in HEADERS_END:
+                        line = await reader.readline()
+                    break
+                await reader.readexactly(size + 2)
+        elif 'content-length' in headers:
+            await reader.readexactly(int(headers['content-length']))
+        else:
+            # The body ends when the connection is closed
+            await reader.read()
+            keep_alive = False
+        return status, keep_alive
+
+    def _close_connection(self):
+        """
+        Closes the kept-alive connection, if open.
+        """
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = None
+        self._writer = None
+
+    async def flush(self, timeout=None):
+        """
+        Waits until all the queued traces are sent.
+        :param timeout: max seconds to wait, defaults to the send timeout
+            per queued trace.
+        :return: True if the queue was drained, False on timeout
+        """
+        if self._queue is None or self._loop is not asyncio.get_event_loop():
+            return True
+
+        if timeout is None:
+            timeout = self.timeout * max(self._queue.qsize(), 1)
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def close(self):
+        """
+        Stops the sender task and closes the connection. Traces still in the
+        queue are not sent, call `flush` first to send them.
+        :return: None
+        """
+        task = self._task
+        self._task = None
+        if task is not None and self._loop is asyncio.get_event_loop():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._close_connection()
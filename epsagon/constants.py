@@ -32,8 +32,59 @@ TIMEOUT_GRACE_TIME_MS = int(os.getenv(
 TIMEOUT_ENV = float(os.getenv('EPSAGON_SEND_TIMEOUT_SEC', '0'))
 SEND_TIMEOUT = TIMEOUT_ENV if TIMEOUT_ENV else TIMEOUT_GRACE_TIME_MS / 1000.0
 
+# Max traces waiting to be sent, newer traces are dropped when full.
+ASYNC_TRANSPORT_QUEUE_SIZE = int(
+    os.getenv('EPSAGON_ASYNC_TRANSPORT_QUEUE_SIZE', '1000')
+)
+# Max traces sent by the background thread per wake-up.
+ASYNC_TRANSPORT_BATCH_SIZE = int(
+    os.getenv('EPSAGON_ASYNC_TRANSPORT_BATCH_SIZE', '50')
+)
+# How long the background thread waits for a batch to fill, in seconds.
+ASYNC_TRANSPORT_FLUSH_INTERVAL = float(
+    os.getenv('EPSAGON_ASYNC_TRANSPORT_FLUSH_INTERVAL_SEC', '0.05')
+)
+# Gzip compress traces sent by the background thread.
+TRANSPORT_COMPRESSION = (
+    (os.getenv('EPSAGON_TRANSPORT_COMPRESSION') or '').upper() == 'TRUE'
+)
+# JSON library used to encode traces: json, orjson or ujson.
+JSON_BACKEND = (os.getenv('EPSAGON_JSON_BACKEND') or 'json').lower()
+
 MAX_LABEL_SIZE = 10 * 1024
 
+# Max documents of a pymongo command or result kept in the event
+PYMONGO_MAX_RESULTS = int(os.getenv('EPSAGON_PYMONGO_MAX_RESULTS', '10'))
+
+# Documents larger than this (in BSON bytes) are not kept in pymongo events
+PYMONGO_MAX_DOCUMENT_SIZE = int(
+    os.getenv('EPSAGON_PYMONGO_MAX_DOCUMENT_SIZE', '2048')
+)
+
+# Max pymongo events of the same collection and command in a trace
+PYMONGO_MAX_EVENTS_PER_COLLECTION = int(
+    os.getenv('EPSAGON_PYMONGO_MAX_EVENTS_PER_COLLECTION', '100')
+) or None
+
+# Coalesce consecutive DB-API executions of the same statement into one event
+DBAPI_COALESCE_EXECUTE = (
+    (os.getenv('EPSAGON_DBAPI_COALESCE_EXECUTE') or '').upper() == 'TRUE'
+)
+
+# Time the fetching of DB-API query results, and count the fetched rows
+DBAPI_FETCH_TIMING = (
+    (os.getenv('EPSAGON_DBAPI_FETCH_TIMING') or '').upper() == 'TRUE'
+)
+
+# Max size of a captured HTTP body, or header value, the rest is truncated
+HTTP_MAX_FIELD_SIZE = int(os.getenv('EPSAGON_HTTP_MAX_FIELD_SIZE', '3072'))
+
+# Max bytes of a FastAPI request body kept in the trace
+FASTAPI_MAX_REQUEST_BODY_SIZE = int(os.getenv(
+    'EPSAGON_FASTAPI_MAX_REQUEST_BODY_SIZE',
+    str(HTTP_MAX_FIELD_SIZE)
+))
+
 DEFAULT_SAMPLE_RATE = 1
 
 # User-defined HTTP minimum status code to be treated as an error.
@@ -0,0 +1,163 @@
+"""
+DB-API helpers: sizes of query parameters, fetched rows and copied data
+"""
+
+from __future__ import absolute_import
+import io
+
+
+def _value_size(value):
+    """
+    Returns the size of a query parameter value.
+    :param value: the parameter value
+    :return: size in bytes (or characters)
+    """
+    if value is None:
+        return 0
+    if isinstance(value, (str, bytes, bytearray)):
+        return len(value)
+    return len(str(value))
+
+
+def _parameters_size(parameters):
+    """
+    Returns the size of a parameter set, given as a sequence or a mapping.
+    :param parameters: the parameter set
+    :return: size in bytes (or characters)
+    """
+    if isinstance(parameters, dict):
+        parameters = parameters.values()
+    elif not isinstance(parameters, (list, tuple)):
+        return _value_size(parameters)
+    return sum(_value_size(value) for value in parameters)
+
+
+def _row_size(row):
+    """
+    Returns the approximate size of a fetched row.
+    :param row: the row, as a sequence or a mapping of values
+    :return: size in bytes (or characters)
+    """
+    if isinstance(row, dict):
+        row = row.values()
+    try:
+        return sum(_value_size(value) for value in row)
+    except TypeError:
+        return _value_size(row)
+
+
+def add_fetch_metadata(metadata, duration, rows):
+    """
+    Adds a fetch of query results to the metadata of an event.
+    :param metadata: the event metadata
+    :param duration: the fetch duration (seconds)
+    :param rows: list of the fetched rows
+    :return: None
+    """
+    metadata['Fetch Duration'] = metadata.get('Fetch Duration', 0) + duration
+    metadata['Rows Fetched'] = metadata.get('Rows Fetched', 0) + len(rows)
+    metadata['Fetched Bytes'] = metadata.get('Fetched Bytes', 0) + sum(
+        _row_size(row) for row in rows
+    )
+
+
+class ParameterSetsSummary(object):
+    """
+    Counts the parameter sets of an `executemany` batch and their size,
+    without keeping them.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.size = 0
+
+    def track(self, seq_of_parameters):
+        """
+        Summarizes the parameter sets of a batch. Sequences are summarized
+        right away, other iterables are summarized while being consumed by
+        the driver.
+        :param seq_of_parameters: the parameter sets
+        :return: the parameter sets to pass to the driver
+        """
+        if isinstance(seq_of_parameters, (list, tuple)):
+            self.count = len(seq_of_parameters)
+            self.size = sum(
+                _parameters_size(parameters)
+                for parameters in seq_of_parameters
+            )
+            return seq_of_parameters
+        return self._track_iterable(seq_of_parameters)
+
+    def _track_iterable(self, seq_of_parameters):
+        """
+        Yields the parameter sets, summarizing each one.
+        :param seq_of_parameters: iterable of the parameter sets
+        """
+        for parameters in seq_of_parameters:
+            self.count += 1
+            self.size += _parameters_size(parameters)
+            yield parameters
+
+
+class CopyFile(object):
+    """
+    A file a `COPY` reads from or writes to, counting the copied bytes.
+    """
+
+    def __init__(self, copy_file):
+        """
+        :param copy_file: the copied file
+        """
+        self.file = copy_file
+        self.size = 0
+
+    def _count(self, data):
+        """
+        Counts copied data.
+        :param data: str or bytes
+        """
+        if isinstance(data, bytes):
+            self.size += len(data)
+        else:
+            self.size += len(data.encode('utf-8'))
+
+    def read(self, *args):
+        """
+        Reads from the file.
+        """
+        data = self.file.read(*args)
+        self._count(data)
+        return data
+
+    def readline(self, *args):
+        """
+        Reads a line from the file.
+        """
+        data = self.file.readline(*args)
+        self._count(data)
+        return data
+
+    def write(self, data):
+        """
+        Writes to the file.
+        """
+        self._count(data)
+        return self.file.write(data)
+
+
+class TextCopyFile(CopyFile, io.TextIOBase):
+    """
+    A text file a `COPY` reads from or writes to, counting the copied bytes.
+    Drivers write `str` to text files, and `bytes` to other files.
+    """
+
+
+def track_copy_file(copy_file):
+    """
+    Returns a file counting the bytes copied from or to a file.
+    :param copy_file: the copied file
+    :return: CopyFile or TextCopyFile
+    """
+    if isinstance(copy_file, io.TextIOBase):
+        return TextCopyFile(copy_file)
+    return CopyFile(copy_file)
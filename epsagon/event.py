@@ -6,20 +6,41 @@ from __future__ import absolute_import
 import sys
 import time
 import inspect
-import uuid
 from .common import ErrorCode
 from .constants import (
     SHOULD_REMOVE_EXCEPTION_FRAMES,
 )
+from .id_generator import generate_uuid
 
 
 class BaseEvent(object):
     """
-    Represents base trace's event
+    Represents base trace's event.
+    Events are kept in `__slots__` since a trace can hold thousands of them:
+    the `resource` and `exception` dicts are created on first access, and
+    the event ID is generated from `ID_PREFIX` only when it is first read
+    (usually when the trace is serialized).
     """
 
+    __slots__ = (
+        'start_time',
+        'origin',
+        'duration',
+        'error_code',
+        'terminated',
+        '_event_id',
+        '_resource',
+        '_exception',
+    )
+
     ORIGIN = 'base'
     RESOURCE_TYPE = 'base'
+    # The event ID is '{ID_PREFIX}{uuid}' unless set explicitly,
+    # None means an empty ID.
+    ID_PREFIX = None
+    # Max events of the same type, name and operation in a trace, the rest
+    # are aggregated. None means no limit.
+    MAX_EVENTS_PER_RESOURCE = None
 
     def __init__(self, start_time):
         """
@@ -28,22 +49,65 @@ class BaseEvent(object):
         """
 
         self.start_time = start_time
-        self.event_id = ''
+        self._event_id = None
         self.origin = self.ORIGIN
         self.duration = 0.0
         self.error_code = ErrorCode.OK
-        self.exception = {}
+        self._exception = None
         self.terminated = False
-
-        self.resource = {
-            'type': self.RESOURCE_TYPE,
-            'name': '',
-            'operation': '',
-            'metadata': {},
-        }
+        self._resource = None
 
         if self.origin == 'runner':
-            self.resource['metadata']['trace_id'] = str(uuid.uuid4())
+            self.resource['metadata']['trace_id'] = generate_uuid()
+
+    @property
+    def event_id(self):
+        """
+        The event ID, generated on first access if it wasn't set.
+        :return: str
+        """
+        if self._event_id is None:
+            if self.ID_PREFIX is None:
+                return ''
+            self._event_id = '{}{}'.format(self.ID_PREFIX, generate_uuid())
+        return self._event_id
+
+    @event_id.setter
+    def event_id(self, value):
+        self._event_id = value
+
+    @property
+    def resource(self):
+        """
+        The event's resource dict, created on first access.
+        :return: dict
+        """
+        if self._resource is None:
+            self._resource = {
+                'type': self.RESOURCE_TYPE,
+                'name': '',
+                'operation': '',
+                'metadata': {},
+            }
+        return self._resource
+
+    @resource.setter
+    def resource(self, value):
+        self._resource = value
+
+    @property
+    def exception(self):
+        """
+        The event's exception dict, created on first access.
+        :return: dict
+        """
+        if self._exception is None:
+            self._exception = {}
+        return self._exception
+
+    @exception.setter
+    def exception(self, value):
+        self._exception = value
 
     @staticmethod
     def load_from_dict(event_data):
@@ -175,3 +239,71 @@ class BaseEvent(object):
             self.exception['additional_data']['warning'] = True
         if from_logs:
             self.exception['additional_data']['from_logs'] = True
+
+
+class AggregatedEvent(BaseEvent):
+    """
+    Represents events that exceeded the trace events cap, summarized into
+    one event per (type, name, operation)
+    """
+
+    __slots__ = ()
+
+    ID_PREFIX = 'aggregated-'
+
+    def __init__(self, event):
+        """
+        Initialize.
+        :param event: the first event to aggregate
+        """
+        super(AggregatedEvent, self).__init__(event.start_time)
+        self.origin = event.origin
+        self.terminated = True
+        self.resource['type'] = event.resource.get('type', '')
+        self.resource['name'] = event.resource.get('name', '')
+        self.resource['operation'] = event.resource.get('operation', '')
+        self.resource['metadata'] = {
+            'aggregated': True,
+            'count': 0,
+            'error_count': 0,
+            'total_duration': 0.0,
+            'min_duration': event.duration,
+            'max_duration': event.duration,
+        }
+        self.add(event)
+
+    @staticmethod
+    def key(event):
+        """
+        Returns the aggregation key of a given event.
+        :param event: the event
+        :return: (type, name, operation) tuple
+        """
+        return (
+            event.resource.get('type', ''),
+            event.resource.get('name', ''),
+            event.resource.get('operation', ''),
+        )
+
+    def add(self, event):
+        """
+        Adds an event to the aggregation, the event itself is not kept.
+        :param event: a terminated event
+        :return: None
+        """
+        metadata = self.resource['metadata']
+        metadata['count'] += 1
+        if getattr(event, 'error_code', ErrorCode.OK) != ErrorCode.OK:
+            metadata['error_count'] += 1
+            self.set_error()
+        metadata['total_duration'] += event.duration
+        metadata['min_duration'] = min(metadata['min_duration'], event.duration)
+        metadata['max_duration'] = max(metadata['max_duration'], event.duration)
+
+        if event.start_time < self.start_time:
+            self.duration += self.start_time - event.start_time
+            self.start_time = event.start_time
+        self.duration = max(
+            self.duration,
+            event.start_time + event.duration - self.start_time
+        )
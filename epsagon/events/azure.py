@@ -6,7 +6,6 @@ Azure sdk events module.
 from __future__ import absolute_import
 
 import traceback
-from uuid import uuid4
 from importlib import import_module
 from ..trace import trace_factory
 from ..event import BaseEvent
@@ -35,8 +34,11 @@ class AzureEvent(BaseEvent):
     Represents base Azure SDK event.
     """
 
+    __slots__ = ()
+
     ORIGIN = 'azure-sdk'
     RESOURCE_TYPE = 'azure-sdk'
+    ID_PREFIX = 'azure-'
     RESPONSE_TO_FUNC = {}
     OPERATION_TO_FUNC = {}
 
@@ -62,7 +64,6 @@ class AzureEvent(BaseEvent):
         :param exception: Exception (if happened)
         """
         super(AzureEvent, self).__init__(start_time)
-        self.event_id = 'azure-{}'.format(str(uuid4()))
         self.resource['operation'] = wrapped.__name__
         self.resource['metadata'] = {}
 
@@ -112,6 +113,8 @@ class AzureCosmosContainerEvent(AzureEvent):
     Represents CosmosDB Container Azure event.
     """
 
+    __slots__ = ('kwargs', 'args', 'response')
+
     RESOURCE_TYPE = 'cosmos_db'
 
     def __init__(
@@ -45,6 +45,8 @@ class BotocoreEvent(BaseEvent):
     Represents base botocore event.
     """
 
+    __slots__ = ()
+
     ORIGIN = 'botocore'
     RESOURCE_TYPE = 'botocore'
     RESPONSE_TO_FUNC = {}
@@ -132,6 +134,8 @@ class BotocoreCloudWatchEvent(BotocoreEvent):
     Represents cloudwatch events (eventbridge) botocore event.
     """
 
+    __slots__ = ()
+
     RESOURCE_TYPE = 'eventbridge'
     RESOURCE_TYPE_UPDATE = 'events'
 
@@ -197,6 +201,8 @@ class BotocoreS3Event(BotocoreEvent):
     Represents s3 botocore event.
     """
 
+    __slots__ = ()
+
     RESOURCE_TYPE = 's3'
 
     def __init__(self, wrapped, instance, args, kwargs, start_time, response,
@@ -262,6 +268,9 @@ class BotocoreKinesisEvent(BotocoreEvent):
     """
     Represents kinesis botocore event.
     """
+
+    __slots__ = ()
+
     RESOURCE_TYPE = 'kinesis'
 
     def __init__(self, wrapped, instance, args, kwargs, start_time, response,
@@ -326,6 +335,9 @@ class BotocoreSNSEvent(BotocoreEvent):
     """
     Represents SNS botocore event.
     """
+
+    __slots__ = ()
+
     RESOURCE_TYPE = 'sns'
 
     def __init__(self, wrapped, instance, args, kwargs, start_time, response,
@@ -406,6 +418,9 @@ class BotocoreSQSEvent(BotocoreEvent):
     """
     Represents SQS botocore event.
     """
+
+    __slots__ = ('request_data', 'response')
+
     RESOURCE_TYPE = 'sqs'
 
     def __init__(self, wrapped, instance, args, kwargs, start_time, response,
@@ -508,6 +523,9 @@ class BotocoreDynamoDBEvent(BotocoreEvent):
     """
     Represents DynamoDB botocore event.
     """
+
+    __slots__ = ('request_data', 'response', 'deserializer')
+
     RESOURCE_TYPE = 'dynamodb'
     CONDITION_FIELDS = ['FilterExpression', 'KeyConditionExpression']
 
@@ -824,6 +842,9 @@ class BotocoreSESEvent(BotocoreEvent):
     """
     Represents SES botocore event.
     """
+
+    __slots__ = ()
+
     RESOURCE_TYPE = 'ses'
 
     def __init__(self, wrapped, instance, args, kwargs, start_time, response,
@@ -881,6 +902,9 @@ class BotocoreSESv2Event(BotocoreEvent):
     """
     Represents SESV2 botocore event.
     """
+
+    __slots__ = ()
+
     RESOURCE_TYPE = 'sesv2'
     RESOURCE_TYPE_UPDATE = 'ses'
 
@@ -983,6 +1007,9 @@ class BotocoreAthenaEvent(BotocoreEvent):
     """
     Represents Athena botocore event
     """
+
+    __slots__ = ()
+
     RESOURCE_TYPE = 'athena'
 
     def __init__(self, wrapped, instance, args, kwargs, start_time, response,
@@ -1092,6 +1119,9 @@ class BotocoreFirehoseEvent(BotocoreEvent):
     """
     Represents Firehose botocore event
     """
+
+    __slots__ = ()
+
     RESOURCE_TYPE = 'firehose'
 
     def __init__(self, wrapped, instance, args, kwargs, start_time, response,
@@ -1179,6 +1209,9 @@ class BotocoreCognitoEvent(BotocoreEvent):
     """
     Represents Cognito botocore event
     """
+
+    __slots__ = ()
+
     RESOURCE_TYPE = 'cognitoidentityprovider'
     RESOURCE_TYPE_UPDATE = 'cognito-idp'
 
@@ -1291,6 +1324,9 @@ class BotocoreKMSEvent(BotocoreEvent):
     """
     Represents KMS botocore event
     """
+
+    __slots__ = ()
+
     RESOURCE_TYPE = 'kms'
 
     def __init__(self, wrapped, instance, args, kwargs, start_time, response,
@@ -1381,6 +1417,9 @@ class BotocoreSSMEvent(BotocoreEvent):
     """
     Represents SSM botocore event
     """
+
+    __slots__ = ()
+
     RESOURCE_TYPE = 'ssm'
 
     def __init__(self, wrapped, instance, args, kwargs, start_time, response,
@@ -1459,6 +1498,9 @@ class BotocoreStepFunctionEvent(BotocoreEvent):
     """
     Represents Step Function botocore event
     """
+
+    __slots__ = ()
+
     RESOURCE_TYPE = 'sfn'
     REAL_RESOURCE_TYPE = 'stepfunctions'
     DEFAULT_EXECTUTION_NAME = 'Unnamed Execution'
@@ -1605,6 +1647,8 @@ class BotocoreLambdaEvent(BotocoreEvent):
     Represents lambda botocore event.
     """
 
+    __slots__ = ()
+
     RESOURCE_TYPE = 'lambda'
     AWS_ACCOUNT_IND = 4
 
@@ -1659,6 +1703,8 @@ class BotocoreEmr(BotocoreEvent):
     Represents EMR botocore event.
     """
 
+    __slots__ = ('request_data', 'response')
+
     RESOURCE_TYPE = 'emr'
 
     def __init__(self, wrapped, instance, args, kwargs, start_time, response,
@@ -1792,6 +1838,8 @@ class BotocoreSecretsManagerEvent(BotocoreEvent):
     Represents secrets manager botocore event.
     """
 
+    __slots__ = ('request_data', 'response')
+
     RESOURCE_TYPE = 'secretsmanager'
     CREATE_SECRET_OPERATION = 'CreateSecret'
     DEFAULT_SECRET_NAME = 'N/A'
@@ -1943,6 +1991,8 @@ class BotocoreAuroraServerlessEvent(BotocoreEvent):
     Represents data API (aurora serverless) botocore event.
     """
 
+    __slots__ = ('request_data', 'response')
+
     RESOURCE_TYPE = 'rdsdataservice'
     RESOURCE_TYPE_UPDATE = 'database'
     EXECUTE_STATEMENT_OPERATION = 'ExecuteStatement'
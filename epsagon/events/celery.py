@@ -6,12 +6,10 @@ from __future__ import absolute_import
 import time
 import functools
 import traceback
-from uuid import uuid4
-from importlib import import_module
 from ..trace import trace_factory
 from ..event import BaseEvent
 from ..utils import add_data_if_needed
-from ..runners.celery import CeleryRunner
+from ..runners.celery import CeleryRunner, get_broker_metadata
 
 # A map of all active events and pending runners. The key is the `{sender}-{id}`
 ACTIVE_EVENTS = {}
@@ -22,8 +20,11 @@ class CeleryEvent(BaseEvent):
     Represents Celery event.
     """
 
+    __slots__ = ()
+
     ORIGIN = 'celery'
     RESOURCE_TYPE = 'celery'
+    ID_PREFIX = ''
     OPERATION = 'publish'
     DRIVER_MAPPING = {
         'amqp': 'rabbitmq',
@@ -36,7 +37,6 @@ class CeleryEvent(BaseEvent):
         """
         super(CeleryEvent, self).__init__(time.time())
 
-        self.event_id = str(uuid4())
         self.resource['name'] = kwargs.get('sender', '')
         self.resource['operation'] = self.OPERATION
 
@@ -46,7 +46,7 @@ class CeleryEvent(BaseEvent):
             # so we change it to list
             body = list(body)
 
-        app_conn = import_module('celery').current_app.connection()
+        broker_metadata = get_broker_metadata()
         headers = kwargs.get('headers', {})
 
         self.resource['metadata'] = {
@@ -54,15 +54,13 @@ class CeleryEvent(BaseEvent):
             'retries': headers.get('retries', ''),
             'id': headers.get('id', ''),
             'routing_key': kwargs.get('routing_key', ''),
-            'hostname': app_conn.hostname,
-            'virtual_host': app_conn.virtual_host,
-            'driver': app_conn.transport.driver_type,
         }
+        self.resource['metadata'].update(broker_metadata)
 
         # Check if this is a known driver to update the resource details
-        driver_map = self.DRIVER_MAPPING.get(app_conn.transport.driver_type)
+        driver_map = self.DRIVER_MAPPING.get(broker_metadata['driver'])
         if driver_map:
-            self.resource['name'] = app_conn.hostname
+            self.resource['name'] = broker_metadata['hostname']
             self.resource['type'] = '{}_{}'.format(
                 self.RESOURCE_TYPE,
                 driver_map
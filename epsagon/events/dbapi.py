@@ -3,29 +3,86 @@ sqlalchemy events module.
 """
 
 from __future__ import absolute_import
-from uuid import uuid4
+import weakref
 import traceback
 
-try:
-    from psycopg2.extensions import parse_dsn
+from ..trace import trace_factory
+from ..event import BaseEvent
+from ..common import ErrorCode
+from ..utils import database_connection_type, print_debug
+from ..constants import DBAPI_COALESCE_EXECUTE, DBAPI_FETCH_TIMING
+from ..sql_analyzer import analyze
+from ..dbapi_utils import add_fetch_metadata
 
-except ImportError:
-    def parse_dsn(dsn):
-        """
-        Parse the DSN.
-        :param dsn: input DSN.
-        :return:
-        """
+MAX_QUERY_SIZE = 2048
+
+
+def parse_dsn(dsn):
+    """
+    Parse the DSN. psycopg2 is imported on first use, as importing it while
+    this module is initialized would patch it before its events can be
+    imported.
+    :param dsn: input DSN.
+    :return:
+    """
+    try:
+        # pylint: disable=import-outside-toplevel
+        from psycopg2.extensions import parse_dsn as psycopg2_parse_dsn
+    except ImportError:
         return dict(
             attribute.split('=') for attribute in dsn.split()
             if '=' in attribute
         )
+    return psycopg2_parse_dsn(dsn)
 
-from ..trace import trace_factory
-from ..event import BaseEvent
-from ..utils import database_connection_type, print_debug
 
-MAX_QUERY_SIZE = 2048
+# Parsed DSN parameters, per connection.
+_DSN_CACHE = weakref.WeakKeyDictionary()
+
+
+def _get_dsn_parameters(connection):
+    """
+    Returns the parsed DSN of a connection, which is parsed once per
+    connection.
+    :param connection: a connection with a `dsn` property
+    :return: dict of the DSN parameters
+    """
+    try:
+        return _DSN_CACHE[connection]
+    except (KeyError, TypeError):
+        pass
+    dsn_parameters = parse_dsn(connection.dsn)
+    try:
+        _DSN_CACHE[connection] = dsn_parameters
+    except TypeError:
+        # The connection can't be weakly referenced
+        pass
+    return dsn_parameters
+
+
+# Driver name, per connection type.
+_DRIVERS_CACHE = {}
+
+
+def _get_driver(connection):
+    """
+    Returns the name of the package of a connection's driver, skipping
+    instrumented subclasses.
+    :param connection: the connection
+    :return: driver name
+    """
+    # The wrapped connection type, for proxies
+    connection_type = connection.__class__
+    driver = _DRIVERS_CACHE.get(connection_type)
+    if driver is None:
+        driver = connection_type.__module__.split('.')[0]
+        for cls in connection_type.__mro__:
+            module = cls.__module__.split('.')[0]
+            if module != 'epsagon':
+                driver = module
+                break
+        _DRIVERS_CACHE[connection_type] = driver
+    return driver
 
 
 class DBAPIEvent(BaseEvent):
@@ -33,21 +90,13 @@ class DBAPIEvent(BaseEvent):
     Represents base sqlalchemy event.
     """
 
+    __slots__ = ('statement',)
+
     ORIGIN = 'dbapi'
     RESOURCE_TYPE = 'database'
+    ID_PREFIX = 'dbapi-'
     RESOURCE_OPERATION = None
 
-    # mapping SQL commands to words preceding the table name in the query
-    # Note: Not supporting advanced syntax of select and delete (as 'delete
-    # from only ..')
-    _OPERATION_TO_TABLE_NAME_KEYWORD = {
-        'select': 'from',
-        'insert': 'into',
-        'update': 'update',
-        'delete': 'from',
-        'create': 'table'
-    }
-
     def __init__(
             self,
             connection,
@@ -68,29 +117,34 @@ class DBAPIEvent(BaseEvent):
         """
 
         super(DBAPIEvent, self).__init__(start_time)
-        self.event_id = 'dbapi-{}'.format(str(uuid4()))
 
         # in case of pg instrumentation we extract data from the dsn property
         if hasattr(connection, 'dsn'):
-            dsn = parse_dsn(connection.dsn)
+            dsn = _get_dsn_parameters(connection)
             db_name = dsn.get('dbname', '')
             host = dsn.get('host', 'local')
             query = cursor.query
+            # A named (server side) cursor
+            cursor_name = getattr(cursor, 'name', None)
         else:
+            cursor_name = None
             query = _args[0]
             host = connection.extract_hostname
             db_name = connection.extract_dbname
+        # The statement as passed by the application, before any parameters
+        # are bound. The first argument of a `COPY` to or from a file is the
+        # file, which isn't kept.
+        statement = _args[0] if _args else None
+        self.statement = (
+            statement if isinstance(statement, (str, bytes)) else query
+        )
+        sql_statement = analyze(self.statement)
 
         self.resource['name'] = db_name if db_name else host
 
-        # NOTE: The operation might not be identified properly when
-        # using 'WITH' clause
-        splitted_query = query.split()
-        if not splitted_query:
+        operation = sql_statement.operation
+        if not operation:
             print_debug('Cannot extract operation from query {}'.format(query))
-            operation = ''
-        else:
-            operation = splitted_query[0].lower()
         self.resource['operation'] = operation
         # override event type with the specific DB type
         self.resource['type'] = database_connection_type(
@@ -99,9 +153,18 @@ class DBAPIEvent(BaseEvent):
         )
         self.resource['metadata'] = {
             'Host': host,
-            'Driver': connection.__class__.__module__.split('.')[0],
-            'Table Name': self._extract_table_name(query, operation)
+            'Driver': _get_driver(connection),
+            'Table Name': (
+                sql_statement.tables[0] if sql_statement.tables else ''
+            ),
+            'Query Fingerprint': sql_statement.fingerprint[:MAX_QUERY_SIZE],
         }
+        if len(sql_statement.tables) > 1:
+            self.resource['metadata']['Table Names'] = list(
+                sql_statement.tables
+            )
+        if isinstance(cursor_name, str):
+            self.resource['metadata']['Cursor Name'] = cursor_name
 
         # for select we always want to save the query
         if (
@@ -118,23 +181,159 @@ class DBAPIEvent(BaseEvent):
         else:
             self.set_exception(exception, traceback.format_exc())
 
-    @staticmethod
-    def _extract_table_name(query, operation):
+    def add_fetch(self, duration, rows):
+        """
+        Adds a fetch of the query results to the event.
+        :param duration: the fetch duration (seconds)
+        :param rows: list of the fetched rows
+        :return: None
+        """
+        add_fetch_metadata(self.resource['metadata'], duration, rows)
+
+    def coalesce(self, event):
+        """
+        Folds a following execution of the same statement, over the same
+        database, into this event.
+        :param event: a terminated DBAPIEvent
+        :return: True if the event was folded, False otherwise
+        """
+        # pylint: disable=unidiomatic-typecheck
+        if type(event) is not DBAPIEvent or type(self) is not DBAPIEvent:
+            return False
+        if (
+                event.statement != self.statement or
+                event.resource['name'] != self.resource['name'] or
+                event.error_code != self.error_code or
+                self.error_code != ErrorCode.OK
+        ):
+            return False
+
+        metadata = self.resource['metadata']
+        metadata['Executions Count'] = metadata.get('Executions Count', 1) + 1
+        metadata['Related Rows Count'] += (
+            event.resource['metadata']['Related Rows Count']
+        )
+        self.duration += event.duration
+        return True
+
+
+class DBAPIBatchEvent(DBAPIEvent):
+    """
+    Represents an `executemany` of a dbapi cursor.
+    """
+
+    __slots__ = ()
+
+    def __init__(
+            self,
+            connection,
+            cursor,
+            _args,
+            _kwargs,
+            start_time,
+            exception,
+            parameters_summary,
+    ):
+        """
+        Initialize.
+        :param connection: The SQL engine the event is using
+        :param cursor: Cursor object used in the even
+        :param args: args passed to called function
+        :param kwargs: kwargs passed to called function
+        :param start_time: Start timestamp (epoch)
+        :param exception: Exception (if occurred)
+        :param parameters_summary: ParameterSetsSummary of the batch
+        """
+        super(DBAPIBatchEvent, self).__init__(
+            connection,
+            cursor,
+            _args,
+            _kwargs,
+            start_time,
+            exception,
+        )
+        self.resource['metadata']['Parameter Sets Count'] = (
+            parameters_summary.count
+        )
+        self.resource['metadata']['Parameters Size'] = parameters_summary.size
+
+
+class DBAPIProcedureEvent(DBAPIEvent):
+    """
+    Represents a `callproc` of a dbapi cursor.
+    """
+
+    __slots__ = ()
+
+    def __init__(
+            self,
+            connection,
+            cursor,
+            _args,
+            _kwargs,
+            start_time,
+            exception,
+    ):
         """
-        Extract the table name from the SQL query string
-        :param query: The SQL query string
-        :param operation: The SQL operation used in the query
-            (SELECT, INSERT, etc.)
-        :return: Table name (string), "" if couldn't find
+        Initialize.
+        :param connection: The SQL engine the event is using
+        :param cursor: Cursor object used in the even
+        :param args: args passed to called function
+        :param kwargs: kwargs passed to called function
+        :param start_time: Start timestamp (epoch)
+        :param exception: Exception (if occurred)
         """
+        super(DBAPIProcedureEvent, self).__init__(
+            connection,
+            cursor,
+            _args,
+            _kwargs,
+            start_time,
+            exception,
+        )
+        self.resource['operation'] = 'callproc'
+        self.resource['metadata'].pop('Table Name', None)
+        self.resource['metadata']['Procedure Name'] = (
+            _args[0] if _args else _kwargs.get('procname', '')
+        )
 
-        if operation in DBAPIEvent._OPERATION_TO_TABLE_NAME_KEYWORD:
-            keyword = DBAPIEvent._OPERATION_TO_TABLE_NAME_KEYWORD[operation]
-            query_words = query.lower().split()
-            if keyword in query_words:
-                return query.split()[query_words.index(keyword) + 1]
 
-        return ''
+class DBAPICopyEvent(DBAPIEvent):
+    """
+    Represents a `COPY` of a dbapi cursor, from or to a file.
+    """
+
+    __slots__ = ()
+
+    def __init__(
+            self,
+            connection,
+            cursor,
+            _args,
+            _kwargs,
+            start_time,
+            exception,
+            copy_file,
+    ):
+        """
+        Initialize.
+        :param connection: The SQL engine the event is using
+        :param cursor: Cursor object used in the even
+        :param args: args passed to called function
+        :param kwargs: kwargs passed to called function
+        :param start_time: Start timestamp (epoch)
+        :param exception: Exception (if occurred)
+        :param copy_file: CopyFile of the copied data
+        """
+        super(DBAPICopyEvent, self).__init__(
+            connection,
+            cursor,
+            _args,
+            _kwargs,
+            start_time,
+            exception,
+        )
+        self.resource['metadata']['Bytes Copied'] = copy_file.size
 
 
 class DBAPIEventFactory(object):
@@ -165,4 +364,124 @@ class DBAPIEventFactory(object):
             start_time,
             exception,
         )
+        if DBAPI_COALESCE_EXECUTE:
+            trace = trace_factory.get_trace()
+            previous_event = (
+                trace.events[-1] if trace and trace.events else None
+            )
+            if isinstance(previous_event, DBAPIEvent):
+                event.terminate()
+                if previous_event.coalesce(event):
+                    if DBAPI_FETCH_TIMING:
+                        cursor_wrapper.fetched_event = previous_event
+                    return
+        trace_factory.add_event(event)
+        if DBAPI_FETCH_TIMING:
+            cursor_wrapper.fetched_event = event
+
+
+class DBAPIBatchEventFactory(object):
+    """
+    Factory class, generates dbapi `executemany` events.
+    """
+
+    def __init__(self, parameters_summary):
+        """
+        :param parameters_summary: ParameterSetsSummary of the batch
+        """
+        self.parameters_summary = parameters_summary
+
+    # pylint: disable=W0613
+    def create_event(self, wrapped, cursor_wrapper, args, kwargs, start_time,
+                     response, exception):
+        """
+        Create an `executemany` event.
+        :param wrapped:
+        :param cursor_wrapper:
+        :param args:
+        :param kwargs:
+        :param start_time:
+        :param response:
+        :param exception:
+        :return:
+        """
+        event = DBAPIBatchEvent(
+            cursor_wrapper.connection_wrapper,
+            cursor_wrapper,
+            args,
+            kwargs,
+            start_time,
+            exception,
+            self.parameters_summary,
+        )
+        trace_factory.add_event(event)
+
+
+class DBAPIProcedureEventFactory(object):
+    """
+    Factory class, generates dbapi `callproc` events.
+    """
+
+    @staticmethod
+    # pylint: disable=W0613
+    def create_event(wrapped, cursor_wrapper, args, kwargs, start_time,
+                     response, exception):
+        """
+        Create a `callproc` event.
+        :param wrapped:
+        :param cursor_wrapper:
+        :param args:
+        :param kwargs:
+        :param start_time:
+        :param response:
+        :param exception:
+        :return:
+        """
+        event = DBAPIProcedureEvent(
+            cursor_wrapper.connection_wrapper,
+            cursor_wrapper,
+            args,
+            kwargs,
+            start_time,
+            exception,
+        )
+        trace_factory.add_event(event)
+        if DBAPI_FETCH_TIMING:
+            cursor_wrapper.fetched_event = event
+
+
+class DBAPICopyEventFactory(object):
+    """
+    Factory class, generates dbapi `COPY` events.
+    """
+
+    def __init__(self, copy_file):
+        """
+        :param copy_file: CopyFile of the copied data
+        """
+        self.copy_file = copy_file
+
+    # pylint: disable=W0613
+    def create_event(self, wrapped, cursor_wrapper, args, kwargs, start_time,
+                     response, exception):
+        """
+        Create a `COPY` event.
+        :param wrapped:
+        :param cursor_wrapper:
+        :param args:
+        :param kwargs:
+        :param start_time:
+        :param response:
+        :param exception:
+        :return:
+        """
+        event = DBAPICopyEvent(
+            cursor_wrapper.connection_wrapper,
+            cursor_wrapper,
+            args,
+            kwargs,
+            start_time,
+            exception,
+            self.copy_file,
+        )
         trace_factory.add_event(event)
@@ -4,7 +4,6 @@ Greengrass events module.
 
 from __future__ import absolute_import
 import traceback
-from uuid import uuid4
 
 from epsagon.utils import add_data_if_needed
 from ..trace import trace_factory
@@ -16,8 +15,11 @@ class GreengrassPublishEvent(BaseEvent):
     Represents Greengrass publish event.
     """
 
+    __slots__ = ()
+
     ORIGIN = 'greengrasssdk'
     RESOURCE_TYPE = 'greengrass'
+    ID_PREFIX = 'greengrass-'
 
     # pylint: disable=W0613
     def __init__(self, wrapped, instance, args, kwargs, start_time, response,
@@ -34,8 +36,6 @@ class GreengrassPublishEvent(BaseEvent):
         """
         super(GreengrassPublishEvent, self).__init__(start_time)
 
-        self.event_id = 'greengrass-{}'.format(str(uuid4()))
-
         self.resource['name'] = kwargs.get('topic', 'N/A')
         self.resource['operation'] = 'publish'
         if kwargs.get('queueFullPolicy'):
@@ -8,18 +8,35 @@ try:
 except ImportError:
     from urlparse import urlparse
 import traceback
-from uuid import uuid4
 import json
 
-from epsagon.utils import add_data_if_needed
 from ..trace import trace_factory
 from ..event import BaseEvent
 from ..http_filters import (
     is_blacklisted_url,
     is_payload_collection_blacklisted
 )
-from ..utils import update_http_headers
-from ..constants import HTTP_ERR_CODE
+from ..utils import (
+    update_http_headers,
+)
+from ..http_capture import add_body_if_needed, add_headers_if_needed
+from ..constants import HTTP_ERR_CODE, HTTP_MAX_FIELD_SIZE
+
+
+def _parse_json_body(body):
+    """
+    Parses a JSON body. Bodies over the body size limit are not parsed, and
+    returned as is (to be truncated).
+    :param body: the body
+    :return: the parsed body, the body itself if too large, or None if it
+        isn't a JSON body
+    """
+    if len(body) > HTTP_MAX_FIELD_SIZE:
+        return body
+    try:
+        return json.loads(body)
+    except (TypeError, ValueError):
+        return None
 
 
 class Httplib2Event(BaseEvent):
@@ -27,8 +44,11 @@ class Httplib2Event(BaseEvent):
     Represents base gttplib2 event.
     """
 
+    __slots__ = ()
+
     ORIGIN = 'httplib2'
     RESOURCE_TYPE = 'http'
+    ID_PREFIX = 'httplib2-'
 
     #pylint: disable=W0613
     def __init__(self, wrapped, instance, args, kwargs, start_time, response,
@@ -45,7 +65,6 @@ class Httplib2Event(BaseEvent):
         """
 
         super(Httplib2Event, self).__init__(start_time)
-        self.event_id = 'httplib2-{}'.format(str(uuid4()))
 
         # Params can be set via args or kwargs.
         url, method, body, headers = Httplib2Event.unroller(*args, **kwargs)
@@ -57,22 +76,21 @@ class Httplib2Event(BaseEvent):
 
         if not is_payload_collection_blacklisted(url):
             if headers:
-                add_data_if_needed(
+                add_headers_if_needed(
                     self.resource['metadata'],
                     'request_headers',
                     headers
                 )
 
-            try:
-                if body:
-                    add_data_if_needed(
+            if body:
+                # Skip if it is not a JSON body
+                parsed_body = _parse_json_body(body)
+                if parsed_body is not None:
+                    add_body_if_needed(
                         self.resource['metadata'],
                         'request_body',
-                        json.loads(body)
+                        parsed_body
                     )
-            except (TypeError, ValueError):
-                # Skip if it is not a JSON body
-                pass
 
         if response is not None:
             self.update_response(response)
@@ -98,23 +116,21 @@ class Httplib2Event(BaseEvent):
         full_url = self.resource['metadata']['url']
 
         if not is_payload_collection_blacklisted(full_url):
-            add_data_if_needed(
+            add_headers_if_needed(
                 self.resource['metadata'],
                 'response_headers',
-                dict(response_headers)
+                response_headers
             )
 
             # Extract only json responses
-            try:
-                if response_body:
-                    add_data_if_needed(
+            if response_body:
+                parsed_body = _parse_json_body(response_body)
+                if parsed_body is not None:
+                    add_body_if_needed(
                         self.resource['metadata'],
                         'response_body',
-                        json.loads(response_body)
+                        parsed_body
                     )
-            except (TypeError, ValueError):
-                # Skip if it is not a JSON body
-                pass
 
         # Detect errors based on status code
         if int(response_headers['status']) >= HTTP_ERR_CODE:
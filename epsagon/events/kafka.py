@@ -4,7 +4,6 @@ kafka-python events.
 
 from __future__ import absolute_import
 import traceback
-from uuid import uuid4
 
 from epsagon.utils import add_data_if_needed
 from ..trace import trace_factory
@@ -17,8 +16,11 @@ class KafkaEvent(BaseEvent):
     Represents base Kafka event.
     """
 
+    __slots__ = ()
+
     ORIGIN = 'kafka'
     RESOURCE_TYPE = 'kafka'
+    ID_PREFIX = 'kafka-'
 
     # pylint: disable=W0613
     def __init__(self, wrapped, instance, args, kwargs, start_time, response,
@@ -34,7 +36,6 @@ class KafkaEvent(BaseEvent):
         :param exception: Exception (if happened)
         """
         super(KafkaEvent, self).__init__(start_time)
-        self.event_id = 'kafka-{}'.format(str(uuid4()))
 
         topic = args[0]
         headers = dict(kwargs['headers'])
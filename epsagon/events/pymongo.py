@@ -3,139 +3,377 @@ pymongo events module.
 """
 
 from __future__ import absolute_import
-from uuid import uuid4
-import traceback
+import six
 
 from epsagon.utils import add_data_if_needed
 from ..event import BaseEvent
 from ..trace import trace_factory
+from ..constants import (
+    PYMONGO_MAX_RESULTS,
+    PYMONGO_MAX_DOCUMENT_SIZE,
+    PYMONGO_MAX_EVENTS_PER_COLLECTION,
+)
 
+try:
+    from bson import encode as bson_encode
+except ImportError:
+    # pymongo < 3.9
+    from bson import BSON
+    bson_encode = BSON.encode
 
-class PyMongoEvent(BaseEvent):
+
+def _document_size(document):
     """
-    Represents base pymongo event.
+    Returns the BSON size of a document.
+    :param document: the document
+    :return: size in bytes, 0 if the document can't be encoded
     """
+    raw = getattr(document, 'raw', None)
+    try:
+        return len(raw if raw is not None else bson_encode(document))
+    except Exception:  # pylint: disable=broad-except
+        return 0
 
-    ORIGIN = 'pymongo'
-    RESOURCE_TYPE = 'pymongo'
-    INSERT_ONE = 'insert_one'
-    INSERT_MANY = 'insert_many'
-    INSERT_OPERATIONS = (INSERT_ONE, INSERT_MANY)
-    FILTER_OPERATIONS = ('find', 'update_one', 'delete_many')
 
-    #pylint: disable=W0613
-    def __init__(self, wrapped, instance, args, kwargs, start_time, response,
-                 exception):
-        """
-        Initialize.
-        :param wrapped: wrapt's wrapped
-        :param instance: wrapt's instance
-        :param args: wrapt's args
-        :param kwargs: wrapt's kwargs
-        :param start_time: Start timestamp (epoch)
-        :param response: response data
-        :param exception: Exception (if happened)
-        """
-        super(PyMongoEvent, self).__init__(start_time)
+def _capped_documents(documents):
+    """
+    Caps the number and the size of the documents kept in the event.
+    :param documents: a document, or a list of documents
+    :return: the capped document(s)
+    """
+    if isinstance(documents, (list, tuple)):
+        return [
+            _capped_documents(document)
+            for document in documents[:PYMONGO_MAX_RESULTS]
+        ]
 
-        self.resource['operation'] = getattr(wrapped, '__name__')
+    if isinstance(documents, dict):
+        size = _document_size(documents)
+        if size > PYMONGO_MAX_DOCUMENT_SIZE:
+            return 'Document too large ({} bytes)'.format(size)
+    return documents
 
-        self.event_id = 'mongo-{}'.format(str(uuid4()))
-        self.resource['name'] = instance.name
-        address = list(getattr(
-            instance.database.client,
-            '_topology_settings'
-            ).seeds)[0]
 
-        self.resource['metadata'] = {
-                'DB URL': ':'.join([str(x) for x in address]),
-                'DB Name': str(instance.database.name),
-                'Collection Name': str(instance.collection.name),
-            }
+def _batch_size(documents):
+    """
+    Estimates the BSON size of a batch of documents from its first document,
+    so large replies are not encoded again.
+    :param documents: list of documents
+    :return: estimated size in bytes
+    """
+    if not documents:
+        return 0
+    return _document_size(documents[0]) * len(documents)
 
-        if args:
-            self.handle_request_payload(args)
 
-        if response is not None:
-            self.update_response(response)
+def _reply_size(reply):
+    """
+    Returns the BSON size of a reply. The size of the documents batch of a
+    cursor reply is estimated.
+    :param reply: the reply document
+    :return: size in bytes
+    """
+    cursor = reply.get('cursor')
+    if not isinstance(cursor, dict):
+        return _document_size(reply)
+    return _batch_size(
+        cursor.get('firstBatch') or cursor.get('nextBatch') or []
+    )
 
-        if exception is not None:
-            self.set_exception(exception, traceback.format_exc())
 
-    def update_response(self, response):
-        """
-        Adds response data to event.
-        :param response: Response from botocore
-        :return: None
-        """
+def _is_replacement(update):
+    """
+    Checks if the update document of a command is a whole replacement
+    document, rather than update operators.
+    :param update: the update document
+    :return: True for a replacement document
+    """
+    return isinstance(update, dict) and not any(
+        isinstance(key, six.string_types) and key.startswith('$')
+        for key in update
+    )
 
-        if self.resource['operation'] in PyMongoEvent.INSERT_OPERATIONS:
-            self.handle_insert_operations_response(response)
 
-        elif self.resource['operation'] in PyMongoEvent.FILTER_OPERATIONS:
-            self.handle_filter_operations_response(response)
+def _single_statement(statements):
+    """
+    Returns the single statement of an update or delete command.
+    :param statements: the `updates` or `deletes` of the command
+    :return: the statement, or None for a bulk command
+    """
+    if isinstance(statements, (list, tuple)) and len(statements) == 1:
+        statement = statements[0]
+        if isinstance(statement, dict):
+            return statement
+    return None
 
 
-    def handle_request_payload(self, input_args):
-        """
-        Handle input data before add to event.
-        :param input_args: input from botocore
-        :return: None
-        """
+def _statement_operation(command_name, statement):
+    """
+    Returns the name of the `Collection` method that sent a single update or
+    delete statement.
+    :param command_name: 'update' or 'delete'
+    :param statement: the statement
+    :return: the operation name
+    """
+    if command_name == 'delete':
+        return 'delete_one' if statement.get('limit') else 'delete_many'
+    if statement.get('multi'):
+        return 'update_many'
+    if _is_replacement(statement.get('u')):
+        return 'replace_one'
+    return 'update_one'
 
-        if self.resource['operation'] == PyMongoEvent.INSERT_MANY:
-            add_data_if_needed(self.resource['metadata'], 'Items',
-                input_args[0])
 
-        elif self.resource['operation'] == PyMongoEvent.INSERT_ONE:
-            add_data_if_needed(self.resource['metadata'], 'Item',
-                input_args[0])
+def _find_and_modify_operation(command):
+    """
+    Returns the name of the `Collection` method that sent a findAndModify
+    command.
+    :param command: the command document
+    :return: the operation name
+    """
+    if command.get('remove'):
+        return 'find_one_and_delete'
+    if _is_replacement(command.get('update')):
+        return 'find_one_and_replace'
+    return 'find_one_and_update'
 
-        elif self.resource['operation'] in PyMongoEvent.FILTER_OPERATIONS:
-            add_data_if_needed(self.resource['metadata'], 'Filter',
-                input_args[0])
 
-            if self.resource['operation'] == 'update_one':
-                add_data_if_needed(self.resource['metadata'], 'New Values',
-                    input_args[1])
+class PyMongoEvent(BaseEvent):
+    """
+    Represents a MongoDB command, captured by pymongo's command monitoring.
+    The operation and metadata are named after the pymongo `Collection`
+    method that sent the command (insert_one, update_many, ...).
+    """
 
+    __slots__ = ('_inserted_ids',)
 
-    def handle_insert_operations_response(self, response):
+    ORIGIN = 'pymongo'
+    RESOURCE_TYPE = 'pymongo'
+    ID_PREFIX = 'mongo-'
+    MAX_EVENTS_PER_RESOURCE = PYMONGO_MAX_EVENTS_PER_COLLECTION
+    INSERT_ONE = 'insert_one'
+    INSERT_MANY = 'insert_many'
+    BULK_WRITE = 'bulk_write'
+    # Command name -> command field of the captured filter
+    FILTER_FIELDS = {
+        'find': 'filter',
+        'findAndModify': 'query',
+        'count': 'query',
+        'distinct': 'query',
+        'aggregate': 'pipeline',
+    }
+
+    def __init__(self, command_event, start_time):
         """
-        Handle response data before add to event.
-        :param response: response from botocore
-        :return: None
+        Initialize.
+        :param command_event: pymongo's `CommandStartedEvent`
+        :param start_time: Start timestamp (epoch)
+        """
+        super(PyMongoEvent, self).__init__(start_time)
+        self.terminated = True
+        self._inserted_ids = None
+
+        command_name = command_event.command_name
+        command = command_event.command
+        collection = command.get(command_name)
+        if command_name == 'getMore':
+            collection = command.get('collection')
+        if not isinstance(collection, six.string_types):
+            collection = ''
+
+        self.resource['name'] = collection
+        self.resource['operation'] = self._operation_name(
+            command_name,
+            command
+        )
+        self.resource['metadata'] = {
+            'DB URL': ':'.join(
+                [str(x) for x in command_event.connection_id or ()]
+            ),
+            'DB Name': str(command_event.database_name),
+            'Collection Name': collection,
+        }
+        self._add_payload(command_name, command)
+
+    @classmethod
+    def _operation_name(cls, command_name, command):
+        """
+        Returns the name of the `Collection` method that sent a command.
+        :param command_name: the command name
+        :param command: the command document
+        :return: the operation name
         """
+        if command_name == 'insert':
+            documents = command.get('documents') or ()
+            return cls.INSERT_ONE if len(documents) == 1 else cls.INSERT_MANY
 
-        if self.resource['operation'] == PyMongoEvent.INSERT_MANY:
-            self.resource['metadata']['inserted_ids'] = \
-                    [str(x) for x in response.inserted_ids]
+        if command_name in ('update', 'delete'):
+            statement = _single_statement(command.get(command_name + 's'))
+            if statement is None:
+                return cls.BULK_WRITE
+            return _statement_operation(command_name, statement)
 
-        elif self.resource['operation'] == PyMongoEvent.INSERT_ONE:
-            self.resource['metadata']['inserted_id'] = \
-                    [str(response.inserted_id)]
+        if command_name == 'findAndModify':
+            return _find_and_modify_operation(command)
 
+        return command_name
 
-    def handle_filter_operations_response(self, response):
+    def _add_payload(self, command_name, command):
         """
-        Handle response data before add to event.
-        :param response: response from botocore
+        Adds the documents, filter and new values of a command to the event.
+        :param command_name: the command name
+        :param command: the command document
         :return: None
         """
+        metadata = self.resource['metadata']
+        operation = self.resource['operation']
+
+        if command_name == 'insert':
+            documents = command.get('documents') or []
+            self._inserted_ids = [
+                document.get('_id')
+                for document in documents[:PYMONGO_MAX_RESULTS]
+                if isinstance(document, dict)
+            ]
+            if operation == self.INSERT_ONE:
+                add_data_if_needed(
+                    metadata,
+                    'Item',
+                    _capped_documents(documents[0])
+                )
+            else:
+                add_data_if_needed(
+                    metadata,
+                    'Items',
+                    _capped_documents(documents)
+                )
+
+        elif command_name in ('update', 'delete'):
+            statements = command.get(
+                'updates' if command_name == 'update' else 'deletes'
+            ) or []
+            statement = _single_statement(statements)
+            if statement is not None:
+                add_data_if_needed(
+                    metadata,
+                    'Filter',
+                    _capped_documents(statement.get('q'))
+                )
+                if command_name == 'update':
+                    add_data_if_needed(
+                        metadata,
+                        'New Values',
+                        _capped_documents(statement.get('u'))
+                    )
+            else:
+                add_data_if_needed(
+                    metadata,
+                    'Filter',
+                    _capped_documents([
+                        statement.get('q') for statement in statements
+                        if isinstance(statement, dict)
+                    ])
+                )
+
+        elif command_name in self.FILTER_FIELDS:
+            filter_field = self.FILTER_FIELDS[command_name]
+            add_data_if_needed(
+                metadata,
+                'Filter',
+                _capped_documents(command.get(filter_field))
+            )
+            if command_name == 'findAndModify' and not command.get('remove'):
+                add_data_if_needed(
+                    metadata,
+                    'New Values',
+                    _capped_documents(command.get('update'))
+                )
+
+    def update_response(self, reply, duration):
+        """
+        Adds the reply of the command to the event.
+        :param reply: the reply document
+        :param duration: the command duration in seconds
+        :return: None
+        """
+        self.duration = duration
+        metadata = self.resource['metadata']
+        metadata['Reply Size'] = _reply_size(reply)
+
+        operation = self.resource['operation']
+        if operation == self.INSERT_ONE:
+            metadata['inserted_count'] = reply.get('n')
+            metadata['inserted_id'] = [str(x) for x in self._inserted_ids]
+        elif operation == self.INSERT_MANY:
+            metadata['inserted_count'] = reply.get('n')
+            metadata['inserted_ids'] = [str(x) for x in self._inserted_ids]
+        elif operation.startswith(('update_', 'replace_')):
+            metadata['matched_count'] = reply.get('n')
+            metadata['modified_count'] = reply.get('nModified')
+        elif operation.startswith('delete_'):
+            metadata['deleted_count'] = reply.get('n')
+        elif operation == self.BULK_WRITE:
+            metadata['matched_count'] = reply.get('n')
+            if 'nModified' in reply:
+                metadata['modified_count'] = reply.get('nModified')
+
+        if reply.get('writeErrors') or reply.get('writeConcernError'):
+            self.set_error()
+
+        cursor = reply.get('cursor')
+        if isinstance(cursor, dict):
+            # The time until the first batch of the results is returned,
+            # the getMore commands of the cursor are not included.
+            metadata['First Batch Duration'] = duration
+            metadata['Results Count'] = 0
+            add_data_if_needed(metadata, 'Results', [])
+            self._add_results(cursor.get('firstBatch') or [])
+
+    def add_batch(self, reply, duration):
+        """
+        Adds the reply of a getMore command of this event's cursor.
+        :param reply: the getMore reply document
+        :param duration: the getMore duration in seconds
+        :return: None
+        """
+        self.duration += duration
+        metadata = self.resource['metadata']
+        metadata['Reply Size'] = (
+            metadata.get('Reply Size', 0) + _reply_size(reply)
+        )
+        metadata['Batches'] = metadata.get('Batches', 1) + 1
+        cursor = reply.get('cursor')
+        if isinstance(cursor, dict):
+            self._add_results(cursor.get('nextBatch') or [])
 
-        if self.resource['operation'] == 'find':
-            self.resource['metadata']['Results'] = \
-                        [response[i] for i in range(response.count())]
-
-        elif self.resource['operation'] == 'update_one':
-            self.resource['metadata']['matched_count'] = \
-                        response.matched_count
-            self.resource['metadata']['modified_count'] = \
-                        response.modified_count
+    def _add_results(self, documents):
+        """
+        Counts the returned documents, and keeps the first ones.
+        :param documents: list of documents
+        :return: None
+        """
+        metadata = self.resource['metadata']
+        metadata['Results Count'] = (
+            metadata.get('Results Count', 0) + len(documents)
+        )
+        results = metadata.get('Results')
+        if results is not None and len(results) < PYMONGO_MAX_RESULTS:
+            results.extend(_capped_documents(
+                documents[:PYMONGO_MAX_RESULTS - len(results)]
+            ))
 
-        elif self.resource['operation'] == 'delete_many':
-            self.resource['metadata']['deleted_count'] = \
-                        response.deleted_count
+    def set_failure(self, failure, duration):
+        """
+        Sets the failure of the command.
+        :param failure: the failure document
+        :param duration: the command duration in seconds
+        :return: None
+        """
+        self.duration = duration
+        self.set_error()
+        if isinstance(failure, dict):
+            self.resource['metadata']['Error Message'] = failure.get('errmsg')
+            self.resource['metadata']['Error Code'] = failure.get('code')
 
 
 class PyMongoEventFactory(object):
@@ -144,26 +382,20 @@ class PyMongoEventFactory(object):
     """
 
     @staticmethod
-    def create_event(wrapped, instance, args, kwargs, start_time, response,
-                     exception):
-        """
-        Create a PyMongo event.
-        :param wrapped:
-        :param instance:
-        :param args:
-        :param kwargs:
-        :param start_time:
-        :param response:
-        :param exception:
-        :return:
-        """
-        event = PyMongoEvent(
-            wrapped,
-            instance,
-            args,
-            kwargs,
-            start_time,
-            response,
-            exception
-        )
+    def create_event(command_event, start_time):
+        """
+        Create a PyMongo event, added to the trace when the command ends.
+        :param command_event: pymongo's `CommandStartedEvent`
+        :param start_time: Start timestamp (epoch)
+        :return: the event
+        """
+        return PyMongoEvent(command_event, start_time)
+
+    @staticmethod
+    def add_event(event):
+        """
+        Adds an ended command event to the current trace.
+        :param event: the event
+        :return: None
+        """
         trace_factory.add_event(event)
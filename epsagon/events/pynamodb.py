@@ -3,10 +3,10 @@ PynamoDB events module.
 """
 
 from __future__ import absolute_import
-from uuid import uuid4
 import json
 from ..trace import trace_factory
 from .botocore import BotocoreDynamoDBEvent
+from ..id_generator import generate_uuid
 
 
 class NestedObject(object):
@@ -75,7 +75,7 @@ class PynamoDBEventAdapter(object):
         """Creates DynamoDB event based on PynamoDB data"""
         new_response = {
             'ResponseMetadata': {
-                'RequestId': 'pynamodb-{}'.format(str(uuid4())),
+                'RequestId': 'pynamodb-{}'.format(generate_uuid()),
                 'HTTPStatusCode': 200 if exception is None else 500,
                 'RetryAttempts': None,
             },
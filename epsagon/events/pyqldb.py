@@ -3,7 +3,6 @@ pyqldb events module.
 """
 
 from __future__ import absolute_import
-from uuid import uuid4
 import traceback
 
 from epsagon.utils import add_data_if_needed
@@ -16,8 +15,11 @@ class QldbEvent(BaseEvent):
     Represents base pyqldb event.
     """
 
+    __slots__ = ()
+
     ORIGIN = 'qldb'
     RESOURCE_TYPE = 'qldb'
+    ID_PREFIX = 'qldb-'
 
     #pylint: disable=W0613
     def __init__(self, wrapped, instance, args, kwargs, start_time, response,
@@ -34,7 +36,6 @@ class QldbEvent(BaseEvent):
         """
         super(QldbEvent, self).__init__(start_time)
 
-        self.event_id = 'qldb-{}'.format(str(uuid4()))
         self.resource['name'] = \
             getattr(instance.__getattribute__('_transaction')._session,# pylint: disable=W0212
                                                 '_ledger_name')
@@ -3,7 +3,6 @@ Cloud Object Storage events module.
 """
 
 from __future__ import absolute_import
-from uuid import uuid4
 import traceback
 
 from ..event import BaseEvent
@@ -14,8 +13,12 @@ class COSEvent(BaseEvent):
     """
     Represents base Cloud Object Storage event.
     """
+
+    __slots__ = ()
+
     ORIGIN = 'tencent-cos'
     RESOURCE_TYPE = 'cos'
+    ID_PREFIX = 'cos-'
 
     # pylint: disable=W0613
     def __init__(self, wrapped, instance, args, kwargs, start_time, response,
@@ -32,7 +35,6 @@ class COSEvent(BaseEvent):
         """
 
         super(COSEvent, self).__init__(start_time)
-        self.event_id = 'cos-{}'.format(str(uuid4()))
         self.resource['name'] = kwargs['bucket']
         self.resource['operation'] = kwargs['method']
         self.resource['metadata'] = {
@@ -3,8 +3,8 @@ redis events module.
 """
 
 from __future__ import absolute_import
-from uuid import uuid4
 import traceback
+import six
 
 from ..event import BaseEvent
 from ..trace import trace_factory
@@ -28,6 +28,37 @@ def _parse_redis_cmd(cmd_args):
     return operation, key
 
 
+def _arg_size(arg):
+    """
+    Returns the approximate size of a command argument, as sent to redis.
+    :param arg: command argument
+    :return: size in bytes
+    """
+    if isinstance(arg, (bytes, six.text_type)):
+        return len(arg)
+    return len(str(arg))
+
+
+def snapshot_command_stack(command_stack):
+    """
+    Snapshots what the pipeline event needs from a command stack, before the
+    pipeline executes (and resets) it. Only the first `MAX_CMD_PIPELINE`
+    operations are parsed, the values are never copied.
+    :param command_stack: the pipeline's command stack, of (args, options)
+    :return: (operations, commands count, approximate payload size)
+    """
+    operations = [
+        '{} {}'.format(*_parse_redis_cmd(cmd_args))
+        for cmd_args, _ in command_stack[:MAX_CMD_PIPELINE]
+    ]
+    payload_size = sum(
+        _arg_size(arg)
+        for cmd_args, _ in command_stack
+        for arg in cmd_args
+    )
+    return operations, len(command_stack), payload_size
+
+
 def _parse_redis_connection(connection):
     """
     Parse redis connection to host, db
@@ -46,8 +77,12 @@ class BaseRedisEvent(BaseEvent):
     """
     Represents base redis event.
     """
+
+    __slots__ = ()
+
     ORIGIN = 'redis'
     RESOURCE_TYPE = 'redis'
+    ID_PREFIX = 'redis-'
 
     # pylint: disable=W0613
     def __init__(self, wrapped, instance, args, kwargs, start_time, response,
@@ -65,8 +100,6 @@ class BaseRedisEvent(BaseEvent):
 
         super(BaseRedisEvent, self).__init__(start_time)
 
-        self.event_id = 'redis-{}'.format(str(uuid4()))
-
         host, port, db = _parse_redis_connection(instance)
 
         self.resource['name'] = host
@@ -85,6 +118,8 @@ class RedisSingleExecutionEvent(BaseRedisEvent):
     Represents single execution redis event.
     """
 
+    __slots__ = ()
+
     ORIGIN = 'redis'
     RESOURCE_TYPE = 'redis'
 
@@ -106,8 +141,6 @@ class RedisSingleExecutionEvent(BaseRedisEvent):
             wrapped, instance, args, kwargs, start_time, response, exception
         )
 
-        self.event_id = 'redis-{}'.format(str(uuid4()))
-
         operation, key = _parse_redis_cmd(args)
         self.resource['operation'] = operation
         self.resource['metadata']['Redis Key'] = key
@@ -125,12 +158,14 @@ class RedisMultiExecutionEvent(BaseRedisEvent):
     Represents base redis event.
     """
 
+    __slots__ = ()
+
     ORIGIN = 'redis'
     RESOURCE_TYPE = 'redis'
 
     # pylint: disable=W0613
     def __init__(self, wrapped, instance, args, kwargs, start_time, response,
-                 exception, command_stack):
+                 exception, stack_snapshot):
         """
         Initialize.
         :param wrapped: wrapt's wrapped
@@ -140,6 +175,7 @@ class RedisMultiExecutionEvent(BaseRedisEvent):
         :param start_time: Start timestamp (epoch)
         :param response: response data
         :param exception: Exception (if happened)
+        :param stack_snapshot: the `snapshot_command_stack` of the pipeline
         """
 
         super(RedisMultiExecutionEvent, self).__init__(
@@ -148,25 +184,27 @@ class RedisMultiExecutionEvent(BaseRedisEvent):
 
         self.resource['operation'] = 'Pipeline'
 
-        operations = [
-            '{} {}'.format(op, key) for op, key in [
-                _parse_redis_cmd(cmd_args)
-                for cmd_args, _ in command_stack
-            ]
-        ]
-        self.resource['metadata']['Stack Count'] = len(operations)
-        self.resource['metadata']['Actions'] = operations[:MAX_CMD_PIPELINE]
+        operations, commands_count, payload_size = stack_snapshot
+        self.resource['metadata']['Stack Count'] = commands_count
+        self.resource['metadata']['Actions'] = operations
+        self.resource['metadata']['Payload Size'] = payload_size
 
 
 class RedisMultiEventFactory(object):
     """
     Factory class, generates Redis multi-execution event.
+    Created for each pipeline execution, with its command stack snapshot.
     """
-    LAST_STACK = []
 
-    @staticmethod
-    def create_event(wrapped, instance, args, kwargs, start_time, response,
-                     exception):
+    def __init__(self, stack_snapshot):
+        """
+        Initialize.
+        :param stack_snapshot: the `snapshot_command_stack` of the pipeline
+        """
+        self.stack_snapshot = stack_snapshot
+
+    def create_event(self, wrapped, instance, args, kwargs, start_time,
+                     response, exception):
         """
         Create a Redis event.
         :param wrapped:
@@ -186,7 +224,7 @@ class RedisMultiEventFactory(object):
             start_time,
             response,
             exception,
-            RedisMultiEventFactory.LAST_STACK
+            self.stack_snapshot
         )
         trace_factory.add_event(event)
 
@@ -7,17 +7,20 @@ For regular requests lib, we use urllib3
 from __future__ import absolute_import
 import traceback
 import json
-from uuid import uuid4
 
-from epsagon.utils import add_data_if_needed
 from ..trace import trace_factory
 from ..event import BaseEvent
 from ..http_filters import is_blacklisted_url
-from ..utils import update_http_headers, normalize_http_url
+from ..utils import (
+    update_http_headers,
+    normalize_http_url,
+)
+from ..http_capture import add_body_if_needed, add_headers_if_needed
 from ..constants import (
     HTTP_ERR_CODE,
     EPSAGON_HEADER,
     SKIP_HTTP_CLIENT_RESPONSE,
+    HTTP_MAX_FIELD_SIZE,
 )
 
 
@@ -26,8 +29,11 @@ class RequestsEvent(BaseEvent):
     Represents base requests event.
     """
 
+    __slots__ = ()
+
     ORIGIN = 'requests'
     RESOURCE_TYPE = 'http'
+    ID_PREFIX = 'requests-'
 
     # pylint: disable=W0613
     def __init__(self, wrapped, instance, args, kwargs, start_time, response,
@@ -44,17 +50,15 @@ class RequestsEvent(BaseEvent):
         """
         super(RequestsEvent, self).__init__(start_time)
 
-        self.event_id = 'requests-{}'.format(str(uuid4()))
-
         prepared_request = args[0]
         self.resource['name'] = normalize_http_url(prepared_request.url)
         self.resource['operation'] = prepared_request.method
         self.resource['metadata']['url'] = prepared_request.url
 
-        add_data_if_needed(
+        add_headers_if_needed(
             self.resource['metadata'],
             'request_headers',
-            dict(prepared_request.headers)
+            prepared_request.headers
         )
 
         epsagon_trace_id = prepared_request.headers.get(EPSAGON_HEADER)
@@ -62,7 +66,7 @@ class RequestsEvent(BaseEvent):
         if epsagon_trace_id:
             self.resource['metadata']['http_trace_id'] = epsagon_trace_id
 
-        add_data_if_needed(
+        add_body_if_needed(
             self.resource['metadata'],
             'request_body',
             prepared_request.body
@@ -77,7 +81,8 @@ class RequestsEvent(BaseEvent):
     @staticmethod
     def _get_response_body(response, is_stream):
         """
-        Gets the response body from the response
+        Gets the response body from the response. Only bodies that fit in
+        the body size limit are parsed as JSON, others are returned as is.
         :param response: the Response object
         :param is_stream: the param value as given to the original request
         :return: the response body, None on failure
@@ -90,15 +95,11 @@ class RequestsEvent(BaseEvent):
         except Exception: # pylint: disable=broad-except
             return None
 
-        if data:
+        if data and len(data) <= HTTP_MAX_FIELD_SIZE:
             try:
-                data = json.loads(data)
+                return json.loads(data)
             except ValueError:
-                if isinstance(data, bytes):
-                    try:
-                        data = data.decode('utf-8')
-                    except UnicodeDecodeError:
-                        data = str(data)
+                pass
         return data
 
     def update_response(self, response, is_stream):
@@ -114,16 +115,16 @@ class RequestsEvent(BaseEvent):
             response.headers
         )
 
-        add_data_if_needed(
+        add_headers_if_needed(
             self.resource['metadata'],
             'response_headers',
-            dict(response.headers)
+            response.headers
         )
         if (
                 not trace_factory.metadata_only and
                 not SKIP_HTTP_CLIENT_RESPONSE
         ):
-            add_data_if_needed(
+            add_body_if_needed(
                 self.resource['metadata'],
                 'response_body',
                 type(self)._get_response_body(response, is_stream)
@@ -3,12 +3,22 @@ sqlalchemy events module.
 """
 
 from __future__ import absolute_import
+import time
+import weakref
 import traceback
-from uuid import uuid4
 
 from ..trace import trace_factory
 from ..event import BaseEvent
 from ..utils import database_connection_type
+from ..sql_analyzer import analyze
+from ..dbapi_utils import add_fetch_metadata
+
+MAX_QUERY_SIZE = 2048
+
+# URL of the engine of each connection pool.
+POOL_URLS = weakref.WeakKeyDictionary()
+# Pool events of each trace, by pool.
+_POOL_EVENTS = weakref.WeakKeyDictionary()
 
 
 class SqlAlchemyEvent(BaseEvent):
@@ -16,8 +26,11 @@ class SqlAlchemyEvent(BaseEvent):
     Represents base SqlAlchemy event.
     """
 
+    __slots__ = ()
+
     ORIGIN = 'sqlalchemy'
     RESOURCE_TYPE = 'database'
+    ID_PREFIX = 'sqlalchemy-'
 
     # pylint: disable=W0613
     def __init__(self, wrapped, instance, args, kwargs, start_time, response,
@@ -35,8 +48,6 @@ class SqlAlchemyEvent(BaseEvent):
         """
         super(SqlAlchemyEvent, self).__init__(start_time)
 
-        self.event_id = 'sqlalchemy-{}'.format(str(uuid4()))
-
         self.resource['name'] = (
                 instance.bind.url.database or instance.bind.url.host
         )
@@ -87,3 +98,271 @@ class SqlAlchemyEventFactory(object):
         )
 
         trace_factory.add_event(event)
+
+
+def _analyze_statement(statement, context):
+    """
+    Analyzes an executed statement. The analysis of a compiled statement is
+    kept on it, so statements reused from SQLAlchemy's compiled cache (or
+    baked queries) are analyzed once.
+    :param statement: the executed SQL statement
+    :param context: the SQLAlchemy execution context, or None
+    :return: SqlStatement
+    """
+    compiled = getattr(context, 'compiled', None)
+    if compiled is None:
+        return analyze(statement)
+    cached = getattr(compiled, '_epsagon_sql_statement', None)
+    if cached is not None and cached[0] == statement:
+        return cached[1]
+    sql_statement = analyze(statement)
+    try:
+        compiled._epsagon_sql_statement = (  # pylint: disable=W0212
+            statement,
+            sql_statement,
+        )
+    except AttributeError:
+        pass
+    return sql_statement
+
+
+class SqlAlchemyStatementEvent(BaseEvent):
+    """
+    Represents a statement executed by a SqlAlchemy engine.
+    """
+
+    __slots__ = ()
+
+    ORIGIN = 'sqlalchemy'
+    RESOURCE_TYPE = 'database'
+    ID_PREFIX = 'sqlalchemy-'
+
+    # pylint: disable=W0613
+    def __init__(self, connection, cursor, statement, parameters, context,
+                 executemany, start_time, exception):
+        """
+        Initialize.
+        :param connection: the SqlAlchemy connection
+        :param cursor: the DBAPI cursor
+        :param statement: the executed SQL statement
+        :param parameters: the statement parameters
+        :param context: the SqlAlchemy execution context
+        :param executemany: whether the statement is executed with
+            multiple parameter sets
+        :param start_time: Start timestamp (epoch)
+        :param exception: Exception (if happened)
+        """
+        super(SqlAlchemyStatementEvent, self).__init__(start_time)
+
+        url = connection.engine.url
+        host = url.host or ''
+        sql_statement = _analyze_statement(statement, context)
+        operation = sql_statement.operation
+
+        self.resource['name'] = url.database or host
+        self.resource['operation'] = operation
+        # override event type with the specific DB type
+        self.resource['type'] = database_connection_type(
+            host,
+            self.RESOURCE_TYPE
+        )
+        self.resource['metadata'] = {
+            'Host': host,
+            'Driver': connection.dialect.driver,
+            'Table Name': (
+                sql_statement.tables[0] if sql_statement.tables else ''
+            ),
+            'Query Fingerprint': sql_statement.fingerprint[:MAX_QUERY_SIZE],
+        }
+        if len(sql_statement.tables) > 1:
+            self.resource['metadata']['Table Names'] = list(
+                sql_statement.tables
+            )
+        if executemany:
+            self.resource['metadata']['Parameter Sets Count'] = len(
+                parameters
+            )
+
+        # for select we always want to save the query
+        if operation == 'select' or not trace_factory.metadata_only:
+            self.resource['metadata']['Query'] = statement[:MAX_QUERY_SIZE]
+
+        if exception is None:
+            self.resource['metadata']['Related Rows Count'] = int(
+                cursor.rowcount
+            )
+        else:
+            self.set_exception(exception, traceback.format_exc())
+
+    def add_fetch(self, duration, rows):
+        """
+        Adds a fetch of the statement results to the event.
+        :param duration: the fetch duration (seconds)
+        :param rows: list of the fetched rows
+        :return: None
+        """
+        add_fetch_metadata(self.resource['metadata'], duration, rows)
+
+
+class SqlAlchemyStatementEventFactory(object):
+    """
+    Factory class, generates sqlalchemy statement events.
+    """
+
+    @staticmethod
+    # pylint: disable=W0613
+    def create_event(wrapped, connection, args, kwargs, start_time, response,
+                     exception):
+        """
+        Create a statement event.
+        :param wrapped: None
+        :param connection: the SqlAlchemy connection
+        :param args: (cursor, statement, parameters, context, executemany)
+        :param kwargs: empty kwargs
+        :param start_time: Start timestamp (epoch)
+        :param response: None
+        :param exception: Exception (if happened)
+        :return: the event
+        """
+        event = SqlAlchemyStatementEvent(
+            connection,
+            *args,
+            start_time=start_time,
+            exception=exception
+        )
+        trace_factory.add_event(event)
+        return event
+
+
+class SqlAlchemyPoolEvent(BaseEvent):
+    """
+    Represents the connection checkouts from a SqlAlchemy pool in a trace.
+    The event duration is the total time spent waiting for connections.
+    """
+
+    __slots__ = ()
+
+    ORIGIN = 'sqlalchemy'
+    RESOURCE_TYPE = 'database'
+    ID_PREFIX = 'sqlalchemy-pool-'
+
+    def __init__(self, pool, start_time):
+        """
+        Initialize.
+        :param pool: the SqlAlchemy pool
+        :param start_time: Start timestamp (epoch) of the first checkout
+        """
+        super(SqlAlchemyPoolEvent, self).__init__(start_time)
+
+        url = POOL_URLS.get(pool)
+        host = (url.host if url is not None else None) or ''
+        self.resource['name'] = (
+            (url.database if url is not None else None) or host
+        )
+        self.resource['operation'] = 'checkout'
+        self.resource['type'] = database_connection_type(
+            host,
+            self.RESOURCE_TYPE
+        )
+        self.resource['metadata'] = {
+            'Host': host,
+            'Pool Class': pool.__class__.__name__,
+            'Checkouts Count': 0,
+            'Checkins Count': 0,
+            'Max Checkout Duration': 0.0,
+        }
+        self.terminated = True
+
+    def add_checkout(self, pool, duration, exception):
+        """
+        Adds a connection checkout to the event.
+        :param pool: the SqlAlchemy pool
+        :param duration: the checkout duration (seconds)
+        :param exception: Exception (if happened)
+        :return: None
+        """
+        metadata = self.resource['metadata']
+        metadata['Checkouts Count'] += 1
+        metadata['Max Checkout Duration'] = max(
+            metadata['Max Checkout Duration'],
+            duration
+        )
+        self.duration += duration
+        # The pool status after the checkout, for a QueuePool
+        for key, status in (
+                ('Pool Size', 'size'),
+                ('Checked Out', 'checkedout'),
+                ('Overflow', 'overflow'),
+        ):
+            if hasattr(pool, status):
+                metadata[key] = getattr(pool, status)()
+        if exception is not None:
+            self.set_exception(exception, traceback.format_exc())
+
+    def add_checkin(self):
+        """
+        Adds a connection checkin to the event.
+        :return: None
+        """
+        self.resource['metadata']['Checkins Count'] += 1
+
+
+def _get_pool_event(pool, start_time=None):
+    """
+    Returns the pool event of the current trace.
+    :param pool: the SqlAlchemy pool
+    :param start_time: the checkout start time, to create the event if the
+        trace has none
+    :return: SqlAlchemyPoolEvent, or None
+    """
+    trace = trace_factory.get_trace()
+    if trace is None:
+        return None
+    events, pool_events = _POOL_EVENTS.get(trace, (None, None))
+    if events is not trace.events:
+        # A new trace, or a trace whose events were cleared
+        pool_events = {}
+        _POOL_EVENTS[trace] = (trace.events, pool_events)
+    event = pool_events.get(pool)
+    if event is None and start_time is not None:
+        event = SqlAlchemyPoolEvent(pool, start_time)
+        pool_events[pool] = event
+        trace.add_event(event)
+    return event
+
+
+class SqlAlchemyPoolEventFactory(object):
+    """
+    Factory class, adds connection checkouts to the pool event of the trace.
+    """
+
+    @staticmethod
+    # pylint: disable=W0613
+    def create_event(wrapped, instance, args, kwargs, start_time, response,
+                     exception):
+        """
+        Add a connection checkout to the pool event.
+        :param wrapped: the checkout function
+        :param instance: wrapt's instance
+        :param args: (pool,)
+        :param kwargs: wrapt's kwargs
+        :param start_time: Start timestamp (epoch)
+        :param response: the checked out connection
+        :param exception: Exception (if happened)
+        """
+        pool = args[0] if args else kwargs['pool']
+        event = _get_pool_event(pool, start_time)
+        if event is not None:
+            event.add_checkout(pool, time.time() - start_time, exception)
+
+
+def add_pool_checkin(pool):
+    """
+    Adds a connection checkin to the pool event of the trace, if the trace
+    checked out connections from the pool.
+    :param pool: the SqlAlchemy pool
+    :return: None
+    """
+    event = _get_pool_event(pool)
+    if event is not None:
+        event.add_checkin()
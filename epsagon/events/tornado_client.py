@@ -10,16 +10,18 @@ try:
 except ImportError:
     from urlparse import urlparse, urlunparse
 import traceback
-from uuid import uuid4
 
-from epsagon.utils import add_data_if_needed
 from ..trace import trace_factory
 from ..event import BaseEvent
 from ..http_filters import (
     is_blacklisted_url,
     is_payload_collection_blacklisted
 )
-from ..utils import update_http_headers, normalize_http_url
+from ..utils import (
+    update_http_headers,
+    normalize_http_url,
+)
+from ..http_capture import add_body_if_needed, add_headers_if_needed
 from ..constants import HTTP_ERR_CODE, EPSAGON_HEADER_TITLE
 
 
@@ -28,8 +30,11 @@ class TornadoAsyncHTTPClientEvent(BaseEvent):
     Represents base request event.
     """
 
+    __slots__ = ()
+
     ORIGIN = 'tornado_client'
     RESOURCE_TYPE = 'http'
+    ID_PREFIX = 'tornado-client-'
 
     # pylint: disable=W0613
     def __init__(self, wrapped, instance, args, kwargs, start_time, response,
@@ -45,7 +50,6 @@ class TornadoAsyncHTTPClientEvent(BaseEvent):
         :param exception: Exception (if happened)
         """
         super(TornadoAsyncHTTPClientEvent, self).__init__(start_time)
-        self.event_id = 'tornado-client-{}'.format(str(uuid4()))
 
         request = args[0]
         headers = dict(request.headers)
@@ -72,19 +76,16 @@ class TornadoAsyncHTTPClientEvent(BaseEvent):
         self.resource['metadata']['url'] = request.url
 
         if not is_payload_collection_blacklisted(full_url):
-            add_data_if_needed(
+            add_headers_if_needed(
                 self.resource['metadata'],
                 'request_headers',
                 headers
             )
-            body = request.body
-            if isinstance(body, bytes):
-                body = body.decode('utf-8')
-            if body:
-                add_data_if_needed(
+            if request.body:
+                add_body_if_needed(
                     self.resource['metadata'],
                     'request_body',
-                    body
+                    request.body
                 )
 
         if response is not None:
@@ -111,19 +112,15 @@ class TornadoAsyncHTTPClientEvent(BaseEvent):
         full_url = self.resource['metadata']['url']
 
         if not is_payload_collection_blacklisted(full_url):
-            add_data_if_needed(
+            add_headers_if_needed(
                 self.resource['metadata'],
                 'response_headers',
-                dict(response.headers)
+                response.headers
             )
+            # `body` copies the response buffer on each access
             body = response.body
-            if isinstance(body, bytes):
-                try:
-                    body = body.decode('utf-8')
-                except UnicodeDecodeError:
-                    body = str(body)
             if body:
-                add_data_if_needed(
+                add_body_if_needed(
                     self.resource['metadata'],
                     'response_body',
                     body
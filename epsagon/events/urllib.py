@@ -5,7 +5,6 @@ requests events module.
 from __future__ import absolute_import
 
 import traceback
-from uuid import uuid4
 
 from epsagon.utils import add_data_if_needed
 from ..trace import trace_factory
@@ -23,8 +22,11 @@ class UrllibEvent(BaseEvent):
     Represents base requests event.
     """
 
+    __slots__ = ()
+
     ORIGIN = 'urllib'
     RESOURCE_TYPE = 'http'
+    ID_PREFIX = 'urllib-'
 
     # pylint: disable=W0613
     def __init__(self, wrapped, instance, args, kwargs, start_time, response,
@@ -42,8 +44,6 @@ class UrllibEvent(BaseEvent):
 
         super(UrllibEvent, self).__init__(start_time)
 
-        self.event_id = 'urllib-{}'.format(str(uuid4()))
-
         prepared_request, data = args
         self.resource['name'] = normalize_http_url(prepared_request.full_url)
         self.resource['operation'] = prepared_request.get_method()
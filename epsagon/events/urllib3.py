@@ -9,16 +9,18 @@ try:
 except ImportError:
     from urlparse import urlparse, urlunparse
 import traceback
-from uuid import uuid4
 
-from epsagon.utils import add_data_if_needed
 from ..trace import trace_factory
 from ..event import BaseEvent
 from ..http_filters import (
     is_blacklisted_url,
     is_payload_collection_blacklisted
 )
-from ..utils import update_http_headers, normalize_http_url
+from ..utils import (
+    update_http_headers,
+    normalize_http_url,
+)
+from ..http_capture import add_body_if_needed, add_headers_if_needed
 from ..constants import (
     HTTP_ERR_CODE,
     EPSAGON_MARKER,
@@ -32,8 +34,11 @@ class Urllib3Event(BaseEvent):
     Represents base requests event.
     """
 
+    __slots__ = ()
+
     ORIGIN = 'urllib3'
     RESOURCE_TYPE = 'http'
+    ID_PREFIX = 'urllib3-'
 
     # pylint: disable=W0613
     def __init__(self, wrapped, instance, args, kwargs, start_time, response,
@@ -50,8 +55,6 @@ class Urllib3Event(BaseEvent):
         """
         super(Urllib3Event, self).__init__(start_time)
 
-        self.event_id = 'urllib3-{}'.format(str(uuid4()))
-
         method, url = args
         body = kwargs.get('body')
         headers = kwargs.get('headers')
@@ -78,13 +81,13 @@ class Urllib3Event(BaseEvent):
         self.resource['metadata']['url'] = full_url
 
         if not is_payload_collection_blacklisted(full_url):
-            add_data_if_needed(
+            add_headers_if_needed(
                 self.resource['metadata'],
                 'request_headers',
-                dict(headers)
+                headers
             )
 
-            add_data_if_needed(
+            add_body_if_needed(
                 self.resource['metadata'],
                 'request_body',
                 body
@@ -116,22 +119,16 @@ class Urllib3Event(BaseEvent):
                 not is_payload_collection_blacklisted(full_url) and
                 not trace_factory.metadata_only
         ):
-            add_data_if_needed(
+            add_headers_if_needed(
                 self.resource['metadata'],
                 'response_headers',
                 headers
             )
             if not SKIP_HTTP_CLIENT_RESPONSE:
-                response_body = getattr(response, 'peek', None)
-                if isinstance(response_body, bytes):
-                    try:
-                        response_body = response_body.decode('utf-8')
-                    except UnicodeDecodeError:
-                        response_body = str(response_body)
-                add_data_if_needed(
+                add_body_if_needed(
                     self.resource['metadata'],
                     'response_body',
-                    response_body
+                    getattr(response, 'peek', None)
                 )
 
         # Detect errors based on status code
@@ -0,0 +1,75 @@
+"""
+Capture of HTTP bodies and headers into event metadata.
+"""
+
+from __future__ import absolute_import
+import six
+from .trace import trace_factory
+from .constants import HTTP_MAX_FIELD_SIZE
+
+
+def _truncate(data, max_size):
+    """
+    Truncates bytes or str to the given size (only the prefix is copied).
+    :param data: bytes or str
+    :param max_size: max size
+    :return: the data prefix
+    """
+    if isinstance(data, (bytearray, memoryview)):
+        return bytes(data[:max_size])
+    return data[:max_size] if len(data) > max_size else data
+
+
+def add_body_if_needed(dictionary, name, body, max_size=HTTP_MAX_FIELD_SIZE):
+    """
+    Add an HTTP body to the given dictionary if metadata_only option is set
+    to False. Bytes and str bodies are truncated to `max_size`, and the size
+    of a truncated body is added as `{name}_size`. Bytes are decoded only
+    when the trace is encoded. A truncated JSON body can't be parsed when the
+    trace is sent, so its ignored keys are removed before it is truncated.
+    :param dictionary: dictionary to add the body to
+    :param name: key name
+    :param body: bytes, str, or an already parsed body
+    :param max_size: max body size
+    :return: None
+    """
+    dictionary[name] = None
+    if trace_factory.metadata_only:
+        return
+
+    if isinstance(body, (bytes, bytearray, memoryview, six.text_type)):
+        size = len(body)
+        if size > max_size and trace_factory.key_filter:
+            body = trace_factory.key_filter.filter_json(body)
+        body = _truncate(body, max_size)
+        if size > len(body):
+            dictionary['{}_size'.format(name)] = size
+    dictionary[name] = body
+
+
+def add_headers_if_needed(
+        dictionary,
+        name,
+        headers,
+        max_size=HTTP_MAX_FIELD_SIZE
+):
+    """
+    Add HTTP headers to the given dictionary if metadata_only option is set
+    to False. Header values are truncated to `max_size`.
+    :param dictionary: dictionary to add the headers to
+    :param name: key name
+    :param headers: headers mapping
+    :param max_size: max header value size
+    :return: None
+    """
+    dictionary[name] = None
+    if trace_factory.metadata_only or headers is None:
+        return
+
+    dictionary[name] = {
+        key: (
+            _truncate(value, max_size)
+            if isinstance(value, (bytes, six.text_type)) else value
+        )
+        for key, value in headers.items()
+    }
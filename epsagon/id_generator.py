@@ -0,0 +1,120 @@
+"""
+Generates the IDs of events, traces and spans.
+"""
+
+from __future__ import absolute_import
+import os
+import uuid
+import random
+
+# Version 4 and RFC 4122 variant bits of a UUID
+_UUID_VERSION_MASK = ~(0xf000 << 64) & ~(0xc000 << 48)
+_UUID_VERSION_BITS = (0x4000 << 64) | (0x8000 << 48)
+
+
+class RandomIdGenerator(object):
+    """
+    Generates random IDs using a PRNG seeded from `os.urandom` once per
+    process, which is much faster than reading `os.urandom` for every
+    `uuid.uuid4()`. The PRNG is reseeded after a fork, so forked workers
+    don't generate the same IDs.
+    """
+
+    def __init__(self):
+        self._pid = None
+        self._getrandbits = None
+
+    def _random_bits(self, bits):
+        """
+        Returns random bits from the process' PRNG.
+        :param bits: number of bits
+        :return: int
+        """
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._getrandbits = random.Random(
+                random.SystemRandom().getrandbits(128)
+            ).getrandbits
+        return self._getrandbits(bits)
+
+    def generate_uuid(self):
+        """
+        Generates a random UUID string, formatted as `str(uuid.uuid4())`.
+        :return: str
+        """
+        value = '%032x' % (
+            (self._random_bits(128) & _UUID_VERSION_MASK) | _UUID_VERSION_BITS
+        )
+        return '%s-%s-%s-%s-%s' % (
+            value[:8], value[8:12], value[12:16], value[16:20], value[20:]
+        )
+
+    def generate_trace_id(self):
+        """
+        Generates a 128 bit trace ID.
+        :return: 32 chars hex str
+        """
+        return '%032x' % self._random_bits(128)
+
+    def generate_span_id(self):
+        """
+        Generates a 64 bit span ID.
+        :return: 16 chars hex str
+        """
+        return '%016x' % self._random_bits(64)
+
+
+class Uuid4IdGenerator(object):
+    """
+    Generates IDs using `uuid.uuid4()` (reads `os.urandom` for each ID).
+    """
+
+    @staticmethod
+    def generate_uuid():
+        return str(uuid.uuid4())
+
+    @staticmethod
+    def generate_trace_id():
+        return uuid.uuid4().hex
+
+    @staticmethod
+    def generate_span_id():
+        return uuid.uuid4().hex[16:]
+
+
+_id_generator = RandomIdGenerator()
+
+
+def set_id_generator(id_generator):
+    """
+    Sets the generator of all the IDs epsagon creates.
+    :param id_generator: an object implementing `generate_uuid`,
+        `generate_trace_id` and `generate_span_id`
+    :return: None
+    """
+    global _id_generator  # pylint: disable=global-statement
+    _id_generator = id_generator
+
+
+def generate_uuid():
+    """
+    Generates a random UUID string.
+    :return: str
+    """
+    return _id_generator.generate_uuid()
+
+
+def generate_trace_id():
+    """
+    Generates a 128 bit trace ID.
+    :return: 32 chars hex str
+    """
+    return _id_generator.generate_trace_id()
+
+
+def generate_span_id():
+    """
+    Generates a 64 bit span ID.
+    :return: 16 chars hex str
+    """
+    return _id_generator.generate_span_id()
@@ -0,0 +1,185 @@
+"""
+Filtering of event metadata by the ignored / allowed keys
+"""
+
+from __future__ import absolute_import
+import re
+import json
+import six
+
+# Max number of distinct keys to keep normalized, as metadata keys may come
+# from user payloads.
+MAX_CACHED_KEYS = 10000
+# Serialized values that may hold a JSON object
+JSON_TYPES = (six.text_type, bytes, bytearray, memoryview)
+_JSON_OBJECT_RE = re.compile(r'\s*\{')
+_JSON_OBJECT_BYTES_RE = re.compile(br'\s*\{')
+
+
+def normalize_key(key):
+    """
+    Strip a given key from spaces, dashes, and underscores.
+    :param key: The key to strip.
+    :return: Stripped key.
+    """
+    return (
+        str(key).lower().replace('-', '').replace('_', '').replace(' ', '')
+    )
+
+
+def _may_be_json_object(value):
+    """
+    Returns whether a str or bytes may hold a JSON object, without parsing
+    it.
+    :param value: str or bytes
+    :return: True if the first non whitespace character is `{`
+    """
+    if isinstance(value, six.text_type):
+        return _JSON_OBJECT_RE.match(value) is not None
+    return _JSON_OBJECT_BYTES_RE.match(value) is not None
+
+
+class KeyFilter(object):
+    """
+    Removes ignored keys and keeps only the branches with allowed keys, in a
+    single walk over the metadata. Built once from the configured keys.
+    """
+
+    def __init__(self, keys_to_ignore=None, keys_to_allow=None):
+        """
+        :param keys_to_ignore: list of keys to remove.
+        :param keys_to_allow: list of keys to keep, if empty all the keys are
+            kept.
+        """
+        self.keys_to_ignore = frozenset(
+            normalize_key(key) for key in keys_to_ignore or ()
+        )
+        self.keys_to_allow = frozenset(
+            normalize_key(key) for key in keys_to_allow or ()
+        )
+        self._normalized_keys = {}
+
+    def __bool__(self):
+        return bool(self.keys_to_ignore or self.keys_to_allow)
+
+    __nonzero__ = __bool__
+
+    def _normalize(self, key):
+        """
+        Returns the normalized key, cached.
+        :param key: dict key
+        :return: normalized key
+        """
+        try:
+            return self._normalized_keys[key]
+        except KeyError:
+            pass
+        except TypeError:
+            # Unhashable key
+            return normalize_key(key)
+        normalized = normalize_key(key)
+        if len(self._normalized_keys) < MAX_CACHED_KEYS:
+            self._normalized_keys[key] = normalized
+        return normalized
+
+    def filter(self, input_dict):
+        """
+        Filters a metadata dict. The input is never modified, dicts are
+        copied (shallow copy) only where a key is removed.
+        :param input_dict: Input dict to filter.
+        :return: the filtered dict
+        """
+        if not self:
+            return input_dict
+        return self._filter_dict(input_dict, not self.keys_to_allow)
+
+    def remove_ignored_keys(self, input_dict):
+        """
+        Remove ignored keys recursively in input_dict.
+        :param input_dict: Input dict to remove ignored keys from.
+        :return: a dict without the the ignored keys
+        """
+        if not self.keys_to_ignore:
+            return input_dict
+        return self._filter_dict(input_dict, True)
+
+    def get_dict_with_allow_keys(self, input_dict):
+        """
+        Keeping only the branches which contains allowed keys.
+        :param input_dict: Input dict to remove branches without allowed keys.
+        :return: a dict that contains branches which contains allowed keys
+        """
+        return self._filter_dict(input_dict, False)
+
+    def _filter_dict(self, input_dict, allowed):
+        """
+        Filters a dict recursively.
+        :param input_dict: dict to filter
+        :param allowed: whether the dict is within an allowed branch. If not,
+            only the branches containing allowed keys are kept.
+        :return: the filtered dict, or `input_dict` if nothing was filtered
+        """
+        copied_dict = None
+        for key, value in input_dict.items():
+            normalized_key = self._normalize(key)
+            if normalized_key in self.keys_to_ignore:
+                filtered_value = None
+                keep = False
+            elif allowed or normalized_key in self.keys_to_allow:
+                filtered_value = self._filter_value(value)
+                keep = True
+            elif isinstance(value, dict):
+                filtered_value = self._filter_dict(value, False)
+                keep = bool(filtered_value)
+            else:
+                filtered_value = None
+                keep = False
+
+            if keep and filtered_value is value:
+                if copied_dict is not None:
+                    copied_dict[key] = value
+                continue
+            if copied_dict is None:
+                copied_dict = {}
+                for copied_key, copied_value in input_dict.items():
+                    if copied_key is key:
+                        break
+                    copied_dict[copied_key] = copied_value
+            if keep:
+                copied_dict[key] = filtered_value
+
+        return input_dict if copied_dict is None else copied_dict
+
+    def filter_json(self, value):
+        """
+        Removes ignored keys from a JSON object serialized as str or bytes.
+        :param value: str or bytes
+        :return: the filtered JSON str, or `value` if nothing was filtered
+        """
+        if not self.keys_to_ignore or not _may_be_json_object(value):
+            return value
+        try:
+            json_value = json.loads(
+                bytes(value) if isinstance(value, memoryview) else value
+            )
+        except (TypeError, ValueError):
+            return value
+        if isinstance(json_value, dict):
+            filtered_value = self._filter_dict(json_value, True)
+            if filtered_value is not json_value:
+                return json.dumps(filtered_value)
+        return value
+
+    def _filter_value(self, value):
+        """
+        Removes ignored keys from a value of an allowed branch.
+        :param value: dict value
+        :return: the filtered value, or `value` if nothing was filtered
+        """
+        if not self.keys_to_ignore:
+            return value
+        if isinstance(value, dict):
+            return self._filter_dict(value, True)
+        if isinstance(value, JSON_TYPES):
+            return self.filter_json(value)
+        return value
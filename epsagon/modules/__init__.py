@@ -1,14 +1,15 @@
 """
-Automatically imports all available modules for patch
+Lists all available modules for patch.
+The modules are imported only when the library they instrument is imported.
 """
 
 from __future__ import absolute_import
 import os
 import sys
-from importlib import import_module
 
+# Library name -> the instrumentation module patching it
 MODULES = {}
-IGNORE_MODULES = ('__init__',)
+IGNORE_MODULES = ('__init__', 'general_wrapper', 'db_wrapper')
 PYTHON_EXTENSIONS = ('.py', '.pyc')
 VERSION_DEPENDENCIES = {
     'fastapi': (3, 5, 3),
@@ -24,8 +25,4 @@ for module_name in os.listdir(os.path.dirname(__file__)):
         if sys.version_info < VERSION_DEPENDENCIES[filename]:
             continue
 
-    try:
-        imported = import_module('.{}'.format(filename), __name__)
-        MODULES[filename] = imported
-    except ImportError:
-        pass
+    MODULES[filename] = '{}.{}'.format(__name__, filename)
@@ -4,7 +4,6 @@ botocore patcher module.
 
 from __future__ import absolute_import
 import json
-from uuid import uuid4
 import wrapt
 from epsagon.modules.general_wrapper import wrapper
 from epsagon.constants import STEP_DICT_NAME
@@ -13,6 +12,7 @@ from ..events.botocore import (
     BotocoreStepFunctionEvent
 )
 from .requests import _wrapper as _requests_wrapper
+from ..id_generator import generate_uuid
 
 
 def _wrapper(wrapped, instance, args, kwargs):
@@ -33,7 +33,7 @@ def _wrapper(wrapped, instance, args, kwargs):
 
 def add_steps_dict_to_request(request_args, params_property_name):
     machine_input = json.loads(request_args[params_property_name])
-    machine_input[STEP_DICT_NAME] = {'id': str(uuid4()), 'step_num': -1}
+    machine_input[STEP_DICT_NAME] = {'id': generate_uuid(), 'step_num': -1}
     request_args[params_property_name] = json.dumps(machine_input)
 
 
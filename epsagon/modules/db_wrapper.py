@@ -2,9 +2,18 @@
 Wrapper for DB modules
 """
 from __future__ import absolute_import
+import time
+import traceback
 import wrapt
 import epsagon.modules.general_wrapper
-from ..events.dbapi import DBAPIEventFactory
+from ..trace import trace_factory
+from ..constants import DBAPI_FETCH_TIMING
+from ..events.dbapi import (
+    DBAPIEventFactory,
+    DBAPIBatchEventFactory,
+    DBAPIProcedureEventFactory,
+)
+from ..dbapi_utils import ParameterSetsSummary
 
 
 # pylint: disable=abstract-method
@@ -16,6 +25,7 @@ class CursorWrapper(wrapt.ObjectProxy):
     def __init__(self, cursor, connection_wrapper):
         super(CursorWrapper, self).__init__(cursor)
         self._self_connection = connection_wrapper
+        self._self_fetched_event = None
 
     @property
     def connection_wrapper(self):
@@ -25,15 +35,27 @@ class CursorWrapper(wrapt.ObjectProxy):
         """
         return self._self_connection
 
-    # NOTE: tracing other API calls currently not supported
-    # (as 'executemany' and 'callproc')
+    @property
+    def fetched_event(self):
+        """
+        The event of the query whose results the cursor fetches.
+        :return: DBAPIEvent, or None
+        """
+        return self._self_fetched_event
+
+    @fetched_event.setter
+    def fetched_event(self, event):
+        self._self_fetched_event = event
+
     def execute(self, *args, **kwargs):
         """
         Execute the query.
         :param args: args.
         :param kwargs: kwargs.
+        :return: the cursor's execute return value.
         """
-        epsagon.modules.general_wrapper.wrapper(
+        self._self_fetched_event = None
+        return epsagon.modules.general_wrapper.wrapper(
             DBAPIEventFactory,
             self.__wrapped__.execute,
             self,
@@ -41,6 +63,42 @@ class CursorWrapper(wrapt.ObjectProxy):
             kwargs,
         )
 
+    def executemany(self, *args, **kwargs):
+        """
+        Execute the query against all the parameter sets, traced as a single
+        event. The parameter sets are counted, not kept.
+        :param args: args.
+        :param kwargs: kwargs.
+        :return: the cursor's executemany return value.
+        """
+        self._self_fetched_event = None
+        parameters_summary = ParameterSetsSummary()
+        if len(args) > 1:
+            args = (args[0], parameters_summary.track(args[1])) + args[2:]
+        return epsagon.modules.general_wrapper.wrapper(
+            DBAPIBatchEventFactory(parameters_summary),
+            self.__wrapped__.executemany,
+            self,
+            args,
+            kwargs,
+        )
+
+    def callproc(self, *args, **kwargs):
+        """
+        Call a stored procedure.
+        :param args: args.
+        :param kwargs: kwargs.
+        :return: the cursor's callproc return value.
+        """
+        self._self_fetched_event = None
+        return epsagon.modules.general_wrapper.wrapper(
+            DBAPIProcedureEventFactory,
+            self.__wrapped__.callproc,
+            self,
+            args,
+            kwargs,
+        )
+
     def __enter__(self):
         # raise appropriate error if api not supported (should reach the user)
         self.__wrapped__.__enter__  # pylint: disable=W0104
@@ -48,6 +106,111 @@ class CursorWrapper(wrapt.ObjectProxy):
         return self
 
 
+def trace_fetch(cursor, wrapped, args, kwargs=None, single=False):
+    """
+    Calls a cursor fetch method, and adds its duration and rows to the
+    event of the executed query.
+    :param cursor: the cursor
+    :param wrapped: the fetch method
+    :param args: the fetch method args
+    :param kwargs: the fetch method kwargs
+    :param single: whether the method returns a single row
+    :return: the fetch method return value
+    """
+    kwargs = kwargs or {}
+    event = cursor.fetched_event
+    if event is None:
+        return wrapped(*args, **kwargs)
+    start_time = time.time()
+    rows = wrapped(*args, **kwargs)
+    try:
+        if single:
+            event.add_fetch(
+                time.time() - start_time,
+                [] if rows is None else [rows]
+            )
+        else:
+            event.add_fetch(time.time() - start_time, rows)
+    except Exception as instrumentation_exception:  # pylint: disable=W0703
+        trace_factory.add_exception(
+            instrumentation_exception,
+            traceback.format_exc()
+        )
+    return rows
+
+
+class _FetchMethods(object):
+    """
+    Cursor wrapper methods tracing the fetching of the query results, into
+    the `fetched_event` of the cursor.
+    """
+    # Mixed into cursor proxies, which have `__wrapped__`.
+    # pylint: disable=no-member
+
+    def fetchone(self, *args, **kwargs):
+        """
+        Fetch the next row.
+        :return: the row.
+        """
+        return trace_fetch(
+            self,
+            self.__wrapped__.fetchone,
+            args,
+            kwargs,
+            single=True
+        )
+
+    def fetchmany(self, *args, **kwargs):
+        """
+        Fetch the next rows.
+        :return: list of the rows.
+        """
+        return trace_fetch(self, self.__wrapped__.fetchmany, args, kwargs)
+
+    def fetchall(self, *args, **kwargs):
+        """
+        Fetch the remaining rows.
+        :return: list of the rows.
+        """
+        return trace_fetch(self, self.__wrapped__.fetchall, args, kwargs)
+
+    def __iter__(self):
+        iterator = iter(self.__wrapped__)
+        while True:
+            try:
+                row = trace_fetch(self, next, (iterator,), single=True)
+            except StopIteration:
+                return
+            yield row
+
+
+# pylint: disable=abstract-method
+class FetchCursorWrapper(_FetchMethods, CursorWrapper):
+    """
+    A dbapi cursor wrapper, tracing the fetching of the query results too.
+    """
+
+
+# pylint: disable=abstract-method
+class ResultCursorWrapper(_FetchMethods, wrapt.ObjectProxy):
+    """
+    A dbapi cursor wrapper, tracing only the fetching of the results of a
+    query already executed, for cursors that aren't instrumented.
+    """
+
+    def __init__(self, cursor, fetched_event):
+        super(ResultCursorWrapper, self).__init__(cursor)
+        self._self_fetched_event = fetched_event
+
+    @property
+    def fetched_event(self):
+        """
+        The event of the query whose results the cursor fetches.
+        :return: the event
+        """
+        return self._self_fetched_event
+
+
 class ConnectionWrapper(wrapt.ObjectProxy):
     """
     A dbapi connection wrapper for tracing.
@@ -65,6 +228,8 @@ class ConnectionWrapper(wrapt.ObjectProxy):
         :return: Cursorwrapper.
         """
         cursor = self.__wrapped__.cursor(*args, **kwargs)
+        if DBAPI_FETCH_TIMING:
+            return FetchCursorWrapper(cursor, self)
         return CursorWrapper(cursor, self)
 
     @property
@@ -4,6 +4,7 @@ fastapi patcher module.
 
 from __future__ import absolute_import
 import wrapt
+from ..wrappers.asgi import close_asyncio_transports
 from ..wrappers.fastapi import (
     exception_handler_wrapper,
     server_call_wrapper,
@@ -30,6 +31,24 @@ def _exception_handler_wrapper(wrapped, _instance, args, kwargs):
     return wrapped(*args, **kwargs)
 
 
+def _application_init_wrapper(wrapped, instance, args, kwargs):
+    """
+    Registers a shutdown handler sending the traces still queued by the
+    asyncio transports.
+    :param wrapped: wrapt's wrapped
+    :param instance: wrapt's instance
+    :param args: wrapt's args
+    :param kwargs: wrapt's kwargs
+    """
+    result = wrapped(*args, **kwargs)
+    if (
+        not is_lambda_env() and
+        close_asyncio_transports not in instance.router.on_shutdown
+    ):
+        instance.add_event_handler('shutdown', close_asyncio_transports)
+    return result
+
+
 def patch():
     """
     Patch module.
@@ -40,6 +59,16 @@ def patch():
         'APIRoute.__init__',
         route_class_wrapper
     )
+    wrapt.wrap_function_wrapper(
+        'fastapi.applications',
+        'FastAPI.__init__',
+        _application_init_wrapper
+    )
+    wrapt.wrap_function_wrapper(
+        'starlette.applications',
+        'Starlette.__init__',
+        _application_init_wrapper
+    )
     wrapt.wrap_function_wrapper(
         'starlette.applications',
         'Starlette.add_exception_handler',
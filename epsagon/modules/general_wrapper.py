@@ -31,8 +31,40 @@ def wrapper(factory, wrapped, instance, args, kwargs):
         exception = operation_exception
         raise
     finally:
-        try:
-            factory.create_event(
+        create_event(
+            factory,
+            wrapped,
+            instance,
+            args,
+            kwargs,
+            start_time,
+            response,
+            exception
+        )
+
+
+def create_event(factory, wrapped, instance, args, kwargs, start_time,
+                 response, exception):
+    """
+    Creates the event of a terminated operation, for operations which
+    terminate after their call returns (like asynchronous queries).
+    :param factory: Factory class for the event type
+    :param wrapped: the called operation
+    :param instance: the operation instance
+    :param args: the operation args
+    :param kwargs: the operation kwargs
+    :param start_time: Start timestamp (epoch)
+    :param response: the operation response
+    :param exception: Exception (if occurred)
+    :return: the return value of the factory, None if no event was created
+    """
+    try:
+        if exception is not None:
+            # Errors are always collected, even for dropped traces.
+            trace_factory.keep_trace()
+        # Skip the event of a trace dropped by sampling.
+        if not trace_factory.is_sampled_out():
+            return factory.create_event(
                 wrapped,
                 instance,
                 args,
@@ -41,8 +73,9 @@ def wrapper(factory, wrapped, instance, args, kwargs):
                 response,
                 exception
             )
-        except Exception as instrumentation_exception:
-            trace_factory.add_exception(
-                instrumentation_exception,
-                traceback.format_exc()
-            )
+    except Exception as instrumentation_exception:
+        trace_factory.add_exception(
+            instrumentation_exception,
+            traceback.format_exc()
+        )
+    return None
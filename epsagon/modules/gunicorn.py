@@ -5,7 +5,6 @@ Gunicorn patcher module.
 from __future__ import absolute_import
 import warnings
 import time
-import uuid
 import traceback
 
 try:
@@ -52,6 +51,7 @@ from epsagon.utils import collect_container_metadata
 from ..event import BaseEvent
 from ..http_filters import ignore_request
 from ..utils import add_data_if_needed
+from ..id_generator import generate_uuid
 
 
 class GunicornRunner(BaseEvent):
@@ -71,7 +71,7 @@ class GunicornRunner(BaseEvent):
         """
         super(GunicornRunner, self).__init__(start_time)
 
-        self.event_id = str(uuid.uuid4())
+        self.event_id = generate_uuid()
 
         self.resource['name'] = 'localhost'
         if hasattr(request, 'headers'):
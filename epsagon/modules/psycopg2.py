@@ -1,16 +1,385 @@
 """
-psycopg2 patcher module
+psycopg2 patcher module.
+Connections are created with instrumented `connection_factory` and
+`cursor_factory` subclasses, rather than wrapped with proxies.
 """
+# The cursor overrides every traced psycopg2 method, next to the unwrappers
+# of proxied connections.
+# pylint: disable=too-many-lines
 from __future__ import absolute_import
 
+import time
+import threading
+import psycopg2
+import psycopg2.extensions
 import wrapt
-from .db_wrapper import connect_wrapper
+import epsagon.modules.general_wrapper
+from .db_wrapper import connect_wrapper, trace_fetch
+from ..events.dbapi import (
+    DBAPIEventFactory,
+    DBAPIBatchEventFactory,
+    DBAPIProcedureEventFactory,
+    DBAPICopyEventFactory,
+)
+from ..dbapi_utils import ParameterSetsSummary, track_copy_file
+from ..constants import DBAPI_FETCH_TIMING
+
+# Instrumented subclass, per connection or cursor factory.
+_INSTRUMENTED_CLASSES = {}
+_INSTRUMENTED_CLASSES_LOCK = threading.Lock()
+
+
+def _instrumented_class(cls, base, instrumented_base):
+    """
+    Returns the instrumented subclass of a connection or cursor class.
+    :param cls: the connection or cursor class
+    :param base: the psycopg2 class `cls` should be a subclass of
+    :param instrumented_base: the instrumented subclass of `base`
+    :return: the instrumented class, or None if `cls` can't be instrumented
+    """
+    if not isinstance(cls, type) or not issubclass(cls, base):
+        # A factory function
+        return None
+    if issubclass(instrumented_base, cls):
+        return instrumented_base
+    if issubclass(cls, instrumented_base):
+        return cls
+    key = (cls, instrumented_base)
+    instrumented_class = _INSTRUMENTED_CLASSES.get(key)
+    if instrumented_class is None:
+        with _INSTRUMENTED_CLASSES_LOCK:
+            instrumented_class = _INSTRUMENTED_CLASSES.get(key)
+            if instrumented_class is None:
+                instrumented_class = type(
+                    cls.__name__,
+                    (cls, instrumented_base),
+                    {'__module__': cls.__module__},
+                )
+                _INSTRUMENTED_CLASSES[key] = instrumented_class
+    return instrumented_class
+
+
+def _poll_connection(connection, poll):
+    """
+    Polls an asynchronous connection, and creates the event of its pending
+    query once it is done.
+    :param connection: the EpsagonConnection
+    :param poll: the poll function
+    :return: the poll return value
+    """
+    try:
+        state = poll()
+    except Exception as exception:
+        _finish_pending(connection, exception)
+        raise
+    if state == psycopg2.extensions.POLL_OK:
+        _finish_pending(connection, None)
+    return state
+
+
+def _finish_pending(connection, exception):
+    """
+    Creates the event of the pending query of an asynchronous connection.
+    :param connection: the EpsagonConnection
+    :param exception: Exception (if occurred)
+    :return: None
+    """
+    pending = connection._epsagon_pending  # pylint: disable=protected-access
+    if pending is None:
+        return
+    connection._epsagon_pending = None  # pylint: disable=protected-access
+    cursor, factory, wrapped, args, kwargs, start_time = pending
+    epsagon.modules.general_wrapper.create_event(
+        factory,
+        wrapped,
+        cursor,
+        args,
+        kwargs,
+        start_time,
+        None,
+        exception,
+    )
+
+
+class EpsagonConnection(psycopg2.extensions.connection):
+    """
+    An instrumented psycopg2 connection, creating instrumented cursors.
+    """
+
+    _epsagon_pending = None
+
+    def cursor(self, *args, **kwargs):
+        """
+        Return an instrumented cursor.
+        :param args: args.
+        :param kwargs: kwargs.
+        :return: the cursor.
+        """
+        if len(args) > 1:
+            cursor_factory = args[1]
+        else:
+            cursor_factory = kwargs.get('cursor_factory')
+        cursor_factory = (
+            cursor_factory or
+            self.cursor_factory or
+            psycopg2.extensions.cursor
+        )
+        instrumented_factory = _instrumented_class(
+            cursor_factory,
+            psycopg2.extensions.cursor,
+            EpsagonFetchCursor if DBAPI_FETCH_TIMING else EpsagonCursor
+        )
+        if instrumented_factory is not None:
+            if len(args) > 1:
+                args = (args[0], instrumented_factory) + args[2:]
+            else:
+                kwargs['cursor_factory'] = instrumented_factory
+        return super(EpsagonConnection, self).cursor(*args, **kwargs)
+
+    def poll(self):
+        """
+        Poll the connection, and trace an asynchronous query once it is done.
+        :return: the poll state.
+        """
+        return _poll_connection(self, super(EpsagonConnection, self).poll)
+
+
+class EpsagonCursor(psycopg2.extensions.cursor):
+    """
+    An instrumented psycopg2 cursor.
+    """
+
+    # The event of the query whose results the cursor fetches
+    fetched_event = None
+
+    @property
+    def connection_wrapper(self):
+        """
+        The connection of the cursor, for the dbapi events.
+        :return: the connection.
+        """
+        return self.connection
+
+    def _trace(self, factory, wrapped, args, kwargs):
+        """
+        Calls a cursor method and traces it. Queries of asynchronous
+        connections are traced once they are done.
+        :param factory: Factory of the event
+        :param wrapped: the cursor method
+        :param args: args.
+        :param kwargs: kwargs.
+        :return: the method return value.
+        """
+        self.fetched_event = None
+        if not getattr(self.connection, 'async_', False):
+            return epsagon.modules.general_wrapper.wrapper(
+                factory,
+                wrapped,
+                self,
+                args,
+                kwargs,
+            )
+
+        start_time = time.time()
+        try:
+            response = wrapped(*args, **kwargs)
+        except Exception as exception:
+            epsagon.modules.general_wrapper.create_event(
+                factory,
+                wrapped,
+                self,
+                args,
+                kwargs,
+                start_time,
+                None,
+                exception,
+            )
+            raise
+        # pylint: disable=protected-access
+        self.connection._epsagon_pending = (
+            self, factory, wrapped, args, kwargs, start_time
+        )
+        return response
+
+    def execute(self, *args, **kwargs):
+        """
+        Execute the query.
+        :param args: args.
+        :param kwargs: kwargs.
+        :return: the cursor's execute return value.
+        """
+        return self._trace(
+            DBAPIEventFactory,
+            super(EpsagonCursor, self).execute,
+            args,
+            kwargs,
+        )
+
+    def executemany(self, *args, **kwargs):
+        """
+        Execute the query against all the parameter sets, traced as a single
+        event.
+        :param args: args.
+        :param kwargs: kwargs.
+        :return: the cursor's executemany return value.
+        """
+        parameters_summary = ParameterSetsSummary()
+        if len(args) > 1:
+            args = (args[0], parameters_summary.track(args[1])) + args[2:]
+        return self._trace(
+            DBAPIBatchEventFactory(parameters_summary),
+            super(EpsagonCursor, self).executemany,
+            args,
+            kwargs,
+        )
+
+    def callproc(self, *args, **kwargs):
+        """
+        Call a stored procedure.
+        :param args: args.
+        :param kwargs: kwargs.
+        :return: the cursor's callproc return value.
+        """
+        return self._trace(
+            DBAPIProcedureEventFactory,
+            super(EpsagonCursor, self).callproc,
+            args,
+            kwargs,
+        )
+
+    def _copy(self, wrapped, file_index, args, kwargs):
+        """
+        Runs a `COPY` and traces it with the number of copied bytes.
+        :param wrapped: the cursor copy method
+        :param file_index: index of the file argument
+        :param args: args.
+        :param kwargs: kwargs.
+        :return: the copy method return value.
+        """
+        if len(args) > file_index:
+            copy_file = track_copy_file(args[file_index])
+            args = args[:file_index] + (copy_file,) + args[file_index + 1:]
+        elif 'file' in kwargs:
+            copy_file = track_copy_file(kwargs['file'])
+            kwargs['file'] = copy_file
+        else:
+            return wrapped(*args, **kwargs)
+        return epsagon.modules.general_wrapper.wrapper(
+            DBAPICopyEventFactory(copy_file),
+            wrapped,
+            self,
+            args,
+            kwargs,
+        )
+
+    def copy_expert(self, *args, **kwargs):
+        """
+        Run a `COPY` statement.
+        :param args: args.
+        :param kwargs: kwargs.
+        :return: the cursor's copy_expert return value.
+        """
+        return self._copy(
+            super(EpsagonCursor, self).copy_expert,
+            1,
+            args,
+            kwargs,
+        )
+
+    def copy_from(self, *args, **kwargs):
+        """
+        Copy a file to a table.
+        :param args: args.
+        :param kwargs: kwargs.
+        :return: the cursor's copy_from return value.
+        """
+        return self._copy(
+            super(EpsagonCursor, self).copy_from,
+            0,
+            args,
+            kwargs,
+        )
+
+    def copy_to(self, *args, **kwargs):
+        """
+        Copy a table to a file.
+        :param args: args.
+        :param kwargs: kwargs.
+        :return: the cursor's copy_to return value.
+        """
+        return self._copy(
+            super(EpsagonCursor, self).copy_to,
+            0,
+            args,
+            kwargs,
+        )
+
+    def poll(self):
+        """
+        Poll the connection, and trace an asynchronous query once it is done.
+        :return: the poll state.
+        """
+        return _poll_connection(
+            self.connection,
+            super(EpsagonCursor, self).poll
+        )
+
+
+class EpsagonFetchCursor(EpsagonCursor):
+    """
+    An instrumented psycopg2 cursor, tracing the fetching of the query
+    results too.
+    """
+
+    def fetchone(self):
+        """
+        Fetch the next row.
+        :return: the row.
+        """
+        return trace_fetch(
+            self,
+            super(EpsagonFetchCursor, self).fetchone,
+            (),
+            single=True
+        )
+
+    def fetchmany(self, *args, **kwargs):
+        """
+        Fetch the next rows.
+        :return: list of the rows.
+        """
+        return trace_fetch(
+            self,
+            super(EpsagonFetchCursor, self).fetchmany,
+            args,
+            kwargs
+        )
+
+    def fetchall(self):
+        """
+        Fetch the remaining rows.
+        :return: list of the rows.
+        """
+        return trace_fetch(
+            self,
+            super(EpsagonFetchCursor, self).fetchall,
+            ()
+        )
+
+    def __next__(self):
+        return trace_fetch(
+            self,
+            super(EpsagonFetchCursor, self).__next__,
+            (),
+            single=True
+        )
 
 
 #pylint: disable=W0613
 def _register_type_wrapper(wrapped, instance, args, kwargs):
     """
-    register_type wrapper for psycopg2 instrumentation
+    register_type wrapper for psycopg2 instrumentation, strips the proxy of
+    connections created by a connection factory function.
     :param wrapped: wrapt's wrapped
     :param instance: wrapt's instance
     :param args: wrapt's args
@@ -72,7 +441,8 @@ def _adapt_wrapper(wrapped, instance, args, kwargs):
 def _patch_unwrappers():
     """
     patches the functions that do not accept our ObjectProxy to strip the proxy
-    before calling the function
+    before calling the function. Only connections created by a connection
+    factory function are proxied, see `_connect_wrapper`.
     :return:
     """
 
@@ -101,6 +471,36 @@ def _patch_unwrappers():
     )
 
 
+def _connect_wrapper(wrapped, instance, args, kwargs):
+    """
+    connect wrapper for psycopg2 instrumentation, creating the connection
+    with an instrumented connection factory.
+    :param wrapped: wrapt's wrapped
+    :param instance: wrapt's instance
+    :param args: wrapt's args
+    :param kwargs: wrapt's kwargs
+    :return: the connection
+    """
+    if len(args) > 1:
+        connection_factory = args[1]
+    else:
+        connection_factory = kwargs.get('connection_factory')
+    instrumented_factory = _instrumented_class(
+        connection_factory or psycopg2.extensions.connection,
+        psycopg2.extensions.connection,
+        EpsagonConnection
+    )
+    if instrumented_factory is None:
+        # A connection factory function, its connections are proxied
+        return connect_wrapper(wrapped, instance, args, kwargs)
+
+    if len(args) > 1:
+        args = (args[0], instrumented_factory) + args[2:]
+    else:
+        kwargs['connection_factory'] = instrumented_factory
+    return wrapped(*args, **kwargs)
+
+
 def patch():
     """
     patch module.
@@ -110,6 +510,6 @@ def patch():
     wrapt.wrap_function_wrapper(
         'psycopg2',
         'connect',
-        connect_wrapper
+        _connect_wrapper
     )
     _patch_unwrappers()
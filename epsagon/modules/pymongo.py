@@ -1,54 +1,216 @@
 """
 pymongo patcher module.
+Every command sent to MongoDB is captured using pymongo's command monitoring,
+so all the collection methods, cursors and bulk operations are covered
+without wrapping them.
 """
 
 from __future__ import absolute_import
-import wrapt
-from epsagon.modules.general_wrapper import wrapper
+import time
+import threading
+import traceback
+import weakref
+from collections import OrderedDict
+from pymongo import monitoring
+from epsagon.trace import trace_factory
 from ..events.pymongo import PyMongoEventFactory
 
+# Connection handshake, authentication and session commands
+IGNORED_COMMANDS = frozenset([
+    'hello',
+    'isMaster',
+    'ismaster',
+    'ping',
+    'saslStart',
+    'saslContinue',
+    'authenticate',
+    'getnonce',
+    'endSessions',
+    'buildInfo',
+])
 
-def _wrapper(wrapped, instance, args, kwargs):
+# Max started commands, and max open cursors, tracked at once
+MAX_TRACKED_COMMANDS = 1000
+
+
+class CommandListener(monitoring.CommandListener):
     """
-    General wrapper for pymongo instrumentation.
-    :param wrapped: wrapt's wrapped
-    :param instance: wrapt's instance
-    :param args: wrapt's args
-    :param kwargs: wrapt's kwargs
-    :return: None
+    Creates an event for every MongoDB command. getMore commands are added
+    to the event of the command that opened the cursor, while that event is
+    in the current trace, and get their own event otherwise.
     """
 
-    return wrapper(PyMongoEventFactory, wrapped, instance, args, kwargs)
+    def __init__(self):
+        # (connection id, request id) -> (event, cursor id of a getMore)
+        self._started = OrderedDict()
+        # cursor id -> (weak reference to the trace, event of the command
+        # that opened the cursor)
+        self._cursors = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _command_key(command_event):
+        return command_event.connection_id, command_event.request_id
+
+    def _track(self, tracked, key, value):
+        """
+        Adds a value to a bounded tracking dict.
+        :param tracked: the dict
+        :param key: key
+        :param value: value
+        :return: None
+        """
+        with self._lock:
+            tracked[key] = value
+            if len(tracked) > MAX_TRACKED_COMMANDS:
+                tracked.popitem(last=False)
+
+    def _cursor_event(self, cursor_id, exhausted=False):
+        """
+        Returns the event of a tracked cursor, if it is still in the current
+        trace. A cursor of a sent trace is no longer tracked.
+        :param cursor_id: the cursor id
+        :param exhausted: True to stop tracking the cursor
+        :return: the event, or None
+        """
+        with self._lock:
+            trace_ref, cursor_event = self._cursors.get(
+                cursor_id, (None, None)
+            )
+            if trace_ref is None:
+                return None
+            trace = trace_ref()
+            is_current = (
+                trace is not None and trace is trace_factory.get_trace()
+            )
+            if exhausted or not is_current:
+                self._cursors.pop(cursor_id, None)
+        return cursor_event if is_current else None
+
+    def _track_cursor(self, cursor_id, mongo_event):
+        """
+        Tracks the cursor opened by a command, so its next batches are
+        added to the command event. Events aggregated by the events caps
+        can't be updated, so their cursors are not tracked.
+        :param cursor_id: the cursor id
+        :param mongo_event: the event, already added to the trace
+        :return: None
+        """
+        trace = trace_factory.get_trace()
+        if trace and trace.events and trace.events[-1] is mongo_event:
+            self._track(
+                self._cursors,
+                cursor_id,
+                (weakref.ref(trace), mongo_event),
+            )
+
+    def started(self, event):
+        """
+        Creates the event of a command.
+        :param event: pymongo's `CommandStartedEvent`
+        :return: None
+        """
+        try:
+            if (
+                event.command_name in IGNORED_COMMANDS or
+                trace_factory.is_sampled_out()
+            ):
+                return
+
+            if event.command_name == 'getMore':
+                cursor_id = event.command.get('getMore')
+                if self._cursor_event(cursor_id) is not None:
+                    self._track(
+                        self._started,
+                        self._command_key(event),
+                        (None, cursor_id),
+                    )
+                    return
+
+            self._track(
+                self._started,
+                self._command_key(event),
+                (PyMongoEventFactory.create_event(event, time.time()), None),
+            )
+        except Exception as exception:  # pylint: disable=broad-except
+            trace_factory.add_exception(exception, traceback.format_exc())
+
+    def succeeded(self, event):
+        """
+        Adds the reply to the event of the command.
+        :param event: pymongo's `CommandSucceededEvent`
+        :return: None
+        """
+        try:
+            with self._lock:
+                mongo_event, cursor_id = self._started.pop(
+                    self._command_key(event), (None, None)
+                )
+
+            reply = event.reply
+            cursor = reply.get('cursor')
+            next_cursor_id = (
+                cursor.get('id') if isinstance(cursor, dict) else None
+            )
+            duration = event.duration_micros / 1e6
+
+            if cursor_id is not None:
+                # getMore of a tracked cursor
+                cursor_event = self._cursor_event(
+                    cursor_id, exhausted=not next_cursor_id
+                )
+                if cursor_event is not None:
+                    cursor_event.add_batch(reply, duration)
+                return
+            if mongo_event is None:
+                return
+
+            mongo_event.update_response(reply, duration)
+            PyMongoEventFactory.add_event(mongo_event)
+            if next_cursor_id:
+                self._track_cursor(next_cursor_id, mongo_event)
+        except Exception as exception:  # pylint: disable=broad-except
+            trace_factory.add_exception(exception, traceback.format_exc())
+
+    def failed(self, event):
+        """
+        Sets the failure on the event of the command.
+        :param event: pymongo's `CommandFailedEvent`
+        :return: None
+        """
+        try:
+            with self._lock:
+                mongo_event, cursor_id = self._started.pop(
+                    self._command_key(event), (None, None)
+                )
+
+            duration = event.duration_micros / 1e6
+            if cursor_id is not None:
+                # getMore of a tracked cursor
+                mongo_event = self._cursor_event(cursor_id, exhausted=True)
+                if mongo_event is not None:
+                    trace_factory.keep_trace()
+                    mongo_event.set_failure(
+                        event.failure, mongo_event.duration + duration
+                    )
+                return
+            if mongo_event is None:
+                return
+
+            # Errors are always collected, even for dropped traces.
+            trace_factory.keep_trace()
+            mongo_event.set_failure(event.failure, duration)
+            PyMongoEventFactory.add_event(mongo_event)
+        except Exception as exception:  # pylint: disable=broad-except
+            trace_factory.add_exception(exception, traceback.format_exc())
 
 
 def patch():
     """
     Patch module.
+    Registers the command listener, used by all `MongoClient`s created
+    from now on.
     :return: None
     """
 
-    wrapt.wrap_function_wrapper(
-        'pymongo.collection',
-        'Collection.insert_one',
-        _wrapper
-    )
-    wrapt.wrap_function_wrapper(
-        'pymongo.collection',
-        'Collection.insert_many',
-        _wrapper
-    )
-    wrapt.wrap_function_wrapper(
-        'pymongo.collection',
-        'Collection.find',
-        _wrapper
-    )
-    wrapt.wrap_function_wrapper(
-        'pymongo.collection',
-        'Collection.update_one',
-        _wrapper
-    )
-    wrapt.wrap_function_wrapper(
-        'pymongo.collection',
-        'Collection.delete_many',
-        _wrapper
-    )
+    monitoring.register(CommandListener())
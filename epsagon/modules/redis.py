@@ -3,10 +3,13 @@ Redis patcher module.
 """
 
 from __future__ import absolute_import
-import copy
 import wrapt
 from epsagon.modules.general_wrapper import wrapper
-from ..events.redis import RedisSingleEventFactory, RedisMultiEventFactory
+from ..events.redis import (
+    RedisSingleEventFactory,
+    RedisMultiEventFactory,
+    snapshot_command_stack,
+)
 
 
 def _single_wrapper(wrapped, instance, args, kwargs):
@@ -30,8 +33,13 @@ def _multi_wrapper(wrapped, instance, args, kwargs):
     :param kwargs: wrapt's kwargs
     :return: None
     """
-    RedisMultiEventFactory.LAST_STACK = copy.deepcopy(instance.command_stack)
-    return wrapper(RedisMultiEventFactory, wrapped, instance, args, kwargs)
+    # The pipeline resets its command stack once executed
+    try:
+        stack_snapshot = snapshot_command_stack(instance.command_stack)
+    except Exception:  # pylint: disable=broad-except
+        stack_snapshot = ([], 0, 0)
+    factory = RedisMultiEventFactory(stack_snapshot)
+    return wrapper(factory, wrapped, instance, args, kwargs)
 
 
 def patch():
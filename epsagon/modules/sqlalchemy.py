@@ -3,9 +3,24 @@ sqlalchemy patcher module
 """
 from __future__ import absolute_import
 
-from epsagon.modules.general_wrapper import wrapper
-from ..events.sqlalchemy import SqlAlchemyEventFactory
+import time
+import traceback
+import wrapt
+from epsagon.modules.general_wrapper import wrapper, create_event
+from ..trace import trace_factory
+from ..events.sqlalchemy import (
+    SqlAlchemyEventFactory,
+    SqlAlchemyStatementEventFactory,
+    SqlAlchemyPoolEventFactory,
+    POOL_URLS,
+    add_pool_checkin,
+)
 from ..utils import patch_once
+from ..constants import DBAPI_FETCH_TIMING
+from .db_wrapper import ResultCursorWrapper
+
+# Start time of the statement being executed, in the connection info
+START_TIME_KEY = 'epsagon_start_time'
 
 
 def _wrapper(wrapped, instance, args, kwargs):
@@ -19,11 +34,144 @@ def _wrapper(wrapped, instance, args, kwargs):
     """
     return wrapper(SqlAlchemyEventFactory, wrapped, instance, args, kwargs)
 
+
+def _is_traced_cursor(cursor):
+    """
+    Returns whether a DBAPI cursor is instrumented already, in which case
+    its statements are traced by the DBAPI events.
+    :param cursor: the DBAPI cursor
+    """
+    return getattr(cursor, 'connection_wrapper', None) is not None
+
+
+# pylint: disable=W0613
+def _before_cursor_execute(connection, cursor, statement, parameters,
+                           context, executemany):
+    """
+    `before_cursor_execute` engine event listener.
+    """
+    if not _is_traced_cursor(cursor):
+        connection.info[START_TIME_KEY] = time.time()
+
+
+def _after_cursor_execute(connection, cursor, statement, parameters, context,
+                          executemany):
+    """
+    `after_cursor_execute` engine event listener, creates the statement
+    event. With fetch timing, the cursor SQLAlchemy fetches the results
+    from is wrapped, as the driver isn't instrumented.
+    """
+    start_time = connection.info.pop(START_TIME_KEY, None)
+    if start_time is None:
+        return
+    event = create_event(
+        SqlAlchemyStatementEventFactory,
+        None,
+        connection,
+        (cursor, statement, parameters, context, executemany),
+        {},
+        start_time,
+        None,
+        None,
+    )
+    if (
+        DBAPI_FETCH_TIMING and
+        event is not None and
+        context is not None and
+        cursor.description is not None
+    ):
+        context.cursor = ResultCursorWrapper(cursor, event)
+
+
+def _handle_error(exception_context):
+    """
+    `handle_error` engine event listener, creates the event of a failed
+    statement.
+    """
+    connection = exception_context.connection
+    if connection is None or exception_context.statement is None:
+        return
+    start_time = connection.info.pop(START_TIME_KEY, None)
+    if start_time is None:
+        return
+    context = exception_context.execution_context
+    create_event(
+        SqlAlchemyStatementEventFactory,
+        None,
+        connection,
+        (
+            exception_context.cursor,
+            exception_context.statement,
+            exception_context.parameters,
+            context,
+            getattr(context, 'executemany', False),
+        ),
+        {},
+        start_time,
+        None,
+        exception_context.original_exception,
+    )
+
+
+def _engine_init_wrapper(wrapped, instance, args, kwargs):
+    """
+    Engine.__init__ wrapper, keeps the URL of the engine pool.
+    :param wrapped: wrapt's wrapped
+    :param instance: wrapt's instance
+    :param args: wrapt's args
+    :param kwargs: wrapt's kwargs
+    :return: None
+    """
+    wrapped(*args, **kwargs)
+    try:
+        POOL_URLS[instance.pool] = instance.url
+    except Exception as instrumentation_exception:  # pylint: disable=W0703
+        trace_factory.add_exception(
+            instrumentation_exception,
+            traceback.format_exc()
+        )
+
+
+def _checkout_wrapper(wrapped, instance, args, kwargs):
+    """
+    Connection checkout wrapper, times the wait for a pool connection.
+    :param wrapped: wrapt's wrapped
+    :param instance: wrapt's instance
+    :param args: wrapt's args
+    :param kwargs: wrapt's kwargs
+    :return: the checked out connection
+    """
+    return wrapper(SqlAlchemyPoolEventFactory, wrapped, instance, args, kwargs)
+
+
+def _checkin_wrapper(wrapped, instance, args, kwargs):
+    """
+    Pool connection checkin wrapper.
+    :param wrapped: wrapt's wrapped
+    :param instance: wrapt's instance
+    :param args: wrapt's args
+    :param kwargs: wrapt's kwargs
+    :return: None
+    """
+    try:
+        add_pool_checkin(instance)
+    except Exception as instrumentation_exception:  # pylint: disable=W0703
+        trace_factory.add_exception(
+            instrumentation_exception,
+            traceback.format_exc()
+        )
+    return wrapped(*args, **kwargs)
+
+
 def patch():
     """
     patch module.
     :return: None
     """
+    # pylint: disable=import-outside-toplevel
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from sqlalchemy.pool import _ConnectionRecord
 
     patch_once(
         'sqlalchemy.orm.session',
@@ -36,3 +184,32 @@ def patch():
         'Session.close',
         _wrapper
     )
+
+    patch_once(
+        'sqlalchemy.engine.base',
+        'Engine.__init__',
+        _engine_init_wrapper
+    )
+
+    # A classmethod, which can't be marked by `patch_once`
+    # pylint: disable=unidiomatic-typecheck
+    if type(_ConnectionRecord.__dict__['checkout']) is classmethod:
+        wrapt.wrap_function_wrapper(
+            'sqlalchemy.pool',
+            '_ConnectionRecord.checkout',
+            _checkout_wrapper
+        )
+
+    patch_once(
+        'sqlalchemy.pool',
+        'Pool._return_conn',
+        _checkin_wrapper
+    )
+
+    for identifier, listener in (
+            ('before_cursor_execute', _before_cursor_execute),
+            ('after_cursor_execute', _after_cursor_execute),
+            ('handle_error', _handle_error),
+    ):
+        if not event.contains(Engine, identifier, listener):
+            event.listen(Engine, identifier, listener)
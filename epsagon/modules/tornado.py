@@ -5,7 +5,6 @@ Tornado patcher module.
 from __future__ import absolute_import
 import time
 import traceback
-import uuid
 from functools import partial
 import wrapt
 from tornado.httpclient import HTTPRequest
@@ -20,7 +19,9 @@ from epsagon.utils import (
     get_epsagon_http_trace_id
 )
 from ..constants import EPSAGON_HEADER
+from ..trace_transports import HTTPTransport, BatchHTTPTransport
 from ..events.tornado_client import TornadoClientEventFactory
+from ..id_generator import generate_uuid
 
 
 TORNADO_TRACE_ID = 'epsagon_tornado_trace_key'
@@ -31,6 +32,8 @@ class TornadoWrapper(object):
     Wraps Tornado web framework to get requests.
     """
     RUNNERS = {}
+    # (collector URL, token) -> background transport
+    TRANSPORTS = {}
 
     @classmethod
     def before_request(cls, wrapped, instance, args, kwargs):
@@ -45,7 +48,7 @@ class TornadoWrapper(object):
         try:
             ignored = ignore_request('', instance.request.path)
             if not ignored and not is_ignored_endpoint(instance.request.path):
-                unique_id = str(uuid.uuid4())
+                unique_id = generate_uuid()
                 trace = epsagon.trace.trace_factory.get_or_create_trace(
                     unique_id=unique_id
                 )
@@ -123,6 +126,7 @@ class TornadoWrapper(object):
                 ignored = ignore_request(content, '')
                 if not ignored:
                     tornado_runner.update_response(instance, response_body)
+                    cls.use_background_transport(trace)
                     epsagon.trace.trace_factory.send_traces(trace)
                     is_trace_sent = True
         except Exception:  # pylint: disable=W0703
@@ -131,6 +135,29 @@ class TornadoWrapper(object):
 
         return res
 
+    @classmethod
+    def use_background_transport(cls, trace):
+        """
+        Sends the trace from a background thread instead of the IOLoop
+        thread, where a blocking HTTP request would stall all the concurrent
+        requests for a collector round-trip. The trace is still encoded on
+        the IOLoop thread, and handed to a `BatchHTTPTransport` shared by
+        the traces of the same collector.
+        :param trace: the trace about to be sent
+        :return: None
+        """
+        transport = trace.transport
+        # pylint: disable=unidiomatic-typecheck
+        if type(transport) is not HTTPTransport:
+            return
+
+        key = (transport.dest, transport.token)
+        background_transport = cls.TRANSPORTS.get(key)
+        if background_transport is None:
+            background_transport = BatchHTTPTransport(*key)
+            cls.TRANSPORTS[key] = background_transport
+        trace.transport = background_transport
+
     @classmethod
     def collect_exception(cls, wrapped, instance, args, kwargs):
         """
@@ -3,12 +3,12 @@ urllib3 patcher module.
 """
 
 from __future__ import absolute_import
-import uuid
 import wrapt
 from epsagon.modules.general_wrapper import wrapper
 from ..events.urllib3 import Urllib3EventFactory
 from ..http_filters import is_blacklisted_url
 from ..constants import EPSAGON_HEADER
+from ..utils import get_epsagon_http_trace_id
 
 
 def _get_headers_from_args(
@@ -43,12 +43,6 @@ def _wrapper(wrapped, instance, args, kwargs):
     :param kwargs: wrapt's kwargs
     :return: None
     """
-    # Inject header to support tracing over HTTP requests to
-    # opentracing monitored code
-    trace_id = uuid.uuid4().hex
-    span_id = uuid.uuid4().hex[16:]
-    parent_span_id = uuid.uuid4().hex[16:]
-
     host_url = '{}://{}'.format(instance.scheme, instance.host)
 
     # Detect if URL is blacklisted, and ignore.
@@ -64,13 +58,9 @@ def _wrapper(wrapped, instance, args, kwargs):
                 # either kwargs['headers'] == None or it doesn't exist
                 headers = kwargs['headers'] = {}
 
-        headers[EPSAGON_HEADER] = (
-            '{trace_id}:{span_id}:{parent_span_id}:1'.format(
-                trace_id=trace_id,
-                span_id=span_id,
-                parent_span_id=parent_span_id
-            )
-        )
+        # Inject header to support tracing over HTTP requests to
+        # opentracing monitored code
+        headers[EPSAGON_HEADER] = get_epsagon_http_trace_id()
 
     return wrapper(Urllib3EventFactory, wrapped, instance, args, kwargs)
 
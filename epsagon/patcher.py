@@ -3,31 +3,58 @@ Main patcher module
 """
 
 from __future__ import absolute_import
+import time
+from functools import partial
 from importlib import import_module
+import wrapt
 import epsagon.modules
+from epsagon.utils import print_debug
 
+# Library name -> patch report, for the libraries imported so far
+PATCH_REPORT = {}
 
-def _import_exists(module_name):
+
+def _patch_module(patch_module, _imported_module):
     """
-    Validates if import module exists
-    :param module_name: module name to import
-    :return: Bool
+    Patches a library using its instrumentation module.
+    Called once the library is first imported.
+    :param patch_module: the library name
+    :param _imported_module: the imported library
+    :return: None
     """
+    start_time = time.time()
+    report = {'patched': False}
     try:
-        import_module(module_name)
-        return True
-    except ImportError:
-        return False
+        import_module(epsagon.modules.MODULES[patch_module]).patch()
+        report['patched'] = True
+    except Exception as exception:  # pylint: disable=broad-except
+        report['error'] = str(exception)
+    report['duration'] = time.time() - start_time
+    PATCH_REPORT[patch_module] = report
+    print_debug('Patching {} {} ({:.2f} ms)'.format(
+        patch_module,
+        'succeeded' if report['patched'] else 'failed',
+        report['duration'] * 1000,
+    ))
+
+
+def get_patch_report():
+    """
+    Returns which libraries were patched so far, and how long it took.
+    :return: dict of library name -> {'patched', 'duration', 'error'}
+    """
+    return dict(PATCH_REPORT)
 
 
 def patch_all():
     """
-    Instrumenting all modules
+    Instrumenting all modules.
+    Each library is patched only when it is imported by the application,
+    libraries that were already imported are patched immediately.
     :return: None
     """
     for patch_module in epsagon.modules.MODULES:
-        if _import_exists(patch_module):
-            try:
-                epsagon.modules.MODULES[patch_module].patch()
-            except Exception:  # pylint: disable=broad-except
-                pass
+        wrapt.register_post_import_hook(
+            partial(_patch_module, patch_module),
+            patch_module
+        )
@@ -4,10 +4,10 @@ Runner for AWS Lambda.
 
 from __future__ import absolute_import
 import os
-from uuid import uuid4
 from ..event import BaseEvent
 from .. import constants
 from ..common import ErrorCode
+from ..id_generator import generate_uuid
 
 
 class AbstractLambdaRunner(BaseEvent):
@@ -33,7 +33,7 @@ class AbstractLambdaRunner(BaseEvent):
         self.event_id = (
             context.aws_request_id
             if context.aws_request_id != '1234567890'
-            else 'local-{}'.format(str(uuid4()))
+            else 'local-{}'.format(generate_uuid())
         )
         self.resource['name'] = context.function_name
         self.resource['operation'] = self.OPERATION
@@ -4,10 +4,54 @@ Runner for a Celery Python function
 
 from __future__ import absolute_import
 import time
-from uuid import uuid4
+import weakref
 from importlib import import_module
 from ..event import BaseEvent
 from ..utils import add_data_if_needed
+from ..id_generator import generate_uuid
+
+# The app configuration the broker connection is created from
+BROKER_CONFIG_KEYS = (
+    'broker_url',
+    'broker_transport',
+    'broker_host',
+    'broker_port',
+    'broker_vhost',
+)
+
+# Celery app -> (broker config, broker metadata)
+_BROKER_METADATA = weakref.WeakKeyDictionary()
+
+
+def get_broker_metadata():
+    """
+    Returns the broker metadata of the current Celery app.
+    The metadata is cached per app, as creating the app's connection for
+    every task is expensive, and refreshed when the broker config changes.
+    :return: dict of hostname, virtual_host and driver
+    """
+    # `current_app` is a proxy, the cache is keyed by the app itself
+    current_app = import_module('celery').current_app
+    app = current_app._get_current_object()  # pylint: disable=protected-access
+    conf = app.conf
+    broker_config = tuple(
+        getattr(conf, key, None) for key in BROKER_CONFIG_KEYS
+    )
+    cached = _BROKER_METADATA.get(app)
+    if cached is not None and cached[0] == broker_config:
+        return cached[1]
+
+    app_conn = app.connection()
+    try:
+        metadata = {
+            'hostname': app_conn.hostname,
+            'virtual_host': app_conn.virtual_host,
+            'driver': app_conn.transport.driver_type,
+        }
+    finally:
+        app_conn.release()
+    _BROKER_METADATA[app] = (broker_config, metadata)
+    return metadata
 
 
 class CeleryRunner(BaseEvent):
@@ -27,7 +71,7 @@ class CeleryRunner(BaseEvent):
 
         super(CeleryRunner, self).__init__(time.time())
 
-        self.event_id = str(uuid4())
+        self.event_id = generate_uuid()
 
         self.resource['name'] = (
             kwargs.get('sender').name
@@ -36,7 +80,7 @@ class CeleryRunner(BaseEvent):
         )
         self.resource['operation'] = self.OPERATION
 
-        app_conn = import_module('celery').current_app.connection()
+        broker_metadata = get_broker_metadata()
         task_id = kwargs.get('task_id', '')
         body = kwargs.get('args')
         retval = kwargs.get('retval')
@@ -45,9 +89,9 @@ class CeleryRunner(BaseEvent):
         self.resource['metadata'].update({
             'id': task_id,
             'state': state,
-            'hostname': app_conn.hostname or 'localhost',
-            'virtual_host': app_conn.virtual_host,
-            'driver': app_conn.transport.driver_type,
+            'hostname': broker_metadata['hostname'] or 'localhost',
+            'virtual_host': broker_metadata['virtual_host'],
+            'driver': broker_metadata['driver'],
         })
 
         if body:
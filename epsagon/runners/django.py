@@ -3,10 +3,10 @@ Runner for a Django Python function
 """
 
 from __future__ import absolute_import
-import uuid
 from ..event import BaseEvent
 from ..utils import add_data_if_needed
 from ..constants import EPSAGON_HEADER_TITLE
+from ..id_generator import generate_uuid
 
 
 class DjangoRunner(BaseEvent):
@@ -26,7 +26,7 @@ class DjangoRunner(BaseEvent):
         """
         super(DjangoRunner, self).__init__(start_time)
 
-        self.event_id = str(uuid.uuid4())
+        self.event_id = generate_uuid()
         self.resource['name'] = request.get_host()
         self.resource['operation'] = request.method
 
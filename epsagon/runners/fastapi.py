@@ -4,7 +4,6 @@ Runner for a fastapi Python function
 
 from __future__ import absolute_import
 import json
-import uuid
 import warnings
 from fastapi.responses import (
     Response,
@@ -17,8 +16,15 @@ from fastapi.responses import (
 from fastapi.encoders import jsonable_encoder
 from epsagon.common import EpsagonWarning
 from ..event import BaseEvent
-from ..utils import add_data_if_needed, normalize_http_url, print_debug
-from ..constants import EPSAGON_HEADER
+from ..trace import trace_factory
+from ..utils import (
+    add_data_if_needed,
+    normalize_http_url,
+    print_debug,
+)
+from ..http_capture import add_body_if_needed, add_headers_if_needed
+from ..constants import EPSAGON_HEADER, HTTP_MAX_FIELD_SIZE
+from ..id_generator import generate_uuid
 
 SUPPORTED_RAW_RESPONSE_TYPES = (
     JSONResponse,
@@ -46,7 +52,7 @@ class FastapiRunner(BaseEvent):
 
         super(FastapiRunner, self).__init__(start_time)
 
-        self.event_id = str(uuid.uuid4())
+        self.event_id = generate_uuid()
 
         self.resource['name'] = normalize_http_url(request.client.host)
         self.resource['operation'] = request.method
@@ -63,35 +69,47 @@ class FastapiRunner(BaseEvent):
                 query_params.items()
             )
 
-        request_headers = dict(request.headers.items())
+        request_headers = request.headers
         if request_headers.get(EPSAGON_HEADER):
             self.resource['metadata']['http_trace_id'] = request_headers.get(
                 EPSAGON_HEADER
             )
         if request_headers:
-            add_data_if_needed(
+            add_headers_if_needed(
                 self.resource['metadata'],
                 'Request Headers',
                 request_headers
             )
 
-    def update_request_body(self, body):
+    def update_request_body(self, body, size=None):
         """
         Adds request body to event
+        :param body: the request body, or its prefix. Kept as bytes, which
+            are decoded only when the trace is encoded.
+        :param size: the full body size, in bytes
         """
+        if (
+            body and size is not None and size > len(body) and
+            trace_factory.key_filter.keys_to_ignore
+        ):
+            # Ignored keys can't be removed from a partial JSON body
+            body = None
         if body:
-            add_data_if_needed(
+            add_body_if_needed(
                 self.resource['metadata'],
                 'Request Data',
                 body
             )
+            if size is not None:
+                self.resource['metadata']['Request Data Size'] = size
 
     def _update_raw_response_body(self, response, response_type):
         """
-        Updates the response body by given `raw` response and its type
+        Updates the response body by given `raw` response and its type.
+        Only JSON bodies that fit in the body size limit are parsed.
         """
         body = response.body
-        if response_type == JSONResponse:
+        if response_type == JSONResponse and len(body) <= HTTP_MAX_FIELD_SIZE:
             try:
                 body = json.loads(body)
             except Exception: # pylint: disable=W0703
@@ -99,10 +117,7 @@ class FastapiRunner(BaseEvent):
                     'Could not load response json',
                     EpsagonWarning
                 )
-                body = body.decode('utf-8')
-        else:
-            body = body.decode('utf-8')
-        add_data_if_needed(
+        add_body_if_needed(
             self.resource['metadata'],
             'Response Data',
             body
@@ -130,12 +145,11 @@ class FastapiRunner(BaseEvent):
                 self._update_raw_response_body(response, response_type)
                 break
 
-        response_headers = dict(response.headers.items())
         if response.headers:
-            add_data_if_needed(
+            add_headers_if_needed(
                 self.resource['metadata'],
                 'Response Headers',
-                response_headers
+                response.headers
             )
         self.update_status_code(response.status_code)
 
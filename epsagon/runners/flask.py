@@ -4,10 +4,10 @@ Runner for a Flask Python function
 
 from __future__ import absolute_import
 import os
-import uuid
 from ..event import BaseEvent
 from ..utils import add_data_if_needed, normalize_http_url
 from ..constants import EPSAGON_HEADER_TITLE
+from ..id_generator import generate_uuid
 
 
 class FlaskRunner(BaseEvent):
@@ -29,7 +29,7 @@ class FlaskRunner(BaseEvent):
 
         super(FlaskRunner, self).__init__(start_time)
 
-        self.event_id = str(uuid.uuid4())
+        self.event_id = generate_uuid()
 
         self.resource['name'] = (
             normalize_http_url(request.headers.get('Host'))
@@ -5,9 +5,9 @@ Runner for Google Functions.
 
 from __future__ import absolute_import
 import os
-from uuid import uuid4
 from ..event import BaseEvent
 from .. import constants
+from ..id_generator import generate_uuid
 
 
 class GoogleFunctionRunner(BaseEvent):
@@ -27,7 +27,7 @@ class GoogleFunctionRunner(BaseEvent):
 
         super(GoogleFunctionRunner, self).__init__(start_time)
 
-        self.event_id = 'gcp_{}'.format(str(uuid4()))
+        self.event_id = 'gcp_{}'.format(generate_uuid())
         self.resource['name'] = os.getenv(
             'FUNCTION_NAME',
             ''
@@ -3,11 +3,11 @@ Runner for a general python function
 """
 
 from __future__ import absolute_import
-import uuid
 import json
 import epsagon.trace
 from ..event import BaseEvent
 from ..trace_encoder import TraceEncoder
+from ..id_generator import generate_uuid
 
 
 class PythonRunner(BaseEvent):
@@ -38,7 +38,7 @@ class PythonRunner(BaseEvent):
 
         super(PythonRunner, self).__init__(start_time)
 
-        self.event_id = str(uuid.uuid4())
+        self.event_id = generate_uuid()
         self.resource['name'] = name if name else wrapped_function.__name__
         self.resource['operation'] = self.OPERATION
 
@@ -4,10 +4,10 @@ Runner for a Tornado Python framework
 """
 
 from __future__ import absolute_import
-import uuid
 from ..event import BaseEvent
 from ..utils import add_data_if_needed, print_debug
 from ..constants import EPSAGON_HEADER_TITLE
+from ..id_generator import generate_uuid
 
 MAX_PAYLOAD_BYTES = 2000
 
@@ -29,7 +29,7 @@ class TornadoRunner(BaseEvent):
 
         super(TornadoRunner, self).__init__(start_time)
 
-        self.event_id = str(uuid.uuid4())
+        self.event_id = generate_uuid()
 
         # Since Tornado doesn't has app name, we use the tracer app name.
         self.resource['name'] = request.host
@@ -0,0 +1,263 @@
+"""
+SQL statements analysis: operation, table names and fingerprint
+"""
+
+from __future__ import absolute_import
+import re
+import threading
+from collections import OrderedDict, namedtuple
+
+# Max number of analyzed statements kept, least recently used are evicted.
+MAX_CACHED_STATEMENTS = 1024
+# Longer statements (usually with inlined values) are analyzed every time.
+MAX_CACHED_STATEMENT_SIZE = 16 * 1024
+
+SqlStatement = namedtuple(
+    'SqlStatement',
+    ['operation', 'tables', 'fingerprint']
+)
+
+_NAME = r'(?:[^\W\d]\w*|"(?:[^"]|"")*"|`[^`]*`)'
+_TOKEN_RE = re.compile(
+    r'''
+    (?P<comment>--[^\n]*|/\*.*?(?:\*/|$))
+    |(?P<string>'(?:[^'\\]|\\.|'')*'?)
+    |(?P<name>{name}(?:\s*\.\s*(?:{name}|\*))*)
+    |(?P<number>\d+(?:\.\d*)?(?:[eE][-+]?\d+)?|\.\d+(?:[eE][-+]?\d+)?)
+    |(?P<punct>::|[(),;])
+    |(?P<placeholder>%\(\w+\)s|%s|\?|:\w+|\$\d+)
+    |(?P<other>\S)
+    '''.format(name=_NAME),
+    re.VERBOSE | re.DOTALL
+)
+_VALUES_LIST_RE = re.compile(r'\(\?(?:, \?)+\)')
+_VALUES_ROWS_RE = re.compile(r'\(\?\)(?:, \(\?\))+')
+
+# Statements operations, the main operation of a `WITH` statement is the
+# first of these after the common table expressions.
+_OPERATIONS = frozenset([
+    'select', 'insert', 'update', 'delete', 'merge', 'replace', 'upsert',
+])
+# Keywords followed by table names
+_TABLE_KEYWORDS = frozenset([
+    'from', 'join', 'into', 'update', 'table', 'copy',
+])
+# Keywords which may come between a table keyword and the table name
+_TABLE_MODIFIERS = frozenset([
+    'only', 'if', 'not', 'exists', 'lateral', 'ignore', 'low_priority',
+    'temporary', 'temp', 'unlogged',
+])
+# Keywords which can't be a table name or an alias
+_KEYWORDS = frozenset([
+    'all', 'and', 'as', 'asc', 'between', 'by', 'case', 'copy', 'cross',
+    'default', 'delete', 'desc', 'distinct', 'do', 'else', 'end', 'except',
+    'exists', 'fetch', 'for', 'from', 'full', 'group', 'having', 'in',
+    'inner', 'insert', 'intersect', 'into', 'is', 'join', 'left', 'like',
+    'limit', 'natural', 'not', 'nowait', 'null', 'of', 'offset', 'on', 'or',
+    'order', 'outer', 'returning', 'right', 'select', 'set', 'skip', 'stdin',
+    'stdout', 'table', 'then', 'union', 'update', 'using', 'values', 'when',
+    'where', 'window', 'with',
+])
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _tokenize(query):
+    """
+    Splits a query to (kind, text) tokens, without the comments.
+    :param query: SQL query string
+    :return: list of tokens
+    """
+    return [
+        (match.lastgroup, match.group())
+        for match in _TOKEN_RE.finditer(query)
+        if match.lastgroup != 'comment'
+    ]
+
+
+def _fingerprint(tokens):
+    """
+    Returns the query with its literals and parameters replaced by `?`, and
+    its whitespace normalized. Lists of values are collapsed to one value.
+    :param tokens: the query tokens
+    :return: fingerprint string
+    """
+    parts = []
+    # Whether each part is an operand, after which a sign is an operator
+    operands = []
+    for kind, text in tokens:
+        if kind in ('string', 'number', 'placeholder'):
+            if (
+                    kind == 'number' and parts and parts[-1] in ('-', '+') and
+                    not (len(operands) > 1 and operands[-2])
+            ):
+                # The sign is part of the number
+                parts.pop()
+                operands.pop()
+            parts.append('?')
+            operands.append(True)
+        else:
+            parts.append(text)
+            operands.append(kind == 'name' or text == ')')
+    fingerprint = ' '.join(parts)
+    fingerprint = (
+        fingerprint.replace('( ', '(').replace(' )', ')').replace(' ,', ',')
+    )
+    fingerprint = _VALUES_LIST_RE.sub('(?)', fingerprint)
+    return _VALUES_ROWS_RE.sub('(?)', fingerprint)
+
+
+def _is_name(token):
+    """
+    Returns whether a token is a name which isn't a keyword.
+    :param token: (kind, text) token
+    """
+    return token[0] == 'name' and token[1].lower() not in _KEYWORDS
+
+
+def _operation_and_ctes(words):
+    """
+    Returns the statement operation, and the names of its common table
+    expressions.
+    :param words: list of (kind, text, lowered text, depth) tokens
+    :return: (operation, set of CTE names)
+    """
+    if not words:
+        return '', set()
+    operation = words[0][2] if words[0][0] == 'name' else ''
+    if operation != 'with':
+        return operation, set()
+
+    ctes = set()
+    for index, (kind, _, lowered, depth) in enumerate(words[1:], 1):
+        if depth != 0 or kind != 'name':
+            continue
+        if lowered in _OPERATIONS:
+            return lowered, ctes
+        next_words = words[index + 1:index + 2]
+        if next_words and next_words[0][2] == 'as':
+            ctes.add(lowered)
+        elif next_words and next_words[0][1] == '(':
+            # A CTE with a column list, find the AS after it
+            for next_word in words[index + 2:]:
+                if next_word[3] == 0 and next_word[1] == ')':
+                    continue
+                if next_word[3] == 0:
+                    if next_word[2] == 'as':
+                        ctes.add(lowered)
+                    break
+    return operation, ctes
+
+
+def _read_tables(words, index, ctes, tables):
+    """
+    Reads the table names following a table keyword.
+    :param words: list of (kind, text, lowered text, depth) tokens
+    :param index: index of the token after the keyword
+    :param ctes: names of the statement common table expressions
+    :param tables: list of table names, updated in place
+    :return: index of the token after the tables
+    """
+    count = len(words)
+    while index < count and words[index][2] in _TABLE_MODIFIERS:
+        index += 1
+    if index < count and _is_name(words[index][:2]):
+        table = words[index][1]
+        if table.lower() not in ctes and table not in tables:
+            tables.append(table)
+        index += 1
+    return index
+
+
+def _tables(words, ctes):
+    """
+    Returns the names of the tables a statement uses.
+    :param words: list of (kind, text, lowered text, depth) tokens
+    :param ctes: names of the statement common table expressions
+    :return: list of table names, by order of appearance
+    """
+    tables = []
+    # Whether each open parenthesis is a function call, in which `FROM` is
+    # an argument (as in `EXTRACT(YEAR FROM date)`).
+    functions_stack = []
+    # Depths of the `FROM` clauses being read, where a comma is followed by
+    # another table (as in `FROM a, b AS c`).
+    from_depths = set()
+    index = 0
+    while index < len(words):
+        kind, text, lowered, depth = words[index]
+        index += 1
+        if text == '(':
+            functions_stack.append(
+                index > 1 and _is_name(words[index - 2][:2])
+            )
+            continue
+        if text == ')':
+            if functions_stack:
+                functions_stack.pop()
+            from_depths.discard(depth + 1)
+            continue
+        if functions_stack and functions_stack[-1]:
+            continue
+        if text == ',' and depth in from_depths:
+            index = _read_tables(words, index, ctes, tables)
+            continue
+        if kind != 'name' or lowered not in _KEYWORDS or lowered == 'as':
+            continue
+
+        from_depths.discard(depth)
+        if lowered in _TABLE_KEYWORDS:
+            if lowered == 'from':
+                from_depths.add(depth)
+            index = _read_tables(words, index, ctes, tables)
+    return tables
+
+
+def _analyze(query):
+    """
+    Analyzes a query, see `analyze`.
+    """
+    tokens = _tokenize(query)
+    words = []
+    depth = 0
+    for kind, text in tokens:
+        if text == ')':
+            depth -= 1
+        words.append((kind, text, text.lower(), depth))
+        if text == '(':
+            depth += 1
+
+    operation, ctes = _operation_and_ctes(words)
+    return SqlStatement(
+        operation=operation,
+        tables=tuple(_tables(words, ctes)),
+        fingerprint=_fingerprint(tokens),
+    )
+
+
+def analyze(query):
+    """
+    Analyzes a SQL query. Results are cached by the query text.
+    :param query: SQL query (str or bytes)
+    :return: SqlStatement of the operation (lower case, the main operation
+        for `WITH` statements), the table names, and the fingerprint
+    """
+    with _cache_lock:
+        statement = _cache.get(query)
+        if statement is not None:
+            _cache[query] = _cache.pop(query)
+            return statement
+
+    text = query
+    if isinstance(text, bytes) and not isinstance(text, str):
+        text = text.decode('utf-8', errors='replace')
+    statement = _analyze(text)
+    if len(query) > MAX_CACHED_STATEMENT_SIZE:
+        return statement
+
+    with _cache_lock:
+        _cache[query] = statement
+        while len(_cache) > MAX_CACHED_STATEMENTS:
+            _cache.popitem(last=False)
+    return statement
@@ -15,11 +15,29 @@ import threading
 import random
 import json
 import urllib3.exceptions
+from six.moves import _thread
 
-from epsagon.event import BaseEvent
+try:
+    import contextvars
+except ImportError:
+    contextvars = None
+
+
+from epsagon.event import BaseEvent, AggregatedEvent
 from epsagon.common import EpsagonWarning, ErrorCode
-from epsagon.trace_encoder import TraceEncoder
-from epsagon.trace_transports import NoneTransport, HTTPTransport, LogTransport
+# TraceEncoder was defined here, and is still imported from this module.
+from epsagon.trace_encoder import (  # pylint: disable=unused-import
+    TraceEncoder,
+    to_json,
+    serialize,
+)
+from epsagon.key_filter import KeyFilter, normalize_key
+from epsagon.trace_transports import (
+    NoneTransport,
+    HTTPTransport,
+    BatchHTTPTransport,
+    LogTransport,
+)
 from .constants import (
     TIMEOUT_GRACE_TIME_MS,
     EPSAGON_MARKER,
@@ -31,7 +49,10 @@ from .constants import (
     __version__
 )
 
-MAX_EVENTS_PER_TYPE = 20
+# Max events kept per resource type and per trace, events past the caps are
+# aggregated. 0 means no limit.
+MAX_EVENTS_PER_TYPE = int(os.getenv('EPSAGON_MAX_EVENTS_PER_TYPE', '1000'))
+MAX_EVENTS_PER_TRACE = int(os.getenv('EPSAGON_MAX_EVENTS_PER_TRACE', '5000'))
 MAX_TRACE_SIZE_BYTES = 64 * (2 ** 10)
 DEFAULT_MAX_TRACE_SIZE_BYTES = 64 * (2 ** 10)
 MAX_METADATA_FIELD_SIZE_LIMIT = 1024 * 3
@@ -60,17 +81,87 @@ def _decimal_serializer(o):
     raise TypeError(repr(o) + ' is not JSON serializable')
 
 
+def _encode(obj):
+    """
+    Encodes an object to the trace JSON format
+    :param obj: the object to encode
+    :return: JSON string
+    """
+    return to_json(obj)
+
+
+class _TrackingSerializer(object):
+    """
+    A trace serializer which records whether a non-JSON type was encoded
+    """
+
+    def __init__(self):
+        self.used = False
+
+    def __call__(self, o):
+        self.used = True
+        return serialize(o)
+
+
 def get_thread_id():
     """
     Return current thread id
     :return: thread id
     """
-    return threading.currentThread().ident
+    return _thread.get_ident()
+
+
+class _ContextLocal(object):
+    """
+    A value local to the current execution context: a `ContextVar` when
+    available (Python 3.7+), so each thread and each asyncio task has its own
+    value. Older versions use a thread local, or an attribute of the given
+    asyncio task.
+    """
+
+    def __init__(self, name):
+        """
+        Initialize.
+        :param name: name of the value
+        """
+        self.name = name
+        if contextvars:
+            self._var = contextvars.ContextVar(name, default=None)
+        else:
+            self._local = threading.local()
+
+    def get(self, task=None):
+        """
+        Gets the value of the current context.
+        :param task: the current asyncio task, used without contextvars
+        :return: the value, or None
+        """
+        if contextvars:
+            return self._var.get()
+        if task is not None:
+            return getattr(task, self.name, None)
+        return getattr(self._local, 'value', None)
+
+    def set(self, value, task=None):
+        """
+        Sets the value of the current context.
+        :param value: the value
+        :param task: the current asyncio task, used without contextvars
+        :return: None
+        """
+        if contextvars:
+            self._var.set(value)
+        elif task is not None:
+            setattr(task, self.name, value)
+        else:
+            self._local.value = value
 
 
 def create_transport(collector_url, token):
     if (os.getenv('EPSAGON_LOG_TRANSPORT') or '').upper() == 'TRUE':
         return LogTransport()
+    if (os.getenv('EPSAGON_ASYNC_TRANSPORT') or '').upper() == 'TRUE':
+        return BatchHTTPTransport(collector_url, token)
     return HTTPTransport(collector_url, token)
 
 
@@ -97,10 +188,11 @@ class TraceFactory(object):
         self.url_patterns_to_ignore = None
         self.keys_to_ignore = None
         self.keys_to_allow = None
+        self.key_filter = KeyFilter()
         self.use_single_trace = True
         self.use_async_tracer = False
         self.singleton_trace = None
-        self.local_thread_to_unique_id = {}
+        self.local_unique_id = _ContextLocal('epsagon_unique_id')
         self.transport = NoneTransport()
         self.split_on_send = False
         self.disabled = False
@@ -168,6 +260,7 @@ class TraceFactory(object):
         )
         self.keys_to_ignore = [] if keys_to_ignore is None else keys_to_ignore
         self.keys_to_allow = [] if keys_to_allow is None else keys_to_allow
+        self.key_filter = KeyFilter(self.keys_to_ignore, self.keys_to_allow)
         self.transport = transport
         self.split_on_send = split_on_send
         self.propagate_lambda_id = propagate_lambda_id
@@ -181,10 +274,11 @@ class TraceFactory(object):
         Update tracers to have latest parameters in case of re-initialization
         of the factory.
         """
-        tracers_to_update = (
-            [self.singleton_trace, ] if self.singleton_trace else
-            self.traces.values()
-        )
+        with self.LOCK:
+            tracers_to_update = (
+                [self.singleton_trace, ] if self.singleton_trace else
+                list(self.traces.values())
+            )
 
         for tracer in tracers_to_update:
             tracer.app_name = self.app_name
@@ -195,8 +289,7 @@ class TraceFactory(object):
             tracer.debug = self.debug
             tracer.send_trace_only_on_error = self.send_trace_only_on_error
             tracer.url_patterns_to_ignore = self.url_patterns_to_ignore
-            tracer.keys_to_ignore = self.keys_to_ignore
-            tracer.keys_to_allow = self.keys_to_allow
+            tracer.key_filter = self.key_filter
             tracer.transport = self.transport
             tracer.split_on_send = self.split_on_send
             tracer.propagate_lambda_id = self.propagate_lambda_id
@@ -242,6 +335,7 @@ class TraceFactory(object):
             url_patterns_to_ignore=self.url_patterns_to_ignore,
             keys_to_ignore=self.keys_to_ignore,
             keys_to_allow=self.keys_to_allow,
+            key_filter=self.key_filter,
             transport=self.transport,
             split_on_send=self.split_on_send,
             propagate_lambda_id=self.propagate_lambda_id,
@@ -316,14 +410,45 @@ class TraceFactory(object):
         Get or create trace assuming multi-threaded tracer.
         :return: The trace.
         """
-        # If multiple threads are used, then create a new trace for each thread
+        # If multiple threads are used, then create a new trace for each thread.
+        # Only the current thread registers its own id, so the lookup doesn't
+        # need the lock (dict reads are atomic).
         thread_id = get_thread_id()
-        if thread_id not in self.traces:
-            if not should_create:
-                return None
+        trace = self.traces.get(thread_id)
+        if trace is None and should_create:
             new_trace = self._create_new_trace()
-            self.traces[thread_id] = new_trace
-        return self.traces[thread_id]
+            with TraceFactory.LOCK:
+                trace = self.traces.setdefault(thread_id, new_trace)
+        return trace
+
+    def _get_unique_id_trace(self, unique_id, should_create=False):
+        """
+        Get or create the trace of a unique id. A created trace becomes the
+        active trace, switching between existing traces is done by
+        `switch_active_trace`.
+        :return: The trace.
+        """
+        trace = self.traces.get(unique_id)
+        if trace is not None:
+            return trace
+
+        with TraceFactory.LOCK:
+            trace = (
+                self.singleton_trace
+                if self.singleton_trace and not self.traces
+                else self.traces.get(
+                        unique_id, None
+                )
+            )
+            if not trace:
+                if not should_create:
+                    return None
+                trace = self._create_new_trace(unique_id)
+            # Making sure singleton trace contains the latest trace
+            trace.unique_id = unique_id
+            self.singleton_trace = trace
+            self.traces[unique_id] = trace
+            return trace
 
     def _get_trace(self, unique_id=None, should_create=False):
         """
@@ -334,39 +459,29 @@ class TraceFactory(object):
         If should_create then creating a new trace if trace does not exist
         if use_single_trace is set to False, each thread will have
         it's own trace..
+        The lookup of an existing trace is lock-free, the lock is taken only
+        to register a new trace.
         :return: The trace.
         """
-        with TraceFactory.LOCK:
-            if self.use_async_tracer:
-                return self._get_tracer_async_mode(should_create=should_create)
-
-            unique_id = self.get_thread_local_unique_id(unique_id)
-            if unique_id:
-                trace = (
-                    self.singleton_trace
-                    if self.singleton_trace and not self.traces
-                    else self.traces.get(
-                            unique_id, None
-                    )
-                )
-                if not trace:
-                    if not should_create:
-                        return None
-                    trace = self._create_new_trace(unique_id)
-                # Making sure singleton trace contains the latest trace
-                trace.unique_id = unique_id
-                self.singleton_trace = trace
-                self.traces[unique_id] = trace
-                return trace
+        if self.use_async_tracer:
+            return self._get_tracer_async_mode(should_create=should_create)
 
-            if self.use_single_trace:
-                if self.singleton_trace is None and should_create:
-                    self.singleton_trace = self._create_new_trace()
-                return self.singleton_trace
+        unique_id = self.get_thread_local_unique_id(unique_id)
+        if unique_id:
+            return self._get_unique_id_trace(unique_id, should_create)
 
-            # If multiple threads are used, then create a
-            # new trace for each thread
-            return self._get_thread_trace(should_create=should_create)
+        if self.use_single_trace:
+            trace = self.singleton_trace
+            if trace is None and should_create:
+                with TraceFactory.LOCK:
+                    if self.singleton_trace is None:
+                        self.singleton_trace = self._create_new_trace()
+                    trace = self.singleton_trace
+            return trace
+
+        # If multiple threads are used, then create a
+        # new trace for each thread
+        return self._get_thread_trace(should_create=should_create)
 
     @property
     def active_trace(self):
@@ -407,20 +522,24 @@ class TraceFactory(object):
                 return trace
             return None
 
+    def _get_local_task(self):
+        """
+        Gets the current asyncio task, needed to keep context local values
+        only when contextvars is unavailable.
+        :return: The task, or None
+        """
+        if contextvars or not self.is_async_tracer():
+            return None
+        return type(self)._get_current_task()
+
     def get_thread_local_unique_id(self, unique_id=None):
         """
         Get thread local unique id
         :param unique_id: input unique id
         :return: active id if there's an active unique id or given one
         """
-        if self.is_async_tracer():
-            return self.local_thread_to_unique_id.get(
-                type(self)._get_current_task(), unique_id
-        )
-
-        return self.local_thread_to_unique_id.get(
-            get_thread_id(), unique_id
-        )
+        local_unique_id = self.local_unique_id.get(self._get_local_task())
+        return local_unique_id if local_unique_id else unique_id
 
     def set_thread_local_unique_id(self, unique_id=None):
         """
@@ -434,11 +553,7 @@ class TraceFactory(object):
             )
         )
 
-        if self.is_async_tracer():
-            self.local_thread_to_unique_id[
-                type(self)._get_current_task()] = unique_id
-        else:
-            self.local_thread_to_unique_id[get_thread_id()] = unique_id
+        self.local_unique_id.set(unique_id, self._get_local_task())
         return unique_id
 
     def unset_thread_local_unique_id(self):
@@ -446,7 +561,7 @@ class TraceFactory(object):
         Unset thread local unique id
         :return: None
         """
-        self.local_thread_to_unique_id.pop(get_thread_id(), None)
+        self.local_unique_id.set(None, self._get_local_task())
 
     def get_trace_identifier(self, trace=None):
         """
@@ -469,6 +584,24 @@ class TraceFactory(object):
         """
         return self._get_trace(should_create=False)
 
+    def is_sampled_out(self):
+        """
+        Returns whether the current trace was dropped by sampling, in which
+        case there is no need to create events for it.
+        :return: True if the trace is dropped
+        """
+        trace = self.get_trace()
+        return trace is not None and trace.sampled is False
+
+    def keep_trace(self):
+        """
+        Keeps the current trace even if it was dropped by sampling.
+        :return: None
+        """
+        trace = self.get_trace()
+        if trace:
+            trace.keep()
+
     def add_event(self, event):
         """
         Add  event to the relevant trace.
@@ -634,6 +767,7 @@ class Trace(object):
         url_patterns_to_ignore=None,
         keys_to_ignore=None,
         keys_to_allow=None,
+        key_filter=None,
         unique_id=None,
         split_on_send=False,
         transport=NoneTransport(),
@@ -667,29 +801,27 @@ class Trace(object):
         self.step_dict_output_path = step_dict_output_path
         self.sample_rate = sample_rate
 
-        if keys_to_ignore:
-            self.keys_to_ignore = [self._strip_key(key) for key in
-                                   keys_to_ignore]
-            if self.debug:
-                print(
-                    'Setting keys_to_ignore={}'.format(keys_to_ignore)
-                )
-        else:
-            self.keys_to_ignore = []
-        if keys_to_allow:
-            self.keys_to_allow = [self._strip_key(key) for key in keys_to_allow]
-            if self.debug:
-                print(
-                    'Setting keys_to_allow={}'.format(keys_to_allow)
-                )
-        else:
-            self.keys_to_allow = []
+        if key_filter is None:
+            key_filter = KeyFilter(keys_to_ignore, keys_to_allow)
+        self.key_filter = key_filter
+        if self.debug and keys_to_ignore:
+            print('Setting keys_to_ignore={}'.format(keys_to_ignore))
+        if self.debug and keys_to_allow:
+            print('Setting keys_to_allow={}'.format(keys_to_allow))
         self.platform = 'Python {}.{}'.format(
             sys.version_info.major,
             sys.version_info.minor
         )
         self.runner = None
         self.trace_sent = False
+        # Whether the trace is kept by sampling, None when undecided yet
+        self.sampled = None
+        self.max_events_per_type = MAX_EVENTS_PER_TYPE
+        self.max_events = MAX_EVENTS_PER_TRACE
+        self.events_count = 0
+        self.events_count_per_type = {}
+        self.events_count_per_resource = {}
+        self.aggregated_events = {}
 
     # pylint: disable=unused-argument, unused-variable
     def timeout_handler(self, signum, frame):
@@ -796,6 +928,26 @@ class Trace(object):
         self.has_custom_error = False
         self.runner = None
         self.trace_sent = False
+        self._reset_events_count()
+        # Decide whether to keep the trace before any event is collected.
+        self.sampled = self._sample()
+
+    def _sample(self):
+        """
+        Makes the sampling decision of the trace.
+        :return: True if the trace should be kept
+        """
+        if self.sample_rate >= 1:
+            return True
+        return self.sample_rate >= random.uniform(0, 1)
+
+    def keep(self):
+        """
+        Keeps a trace that was dropped by sampling, so its following events
+        are collected and it is sent.
+        :return: None
+        """
+        self.sampled = True
 
     def initialize(
             self,
@@ -861,16 +1013,89 @@ class Trace(object):
         :return: None
         """
         self.events = []
+        self._reset_events_count()
+
+    def _reset_events_count(self):
+        """
+        Resets the events caps bookkeeping
+        :return: None
+        """
+        self.events_count = 0
+        self.events_count_per_type = {}
+        self.events_count_per_resource = {}
+        self.aggregated_events = {}
+
+    def _is_over_events_cap(self, event):
+        """
+        Checks whether adding the event exceeds the events caps, and counts it
+        otherwise. Runners and triggers are never capped.
+        An event class may also cap the events of the same resource
+        (type, name and operation) with `MAX_EVENTS_PER_RESOURCE`.
+        :param event: the event to add
+        :return: True if the event exceeds the caps
+        """
+        if event.origin in ('runner', 'trigger'):
+            return False
+
+        resource_type = event.resource.get('type')
+        type_count = self.events_count_per_type.get(resource_type, 0)
+        if (
+                (self.max_events and self.events_count >= self.max_events) or
+                (
+                    self.max_events_per_type and
+                    type_count >= self.max_events_per_type
+                )
+        ):
+            return True
+
+        max_events_per_resource = getattr(
+            event, 'MAX_EVENTS_PER_RESOURCE', None
+        )
+        if max_events_per_resource:
+            resource_key = AggregatedEvent.key(event)
+            resource_count = self.events_count_per_resource.get(
+                resource_key, 0
+            )
+            if resource_count >= max_events_per_resource:
+                return True
+            self.events_count_per_resource[resource_key] = resource_count + 1
+
+        self.events_count += 1
+        self.events_count_per_type[resource_type] = type_count + 1
+        return False
+
+    def _aggregate_event(self, event):
+        """
+        Folds an event that exceeded the caps into the aggregated event of its
+        type, name and operation.
+        :param event: the terminated event
+        :return: None
+        """
+        key = AggregatedEvent.key(event)
+        aggregated_event = self.aggregated_events.get(key)
+        if aggregated_event:
+            aggregated_event.add(event)
+            return
+
+        aggregated_event = AggregatedEvent(event)
+        self.aggregated_events[key] = aggregated_event
+        self.events.append(aggregated_event)
 
     def add_event(self, event, should_terminate=True):
         """
         Add event to events list.
+        Events that exceed the per type or per trace caps are aggregated.
+        Events that aren't terminated yet are always kept, as their duration,
+        error and metadata are set after they are added.
         :param event: BaseEvent
         :param should_terminate: If True, `event.terminate()` is called
         :return: None
         """
         if should_terminate:
             event.terminate()
+        if self._is_over_events_cap(event) and event.terminated:
+            self._aggregate_event(event)
+            return
         self.events.append(event)
 
     def verify_custom_label(self, key, value):
@@ -953,6 +1178,8 @@ class Trace(object):
         if not self.runner:
             return
 
+        self.keep()
+
         if not traceback_data:
             if getattr(exception, '__traceback__', None):
                 traceback_data = ''.join(traceback.format_exception(
@@ -985,10 +1212,9 @@ class Trace(object):
             self.custom_labels
         )
 
-    def to_dict(self):
+    def _update_runner_with_labels_safely(self):
         """
-        Convert trace to dict.
-        :return: Trace dict
+        Adds the custom labels to the runner, ignoring errors
         """
         try:
             self.update_runner_with_labels()
@@ -1000,15 +1226,75 @@ class Trace(object):
                 traceback.format_exc()
             )
 
+    def _trace_dict(self, events):
+        """
+        Build the trace dict with the given events.
+        :param events: events, as dicts
+        :return: Trace dict
+        """
         return {
             'token': self.token,
             'app_name': self.app_name,
-            'events': [event.to_dict() for event in self.events],
+            'events': events,
             'exceptions': self.exceptions,
             'version': self.version,
             'platform': self.platform,
         }
 
+    def to_dict(self):
+        """
+        Convert trace to dict.
+        :return: Trace dict
+        """
+        self._update_runner_with_labels_safely()
+        return self._trace_dict([event.to_dict() for event in self.events])
+
+    def _encode_event(self, event):
+        """
+        Encodes a single event, trimming its metadata fields that are too big.
+        Trimming is skipped when the whole encoded event is below the field
+        size limit and contains only plain JSON types, since then no field
+        can be trimmed.
+        :param event: the event to encode
+        :return: the encoded event
+        """
+        serializer = _TrackingSerializer()
+        encoded_event = to_json(event.to_dict(), default=serializer)
+        if (
+                len(encoded_event) > MAX_METADATA_FIELD_SIZE_LIMIT or
+                serializer.used
+        ):
+            if type(self)._trim_dict_values(
+                    event.resource['metadata'],
+                    MAX_METADATA_FIELD_SIZE_LIMIT
+            ):
+                encoded_event = _encode(event.to_dict())
+        return encoded_event
+
+    def _encode_events(self):
+        """
+        Encodes all the trace events, each one is encoded once.
+        :return: list of the encoded events
+        """
+        self._update_runner_with_labels_safely()
+        return [self._encode_event(event) for event in self.events]
+
+    def _join_encoded_events(self, encoded_events):
+        """
+        Builds the encoded trace out of its already encoded events, the
+        result is identical to encoding `to_dict()`.
+        :param encoded_events: list of the encoded events
+        :return: the encoded trace
+        """
+        encoded_fields = []
+        for key, value in self._trace_dict(None).items():
+            encoded_value = (
+                '[{}]'.format(', '.join(encoded_events))
+                if key == 'events' else _encode(value)
+            )
+            encoded_fields.append('{}: {}'.format(_encode(key), encoded_value))
+        return '{{{}}}'.format(', '.join(encoded_fields))
+
     @staticmethod
     def trim_metadata(metadata):
         """
@@ -1028,10 +1314,12 @@ class Trace(object):
         If data is not a dict - the function does nothing.
         :param data: the data dict to trim fields from
         :param max_size: the max field size
+        :return: True if any field was trimmed
         """
         if not isinstance(data, dict):
-            return
+            return False
 
+        trimmed = False
         for field_name in data:
             value = data[field_name]
             if isinstance(value, dict):
@@ -1039,9 +1327,22 @@ class Trace(object):
                     json_value = json.dumps(value, default=_decimal_serializer)
                     if len(json_value) > max_size:
                         data[field_name] = json_value[:max_size]
+                        trimmed = True
                 # pylint: disable=W0703
                 except Exception:
                     data[field_name] = FAILED_TO_SERIALIZE_MESSAGE
+                    trimmed = True
+        return trimmed
+
+    def _update_encoded_event(self, event, encoded_events):
+        """
+        Encodes again an event that was changed after being encoded.
+        :param event: the changed event
+        :param encoded_events: list of the encoded events, updated in place
+        """
+        for index, trace_event in enumerate(self.events):
+            if trace_event is event:
+                encoded_events[index] = _encode(event.to_dict())
 
     @staticmethod
     def events_sorter(event):
@@ -1068,30 +1369,42 @@ class Trace(object):
 
     @property
     def length(self):
-        json_trace = json.dumps(
-            self.to_dict(),
-            cls=TraceEncoder,
-            ensure_ascii=True
-        )
-        return len(json_trace)
+        return len(_encode(self.to_dict()))
 
-    def _strip(self, trace_length):
+    def _strip(self, trace_length, encoded_events):
         """
-        Strips a given trace from all operations
+        Strips a given trace from all operations, until it fits the max size.
+        Only the stripped events are encoded again.
+        :param trace_length: the current encoded trace length
+        :param encoded_events: list of the encoded events, updated in place
         """
-        for event in sorted(self.events, key=Trace.events_sorter):
-            event_metadata_length = (
-                len(json.dumps(
-                    event.resource.get('metadata', {}),
-                    cls=TraceEncoder,
-                    ensure_ascii=True
-                ))
-            )
+        max_trace_size = self._max_trace_size
+        for index in sorted(
+                range(len(self.events)),
+                key=lambda index: Trace.events_sorter(self.events[index])
+        ):
+            event = self.events[index]
             Trace.trim_metadata(event.resource['metadata'])
-            trace_length -= event_metadata_length
-            if trace_length < self._max_trace_size:
+            stripped_event = _encode(event.to_dict())
+            trace_length -= len(encoded_events[index]) - len(stripped_event)
+            encoded_events[index] = stripped_event
+            if trace_length < max_trace_size:
                 break
 
+    @property
+    def keys_to_ignore(self):
+        """
+        Normalized keys to remove from events metadata.
+        """
+        return self.key_filter.keys_to_ignore
+
+    @property
+    def keys_to_allow(self):
+        """
+        Normalized keys to keep in events metadata.
+        """
+        return self.key_filter.keys_to_allow
+
     @staticmethod
     def _strip_key(key):
         """
@@ -1099,9 +1412,7 @@ class Trace(object):
         :param key: The key to strip.
         :return: Stripped key.
         """
-        return (
-            str(key).lower().replace('-', '').replace('_', '').replace(' ', '')
-        )
+        return normalize_key(key)
 
     def remove_ignored_keys(self, input_dict):
         """
@@ -1111,33 +1422,7 @@ class Trace(object):
         :param input_dict: Input dict to remove ignored keys from.
         :return: a dict without the the ignored keys
         """
-        # pylint: disable=too-many-nested-blocks
-        if not self.keys_to_ignore:
-            return input_dict
-        copied_dict = input_dict.copy()
-        # Python 2 returns a list, while Python3 returns an iterator.
-        for key in input_dict:
-            if self._strip_key(key) in self.keys_to_ignore:
-                copied_dict.pop(key)
-                if self.debug:
-                    print(
-                        'Removed ignored key {}'.format(key)
-                    )
-            else:
-                value = input_dict[key]
-                if isinstance(value, dict):
-                    copied_dict[key] = self.remove_ignored_keys(value)
-                else:
-                    if isinstance(value, str):
-                        try:
-                            json_value = json.loads(value)
-                            if isinstance(json_value, dict):
-                                copied_dict[key] = (json.dumps(
-                                    self.remove_ignored_keys(json_value)
-                                ))
-                        except (TypeError, ValueError):
-                            pass
-        return copied_dict
+        return self.key_filter.remove_ignored_keys(input_dict)
 
     def get_dict_with_allow_keys(self, input_dict):
         """
@@ -1146,20 +1431,7 @@ class Trace(object):
         :param input_dict: Input dict to remove branches without allowed keys.
         :return: a dict that contains branches which contains allowed keys
         """
-        copied_dict = input_dict.copy()
-        for key in input_dict:
-            is_key_in_whitelist = self._strip_key(key) in self.keys_to_allow
-            if not is_key_in_whitelist:
-                value = input_dict[key]
-                if isinstance(value, dict):
-                    child_dict = self.get_dict_with_allow_keys(value)
-                    if not child_dict:
-                        copied_dict.pop(key)
-                    else:
-                        copied_dict[key] = child_dict
-                else:
-                    copied_dict.pop(key)
-        return copied_dict
+        return self.key_filter.get_dict_with_allow_keys(input_dict)
 
     def send_traces(self):
         """
@@ -1169,44 +1441,67 @@ class Trace(object):
         then split the trace into multiple traces.
         :return: None
         """
-        if (
-                self.split_on_send
-                and len(self.events) > 1
-                and self.length > self._max_trace_size
-        ):
-            self._send_trace_split()
-        else:
-            self._send_traces()
+        self._send_traces()
 
-    def _send_trace_split(self):
+    def _send_trace_split(self, encoded_events):
         """
         Split trace into multiple traces and send them one after the other.
         This is done by manipulating the trace object while keeping the same
-        runner.
-        :param trace: the trace to send.
+        runner. Events are packed into fragments in a single pass, using the
+        size of their already encoded form.
+        :param encoded_events: list of the encoded events
         """
+        runner = self.runner
         # Get only events (without runner)
-        all_events = self.events[:]
-        if self.runner:
-            all_events.remove(self.runner)
-
-        self.runner.resource['metadata']['fragment_seq'] = 1
-        self.clear_events()
-        self.add_event(self.runner)
-        for event in all_events:
-            self.add_event(event)
-            if self.length > self._max_trace_size:
-                self.events.pop()
-                self._send_traces()
-                self.runner.resource['metadata']['fragment_seq'] += 1
-                self.trace_sent = False
-                self.clear_events()
-                self.add_event(self.runner)
-                self.add_event(event)
+        all_events = [
+            (event, encoded_event)
+            for event, encoded_event in zip(self.events, encoded_events)
+            if event is not runner
+        ]
+        max_trace_size = self._max_trace_size
+        if runner:
+            runner.resource['metadata']['fragment_seq'] = 1
+
+        fragment = []
+        fragment_length = self._fragment_base_length()
+        for event, encoded_event in all_events:
+            # Length of the event and its separator
+            event_length = len(encoded_event) + 2
+            if fragment and fragment_length + event_length > max_trace_size:
+                self._send_fragment(fragment)
+                fragment = []
+                fragment_length = self._fragment_base_length()
+            fragment.append((event, encoded_event))
+            fragment_length += event_length
 
         # If there are events to send (except for runner)
-        if len(self.events) > 1:
-            self._send_traces()
+        if fragment:
+            self._send_fragment(fragment)
+
+    def _fragment_base_length(self):
+        """
+        Returns the encoded length of a fragment with no events but the runner.
+        """
+        if not self.runner:
+            return len(self._join_encoded_events([]))
+        return len(self._join_encoded_events(
+            [_encode(self.runner.to_dict())]
+        ))
+
+    def _send_fragment(self, fragment):
+        """
+        Sends a single fragment of a split trace.
+        :param fragment: list of (event, encoded event) to send
+        """
+        self.events = [event for event, _ in fragment]
+        encoded_events = [encoded_event for _, encoded_event in fragment]
+        if self.runner:
+            self.events.insert(0, self.runner)
+            encoded_events.insert(0, _encode(self.runner.to_dict()))
+
+        self._send_encoded_events(encoded_events)
+        if self.runner:
+            self.runner.resource['metadata']['fragment_seq'] += 1
 
     # pylint: disable=W0703
     def _send_traces(self):
@@ -1217,18 +1512,20 @@ class Trace(object):
         if self.token == '' or self.trace_sent:
             return
 
-        rand_num = random.uniform(0, 1)
+        if self.sampled is None:
+            rand_num = random.uniform(0, 1)
+            self.sampled = self.sample_rate >= rand_num
         if (
-                (self.send_trace_only_on_error or self.sample_rate < rand_num)
+                (self.send_trace_only_on_error or not self.sampled)
                 and self.runner
                 and self.runner.error_code == ErrorCode.OK
         ):
             if self.debug:
-                print('Trace was omitted. sample rate is: {},'
-                      'random value: {}'.format(self.sample_rate, rand_num))
+                print('Trace was omitted. sample rate is: {}'.format(
+                    self.sample_rate
+                ))
             return
 
-        trace = ''
         self.transport = (
             self.transport
             if not isinstance(self.transport, NoneTransport)
@@ -1236,19 +1533,11 @@ class Trace(object):
         )
 
         try:
-            # Update events resource metadata.
-            for event in self.events:
-                # Remove ignored keys.
-                event.resource['metadata'] = self.remove_ignored_keys(
-                    event.resource['metadata'])
-                # Keep allowed keys.
-                if self.keys_to_allow:
-                    event.resource['metadata'] = self.get_dict_with_allow_keys(
+            # Remove ignored keys and keep allowed keys, in a single walk.
+            if self.key_filter:
+                for event in self.events:
+                    event.resource['metadata'] = self.key_filter.filter(
                         event.resource['metadata'])
-                type(self)._trim_dict_values(
-                    event.resource['metadata'],
-                    MAX_METADATA_FIELD_SIZE_LIMIT
-                )
 
         except Exception as exception:
             print(
@@ -1265,25 +1554,46 @@ class Trace(object):
             if self.runner:
                 self.runner.terminate()
 
-            trace = json.dumps(
-                self.to_dict(),
-                cls=TraceEncoder,
-                ensure_ascii=True
-            )
+            encoded_events = self._encode_events()
+        except Exception as exception:
+            print('Failed to send trace: encoding failed: {}'.format(
+                exception
+            ))
+            if self.debug:
+                traceback.print_exc()
+            return
+
+        if (
+                self.split_on_send
+                and len(self.events) > 1
+                and len(self._join_encoded_events(encoded_events)) >
+                self._max_trace_size
+        ):
+            self._send_trace_split(encoded_events)
+        else:
+            self._send_encoded_events(encoded_events)
+
+    def _send_encoded_events(self, encoded_events):
+        """
+        Send the trace, built out of the given encoded events, to collector.
+        The trace is stripped if it exceeds the maximum size.
+        :param encoded_events: list of the encoded trace events
+        :return: None
+        """
+        trace = ''
+        try:
+            trace = self._join_encoded_events(encoded_events)
 
             trace_length = len(trace)
             if trace_length > self._max_trace_size:
                 # Trace too big.
-                self._strip(trace_length)
+                self._strip(trace_length, encoded_events)
                 self.runner.resource['metadata']['is_trimmed'] = True
+                self._update_encoded_event(self.runner, encoded_events)
 
-                trace = json.dumps(
-                    self.to_dict(),
-                    cls=TraceEncoder,
-                    ensure_ascii=True
-                )
+                trace = self._join_encoded_events(encoded_events)
 
-            self.transport.send(self)
+            self.transport.send(self, trace)
             self.trace_sent = True
 
             if self.debug:
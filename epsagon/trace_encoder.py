@@ -1,7 +1,82 @@
 """ JSONEncoder for trace objects """
 
 from datetime import datetime, date
+from uuid import UUID
 import json
+import threading
+from epsagon.constants import JSON_BACKEND
+
+try:
+    from enum import Enum
+except ImportError:
+    # Python 2, where orjson isn't available either
+    Enum = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+def _bytes_serializer(o):
+    return o.decode('utf-8', errors='ignore')
+
+
+# Serializers of the non-JSON types, by type. Subclasses use the serializer
+# of their closest registered base class, other types are encoded with `repr`.
+SERIALIZERS = {
+    set: list,
+    datetime: datetime.isoformat,
+    date: date.isoformat,
+    bytes: _bytes_serializer,
+}
+# Serializer of every type seen so far, resolved on first sight.
+_SERIALIZERS_CACHE = {}
+_SERIALIZERS_LOCK = threading.Lock()
+
+
+def register_serializer(cls, serializer):
+    """
+    Registers how to encode objects of a type (and its subclasses) in traces.
+    :param cls: the type to register
+    :param serializer: a function getting an object of the type and
+        returning its JSON serializable form
+    :return: None
+    """
+    with _SERIALIZERS_LOCK:
+        SERIALIZERS[cls] = serializer
+        _SERIALIZERS_CACHE.clear()
+
+
+def _get_serializer(cls):
+    """
+    Returns the serializer of a type.
+    :param cls: the type
+    :return: serializer function
+    """
+    serializer = repr
+    for base in cls.__mro__:
+        if base in SERIALIZERS:
+            serializer = SERIALIZERS[base]
+            break
+    _SERIALIZERS_CACHE[cls] = serializer
+    return serializer
+
+
+def serialize(o):
+    """
+    Returns the JSON serializable form of a non-JSON object.
+    :param o: the object
+    :return: JSON serializable object
+    """
+    cls = type(o)
+    serializer = _SERIALIZERS_CACHE.get(cls) or _get_serializer(cls)
+    return serializer(o)
 
 
 class TraceEncoder(json.JSONEncoder):
@@ -10,16 +85,142 @@ class TraceEncoder(json.JSONEncoder):
     """
 
     def default(self, o):  # pylint: disable=method-hidden
-        if isinstance(o, set):
-            return list(o)
-        if isinstance(o, (datetime, date)):
-            return o.isoformat()
-        if isinstance(o, bytes):
-            return o.decode('utf-8', errors='ignore')
-
-        output = repr(o)
+        # Same as `serialize`, inlined as it is called for every non-JSON
+        # object.
+        cls = type(o)
+        serializer = _SERIALIZERS_CACHE.get(cls) or _get_serializer(cls)
+        return serializer(o)
+
+
+# Kinds of values, when checking whether orjson encodes them like `json`
+_DICT, _SEQUENCE, _FLOAT, _NATIVE, _OTHER = range(5)
+# Kind of every type seen so far
+_ORJSON_KINDS = {
+    str: _OTHER,
+    int: _OTHER,
+    bool: _OTHER,
+    type(None): _OTHER,
+    dict: _DICT,
+    list: _SEQUENCE,
+    tuple: _SEQUENCE,
+    float: _FLOAT,
+}
+
+
+def _get_orjson_kind(cls):
+    """
+    Returns the kind of a type, when checking for orjson native values.
+    :param cls: the type
+    :return: the kind
+    """
+    if issubclass(cls, (UUID, Enum)):
+        kind = _NATIVE
+    elif issubclass(cls, dict):
+        kind = _DICT
+    elif issubclass(cls, (list, tuple)):
+        kind = _SEQUENCE
+    elif issubclass(cls, float):
+        kind = _FLOAT
+    else:
+        kind = _OTHER
+    _ORJSON_KINDS[cls] = kind
+    return kind
+
+
+def _has_orjson_native_values(obj):
+    """
+    Checks if an object holds values that orjson encodes natively, but
+    differently than `json`: UUIDs and enums (encoded with `repr` by
+    `serialize`), and NaN and infinite floats (encoded as `null`).
+    orjson has no option to pass those to `default`.
+    :param obj: the object to encode
+    :return: True if the object holds such values
+    """
+    stack = [obj]
+    pop = stack.pop
+    push = stack.extend
+    while stack:
+        value = pop()
+        cls = type(value)
+        if cls is str:
+            continue
+        kind = _ORJSON_KINDS.get(cls)
+        if kind is None:
+            kind = _get_orjson_kind(cls)
+        if kind == _DICT:
+            push(value.values())
+        elif kind == _SEQUENCE:
+            push(value)
+        elif kind == _FLOAT:
+            # NaN and infinity are the only floats `x - x` isn't 0 for
+            if value - value != 0.0:
+                return True
+        elif kind == _NATIVE:
+            return True
+    return False
+
+
+def _orjson_dumps(obj, default):
+    """
+    Encodes an object with orjson. Raises ValueError when orjson's output
+    would differ from the `json` backend's.
+    :param obj: the object to encode
+    :param default: returns the JSON serializable form of non-JSON objects
+    :return: JSON string
+    """
+    if _has_orjson_native_values(obj):
+        raise ValueError('values encoded differently by orjson')
+    output = orjson.dumps(
+        obj,
+        default=default,
+        option=(
+            orjson.OPT_NON_STR_KEYS |
+            orjson.OPT_PASSTHROUGH_DATETIME |
+            orjson.OPT_PASSTHROUGH_DATACLASS
+        ),
+    )
+    # Traces are sent as ASCII, like the `json` backend `ensure_ascii`.
+    # Non-ASCII traces are left to the `json` backend to escape.
+    if not output.isascii():
+        raise ValueError('non-ASCII output')
+    return output.decode('ascii')
+
+
+def _ujson_dumps(obj, default):
+    return ujson.dumps(
+        obj,
+        default=default,
+        ensure_ascii=True,
+        escape_forward_slashes=False,
+    )
+
+
+def _get_fast_dumps():
+    """
+    Returns the configured fast JSON backend, if installed.
+    :return: dumps function, or None for the `json` backend
+    """
+    if JSON_BACKEND == 'orjson' and orjson is not None:
+        return _orjson_dumps
+    if JSON_BACKEND == 'ujson' and ujson is not None:
+        return _ujson_dumps
+    return None
+
+
+_FAST_DUMPS = _get_fast_dumps()
+
+
+def to_json(obj, default=serialize):
+    """
+    Encodes an object to the trace JSON format, using the configured JSON
+    backend. Falls back to `json` for objects the backend can't encode.
+    :param obj: the object to encode
+    :param default: returns the JSON serializable form of non-JSON objects
+    :return: JSON string
+    """
+    if _FAST_DUMPS is not None:
         try:
-            output = json.JSONEncoder.default(self, o)
-        except TypeError:
+            return _FAST_DUMPS(obj, default)
+        except Exception:  # pylint: disable=broad-except
             pass
-        return output
+    return json.dumps(obj, default=default, ensure_ascii=True)
@@ -1,21 +1,29 @@
 """trace transport layers"""
 
 import os
+import gzip
+import time
+import atexit
 import base64
 import logging
-import json
+import threading
+import weakref
 import urllib3
-from epsagon.constants import SEND_TIMEOUT
-from epsagon.trace_encoder import TraceEncoder
-
-
-def to_json(obj):
-    return json.dumps(obj, cls=TraceEncoder, ensure_ascii=True)
+from six import BytesIO
+from six.moves import queue
+from epsagon.constants import (
+    SEND_TIMEOUT,
+    ASYNC_TRANSPORT_QUEUE_SIZE,
+    ASYNC_TRANSPORT_BATCH_SIZE,
+    ASYNC_TRANSPORT_FLUSH_INTERVAL,
+    TRANSPORT_COMPRESSION,
+)
+from epsagon.trace_encoder import to_json
 
 
 class NoneTransport(object):
     @classmethod
-    def send(cls, _):
+    def send(cls, *_):
         logging.error('trace sent using NoneTransport, configure a transport')
 
 
@@ -23,8 +31,16 @@ class LogTransport(object):
     """ send traces by logging them """
 
     @staticmethod
-    def send(trace):
-        trace_json = to_json(trace.to_dict())
+    def send(trace, encoded_trace=None):
+        """
+        Logs a trace.
+        :param trace: the trace
+        :param encoded_trace: the trace JSON, if already encoded
+        """
+        trace_json = (
+            encoded_trace if encoded_trace is not None
+            else to_json(trace.to_dict())
+        )
         trace_message = base64.b64encode(
             trace_json.encode('utf-8')
         ).decode('utf-8')
@@ -33,6 +49,18 @@ class LogTransport(object):
         print('EPSAGON_TRACE: {}'.format(trace_message))
 
 
+def _request_headers(token):
+    """
+    Returns the headers of the trace requests.
+    :param token: Epsagon token
+    :return: dict of the headers
+    """
+    return {
+        'Authorization': 'Bearer {}'.format(token),
+        'Content-Type': 'application/json'
+    }
+
+
 class HTTPTransport(object):
     """ send traces using http request """
 
@@ -43,19 +71,175 @@ class HTTPTransport(object):
         self.session = urllib3.PoolManager(
             cert_reqs='CERT_REQUIRED',
             ca_certs=os.path.join(os.path.dirname(__file__), 'cacert.pem'),
-            headers={
-                'Authorization': 'Bearer {}'.format(self.token),
-                'Content-Type': 'application/json'
-            },
+            headers=_request_headers(self.token),
             # max size of reusable connections
             maxsize=5
         )
 
-    def send(self, trace):
+    def send(self, trace, encoded_trace=None):
         self.session.request(
             'POST',
             self.dest,
-            body=to_json(trace.to_dict()),
+            body=(
+                encoded_trace if encoded_trace is not None
+                else to_json(trace.to_dict())
+            ),
             timeout=self.timeout,
             retries=False
         )
+
+
+class BatchHTTPTransport(HTTPTransport):
+    """
+    send traces using http requests made by a background thread.
+    Traces are serialized on the calling thread and put on a bounded queue,
+    which a daemon thread drains in batches, so the caller never waits for
+    the collector.
+    """
+
+    def __init__(
+        self,
+        dest,
+        token,
+        max_queue_size=ASYNC_TRANSPORT_QUEUE_SIZE,
+        max_batch_size=ASYNC_TRANSPORT_BATCH_SIZE,
+        flush_interval=ASYNC_TRANSPORT_FLUSH_INTERVAL,
+        compress=TRANSPORT_COMPRESSION,
+    ):
+        super(BatchHTTPTransport, self).__init__(dest, token)
+        self.max_queue_size = max_queue_size
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.compress = compress
+        self.dropped_traces = 0
+        self.failed_traces = 0
+        self._lock = threading.Lock()
+        self._queue = None
+        self._worker = None
+        self._pid = None
+
+    def _ensure_worker(self):
+        """
+        Starts the sender thread if it isn't running in this process.
+        Threads do not survive a fork (e.g. Gunicorn pre-fork workers), so a
+        new queue and thread are created whenever the pid changes.
+        """
+        if self._pid == os.getpid() and self._worker is not None:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._worker is not None:
+                return
+            self._queue = queue.Queue(maxsize=self.max_queue_size)
+            self._worker = threading.Thread(
+                target=self._run,
+                name='epsagon-transport'
+            )
+            self._worker.daemon = True
+            self._pid = os.getpid()
+            self._worker.start()
+            _BATCH_TRANSPORTS.add(self)
+
+    def send(self, trace, encoded_trace=None):
+        self._ensure_worker()
+        if encoded_trace is None:
+            encoded_trace = to_json(trace.to_dict())
+        try:
+            self._queue.put_nowait(encoded_trace)
+        except queue.Full:
+            self.dropped_traces += 1
+
+    def _run(self):
+        """
+        Sender thread main loop.
+        """
+        while True:
+            batch = [self._queue.get()]
+            try:
+                while len(batch) < self.max_batch_size:
+                    batch.append(
+                        self._queue.get(timeout=self.flush_interval)
+                    )
+            except queue.Empty:
+                pass
+
+            try:
+                self._send_batch(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _send_batch(self, batch):
+        """
+        Posts a batch of serialized traces over the pooled connections.
+        The collector accepts a single trace per request, so the batch is
+        sent back to back on a kept-alive connection.
+        :param batch: list of serialized traces
+        """
+        headers = None
+        if self.compress:
+            headers = dict(self.session.headers)
+            headers['Content-Encoding'] = 'gzip'
+
+        for trace_json in batch:
+            body = trace_json.encode('utf-8')
+            if self.compress:
+                body = _gzip(body)
+            try:
+                self.session.request(
+                    'POST',
+                    self.dest,
+                    body=body,
+                    headers=headers,
+                    timeout=self.timeout,
+                    retries=False
+                )
+            except Exception:  # pylint: disable=broad-except
+                self.failed_traces += 1
+
+    def flush(self, timeout=None):
+        """
+        Waits until all the queued traces are sent.
+        :param timeout: max seconds to wait, defaults to the send timeout
+            per queued trace.
+        :return: True if the queue was drained, False on timeout
+        """
+        trace_queue = self._queue
+        if trace_queue is None or self._pid != os.getpid():
+            return True
+
+        if timeout is None:
+            timeout = self.timeout * max(trace_queue.qsize(), 1)
+        deadline = time.time() + timeout
+        with trace_queue.all_tasks_done:
+            while trace_queue.unfinished_tasks:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                trace_queue.all_tasks_done.wait(remaining)
+        return True
+
+
+# Batch transports with a sender thread, flushed when the process exits.
+_BATCH_TRANSPORTS = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_batch_transports():
+    """
+    Sends the traces queued by the batch transports, on exit.
+    :return: None
+    """
+    for transport in list(_BATCH_TRANSPORTS):
+        transport.flush()
+
+
+def _gzip(data):
+    """
+    Gzip compress the given bytes (`gzip.compress` is Python 3 only).
+    :param data: bytes to compress
+    :return: compressed bytes
+    """
+    buf = BytesIO()
+    with gzip.GzipFile(fileobj=buf, mode='wb') as gzip_file:
+        gzip_file.write(data)
+    return buf.getvalue()
@@ -4,13 +4,13 @@ Triggers for aws_lambda
 # pylint: disable=too-many-lines
 
 from __future__ import absolute_import
-from uuid import uuid4
 from importlib import import_module
 import hashlib
 import json
 from epsagon.utils import add_data_if_needed, parse_json, print_debug
 from ..event import BaseEvent
 from ..constants import EPSAGON_HEADER
+from ..id_generator import generate_uuid
 
 # Conditionally importing boto3
 TypeDeserializer = None  # pylint: disable=invalid-name
@@ -45,7 +45,7 @@ class JSONLambdaTrigger(BaseLambdaTrigger):
 
         super(JSONLambdaTrigger, self).__init__(start_time)
 
-        self.event_id = 'trigger-{}'.format(str(uuid4()))
+        self.event_id = 'trigger-{}'.format(generate_uuid())
 
         self.resource['name'] = 'trigger-{}'.format(context.function_name)
         self.resource['operation'] = self.RESOURCE_TYPE
@@ -297,7 +297,7 @@ class ProxyAPIGatewayLambdaTrigger(BaseLambdaTrigger):
 
         super(ProxyAPIGatewayLambdaTrigger, self).__init__(start_time)
         default_request_context = {
-            'requestId': str(uuid4()),
+            'requestId': generate_uuid(),
             'apiId': 'N/A',
             'stage': event.get('environment', 'N/A')
         }
@@ -405,7 +405,7 @@ class ElasticLoadBalancerLambdaTrigger(BaseLambdaTrigger):
         """
         super(ElasticLoadBalancerLambdaTrigger, self).__init__(start_time)
 
-        self.event_id = 'elb-{}'.format(str(uuid4()))
+        self.event_id = 'elb-{}'.format(generate_uuid())
         self.resource['name'] = event['headers']['host']
         self.resource['operation'] = event['httpMethod']
 
@@ -481,7 +481,7 @@ class CognitoLambdaTrigger(BaseLambdaTrigger):
 
         super(CognitoLambdaTrigger, self).__init__(start_time)
 
-        self.event_id = 'cognito-{uid}'.format(uid=str(uuid4()))
+        self.event_id = 'cognito-{uid}'.format(uid=generate_uuid())
         self.resource['name'] = event.get('userPoolId')
         self.resource['operation'] = event.get('triggerSource')
 
@@ -3,9 +3,9 @@ Triggers for Azure Function
 """
 
 from __future__ import absolute_import
-from uuid import uuid4
 from epsagon.utils import add_data_if_needed
 from ..event import BaseEvent
+from ..id_generator import generate_uuid
 try:
     from urllib.parse import urlparse
 except ImportError:
@@ -39,7 +39,7 @@ class HTTPAzureTrigger(BaseAzureTrigger):
         url_data = urlparse(event.url)
         self.resource['name'] = url_data.netloc
 
-        self.event_id = event.headers.get('x-arr-log-id', str(uuid4()))
+        self.event_id = event.headers.get('x-arr-log-id', generate_uuid())
 
         self.resource['metadata'] = {
             'http.request.path': url_data.path,
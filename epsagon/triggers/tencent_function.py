@@ -3,9 +3,9 @@ Triggers for Tencent Functions
 """
 
 from __future__ import absolute_import
-from uuid import uuid4
 from epsagon.utils import add_data_if_needed
 from ..event import BaseEvent
+from ..id_generator import generate_uuid
 
 
 class BaseTencentFunctionTrigger(BaseEvent):
@@ -32,7 +32,7 @@ class JSONTrigger(BaseTencentFunctionTrigger):
 
         super(JSONTrigger, self).__init__(start_time)
 
-        self.event_id = 'trigger-{}'.format(str(uuid4()))
+        self.event_id = 'trigger-{}'.format(generate_uuid())
 
         self.resource['name'] = 'trigger-{}'.format(context['function_name'])
         self.resource['operation'] = self.RESOURCE_TYPE
@@ -63,7 +63,7 @@ class TimerTrigger(BaseTencentFunctionTrigger):
 
         super(TimerTrigger, self).__init__(start_time)
 
-        self.event_id = 'timer-{}'.format(str(uuid4()))
+        self.event_id = 'timer-{}'.format(generate_uuid())
         self.resource['name'] = event['TriggerName']
         self.resource['operation'] = 'Timer'
 
@@ -8,7 +8,6 @@ try:
     from collections import Mapping, Iterable
 except: # pylint: disable=W0702
     from collections.abc import Mapping, Iterable
-import uuid
 import socket
 import sys
 import traceback
@@ -24,6 +23,7 @@ import wrapt
 from epsagon import http_filters
 from epsagon.constants import TRACE_COLLECTOR_URL, REGION, EPSAGON_MARKER
 from .trace import trace_factory, create_transport
+from .id_generator import generate_trace_id, generate_span_id
 from .constants import EPSAGON_HANDLER, DEBUG_MODE, DEFAULT_SAMPLE_RATE
 
 
@@ -101,9 +101,9 @@ def update_http_headers(resource_data, response_headers):
 
 def get_epsagon_http_trace_id():
     """Returns an Epsagon trace ID to inject over HTTP."""
-    trace_id = uuid.uuid4().hex
-    span_id = uuid.uuid4().hex[16:]
-    parent_span_id = uuid.uuid4().hex[16:]
+    trace_id = generate_trace_id()
+    span_id = generate_span_id()
+    parent_span_id = generate_span_id()
     return '{trace_id}:{span_id}:{parent_span_id}:1'.format(
         trace_id=trace_id,
         span_id=span_id,
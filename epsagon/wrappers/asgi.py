@@ -0,0 +1,87 @@
+"""
+ASGI helpers: request body capture and the asyncio trace transports.
+"""
+from epsagon.trace_transports import HTTPTransport
+from epsagon.asyncio_transport import AsyncioBatchHTTPTransport
+from ..utils import print_debug
+
+# (collector URL, token) -> asyncio transport
+ASYNCIO_TRANSPORTS = {}
+
+
+class RequestBodyCapture(object):
+    """
+    Wraps the ASGI receive channel, and keeps a prefix of the request body
+    as the application reads it. The body is never read by Epsagon itself.
+    """
+
+    def __init__(self, receive, max_size):
+        """
+        Initialize.
+        :param receive: the ASGI receive channel
+        :param max_size: max body bytes to keep
+        """
+        self._receive = receive
+        self._max_size = max_size
+        self._chunks = []
+        self._captured_size = 0
+        self.size = 0
+
+    async def receive(self):
+        """
+        Receives an ASGI message, keeping the request body chunks.
+        :return: the message
+        """
+        message = await self._receive()
+        try:
+            if message.get('type') == 'http.request':
+                chunk = message.get('body', b'')
+                self.size += len(chunk)
+                if chunk and self._captured_size < self._max_size:
+                    chunk = chunk[:self._max_size - self._captured_size]
+                    self._chunks.append(chunk)
+                    self._captured_size += len(chunk)
+        except Exception: # pylint: disable=broad-except
+            pass
+        return message
+
+    @property
+    def body(self):
+        """
+        The request body (or its prefix, up to the max size), as bytes.
+        """
+        return b''.join(self._chunks)
+
+
+def use_asyncio_transport(trace):
+    """
+    Makes a trace using the blocking HTTP transport be sent by the
+    asyncio transport, shared by the traces of the same collector.
+    :param trace: the trace about to be sent
+    :return: True if the trace is sent by the asyncio transport
+    """
+    transport = trace.transport
+    # pylint: disable=unidiomatic-typecheck
+    if type(transport) is HTTPTransport:
+        key = (transport.dest, transport.token)
+        transport = ASYNCIO_TRANSPORTS.get(key)
+        if transport is None:
+            transport = AsyncioBatchHTTPTransport(*key)
+            ASYNCIO_TRANSPORTS[key] = transport
+        trace.transport = transport
+    return isinstance(transport, AsyncioBatchHTTPTransport)
+
+
+async def close_asyncio_transports():
+    """
+    Sends the traces queued by the asyncio transports, and closes them.
+    Registered as a shutdown handler of the application.
+    """
+    for transport in list(ASYNCIO_TRANSPORTS.values()):
+        try:
+            await transport.flush()
+            await transport.close()
+        except Exception as exception: # pylint: disable=broad-except
+            print_debug(
+                'Failed to close the asyncio transport: {}'.format(exception)
+            )
@@ -15,7 +15,6 @@ try:
     from collections import Mapping
 except: # pylint: disable=W0702
     from collections.abc import Mapping
-from uuid import uuid4
 
 import epsagon.trace
 import epsagon.runners.aws_lambda
@@ -26,6 +25,7 @@ from epsagon.constants import STEP_DICT_NAME, EPSAGON_EVENT_ID_KEY
 import epsagon.runners.python_function
 from epsagon.common import EpsagonWarning
 from .. import constants
+from ..id_generator import generate_uuid
 
 
 def _add_status_code(runner, return_value):
@@ -261,7 +261,7 @@ def step_lambda_wrapper(func):
                     epsagon.utils.print_debug(
                         'Could not find existing steps data'
                     )
-                    steps_dict = {'id': str(uuid4()), 'step_num': 0}
+                    steps_dict = {'id': generate_uuid(), 'step_num': 0}
                     path = []
                 # Otherwise, just advance the steps number by one.
                 else:
@@ -274,7 +274,7 @@ def step_lambda_wrapper(func):
                             'Steps data found, new dict={}'.format(steps_dict)
                         )
                     else:
-                        steps_dict = {'id': str(uuid4()), 'step_num': 0}
+                        steps_dict = {'id': generate_uuid(), 'step_num': 0}
                         epsagon.utils.print_debug(
                             'Steps data not found, new dict={}'.format(
                                 steps_dict
@@ -2,27 +2,28 @@
 Tracing route for Python fastapi.
 """
 import time
-import uuid
-import json
-import json.decoder
 import asyncio
 import os
 
 import warnings
 from fastapi import Request, Response
-from starlette.requests import ClientDisconnect
 from starlette.concurrency import run_in_threadpool
 
 import epsagon.trace
 from epsagon.runners.fastapi import FastapiRunner
 from epsagon.common import EpsagonWarning
-from epsagon.constants import EPSAGON_MARKER
+from epsagon.constants import (
+    EPSAGON_MARKER,
+    FASTAPI_MAX_REQUEST_BODY_SIZE,
+)
 from epsagon.utils import (
     collect_container_metadata,
     get_traceback_data_from_exception
 )
 from ..http_filters import ignore_request, is_ignored_endpoint
+from .asgi import RequestBodyCapture, use_asyncio_transport
 from ..utils import is_lambda_env, print_debug
+from ..id_generator import generate_uuid
 
 DEFAULT_SUCCESS_STATUS_CODE = 200
 DEFAULT_ERROR_STATUS_CODE = 500
@@ -99,30 +100,6 @@ def _get_epsagon_scope_data(request: Request) -> str:
         return None
 
 
-def _extract_request_body(trace, request):
-    """
-    Extracts the request body (if exists), and saves it to the trace runner.
-    """
-    try:
-        loop = asyncio.new_event_loop()
-        trace.runner.update_request_body(
-            json.dumps(loop.run_until_complete(request.json()))
-        )
-    except json.decoder.JSONDecodeError:
-        pass
-    except ClientDisconnect:
-        print_debug(
-            'Could not extract request body - client is disconnected'
-        )
-    except Exception as exception: # pylint: disable=W0703
-        print_debug(
-            'Could not extract request body: {}'.format(exception)
-        )
-    finally:
-        if loop:
-            loop.close()
-
-
 def _setup_handler(request):
     """
     Setup the handler according to given request epsa.
@@ -203,7 +180,6 @@ def _fastapi_handler(
     if not has_setup_succeeded or should_ignore_request:
         return original_handler(*args, **kwargs)
 
-    created_runner = False
     response = None
     if not trace.runner:
         if not _setup_trace_runner(epsagon_scope, trace, request):
@@ -219,10 +195,6 @@ def _fastapi_handler(
             epsagon.trace.trace_factory.unset_thread_local_unique_id()
         except Exception: # pylint: disable=broad-except
             pass
-    # no need to update request body if runner already created before
-    if created_runner:
-        _extract_request_body(trace, request)
-
     return _handle_response(
         epsagon_scope,
         response,
@@ -267,7 +239,6 @@ async def _async_fastapi_handler(
     if not has_setup_succeeded or should_ignore_request:
         return await original_handler(*args, **kwargs)
 
-    created_runner = False
     response = None
     if not trace.runner:
         if not _setup_trace_runner(epsagon_scope, trace, request):
@@ -283,10 +254,6 @@ async def _async_fastapi_handler(
             epsagon.trace.trace_factory.unset_thread_local_unique_id()
         except Exception: # pylint: disable=broad-except
             pass
-    # no need to update request body if runner already created before
-    if created_runner:
-        _extract_request_body(trace, request)
-
     return _handle_response(
         epsagon_scope,
         response,
@@ -414,7 +381,7 @@ async def server_call_wrapper(wrapped, _instance, args, kwargs):
             epsagon.trace.trace_factory.switch_to_async_tracer()
         else:
             epsagon.trace.trace_factory.switch_to_multiple_traces()
-        unique_id = str(uuid.uuid4())
+        unique_id = generate_uuid()
         trace = epsagon.trace.trace_factory.get_or_create_trace(
             unique_id=unique_id
         )
@@ -431,6 +398,13 @@ async def server_call_wrapper(wrapped, _instance, args, kwargs):
     raised_error = None
     sent_trace = False
     epsagon_scope = scope[EPSAGON_MARKER]
+    body_capture = None
+    if not epsagon.trace.trace_factory.metadata_only:
+        body_capture = RequestBodyCapture(
+            args[1],
+            FASTAPI_MAX_REQUEST_BODY_SIZE
+        )
+        args = (scope, body_capture.receive, args[2])
     try:
         response = await wrapped(*args, **kwargs)
     except Exception as exception: # pylint: disable=broad-except
@@ -445,10 +419,19 @@ async def server_call_wrapper(wrapped, _instance, args, kwargs):
                     DEFAULT_ERROR_STATUS_CODE,
                     override=False
                 )
-            await run_in_threadpool(
-                epsagon.trace.trace_factory.send_traces,
-                trace=trace
-            )
+            if body_capture is not None and body_capture.size:
+                trace.runner.update_request_body(
+                    body_capture.body,
+                    body_capture.size
+                )
+            if use_asyncio_transport(trace):
+                # Only encodes and enqueues the trace
+                epsagon.trace.trace_factory.send_traces(trace=trace)
+            else:
+                await run_in_threadpool(
+                    epsagon.trace.trace_factory.send_traces,
+                    trace=trace
+                )
             sent_trace = True
         except Exception as exception: # pylint: disable=broad-except
             print_debug('Failed to send traces: {}'.format(exception))
@@ -0,0 +1,74 @@
+"""
+Microbenchmark of epsagon's ID generator against `uuid.uuid4()`.
+
+Usage:
+    python scripts/benchmark_ids.py [--number 200000]
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BENCHMARKS = (
+    (
+        'event id',
+        'str(uuid.uuid4())',
+        'generate_uuid()',
+    ),
+    (
+        'trace id',
+        'uuid.uuid4().hex',
+        'generate_trace_id()',
+    ),
+    (
+        'span id',
+        'uuid.uuid4().hex[16:]',
+        'generate_span_id()',
+    ),
+    (
+        'http header',
+        (
+            "'{}:{}:{}:1'.format("
+            'uuid.uuid4().hex, uuid.uuid4().hex[16:], uuid.uuid4().hex[16:])'
+        ),
+        'get_epsagon_http_trace_id()',
+    ),
+)
+
+SETUP = '''
+import uuid
+from epsagon.id_generator import (
+    generate_uuid, generate_trace_id, generate_span_id
+)
+from epsagon.utils import get_epsagon_http_trace_id
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--number', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print('{:<14}{:>14}{:>14}{:>10}'.format(
+        'id', 'uuid4 ns', 'epsagon ns', 'speedup'
+    ))
+    for name, uuid_stmt, epsagon_stmt in BENCHMARKS:
+        uuid_ns, epsagon_ns = [
+            min(timeit.repeat(
+                stmt, SETUP, repeat=args.repeat, number=args.number
+            )) / args.number * 1e9
+            for stmt in (uuid_stmt, epsagon_stmt)
+        ]
+        print('{:<14}{:>14.0f}{:>14.0f}{:>9.1f}x'.format(
+            name, uuid_ns, epsagon_ns, uuid_ns / epsagon_ns
+        ))
+
+
+if __name__ == '__main__':
+    main()
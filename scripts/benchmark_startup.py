@@ -0,0 +1,412 @@
+"""
+Cold-start benchmark for the epsagon package.
+
+Every scenario is measured in fresh interpreters, so nothing is cached in
+`sys.modules` between runs:
+
+    baseline   - an empty interpreter, the floor for the numbers below.
+    minimal    - `import epsagon` with none of the instrumented libraries
+                 installed (they are hidden from the import system).
+    installed  - `import epsagon` with whatever is installed in this env.
+    preloaded  - `import epsagon` after the installed instrumented libraries
+                 were already imported by the application, which includes
+                 the cost of patching them.
+    lambda     - a simulated Lambda cold start through `epsagon.handler`.
+
+Usage:
+    python scripts/benchmark_startup.py [--runs 5] [--json results.json]
+        [--compare previous.json] [--tolerance 0.2]
+        [--max-import-ms 500] [--max-rss-mb 100]
+
+Exits with 1 if a budget is exceeded or a scenario regressed by more than
+the tolerance compared to a previous `--json` output.
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+from collections import OrderedDict
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Libraries epsagon instruments (or imports for an instrumentation), which
+# are optional at runtime and are hidden in the `minimal` scenario.
+OPTIONAL_LIBRARIES = (
+    'aiohttp',
+    'azure',
+    'boto3',
+    'botocore',
+    'celery',
+    'django',
+    'fastapi',
+    'flask',
+    'greengrasssdk',
+    'gunicorn',
+    'httplib2',
+    'kafka',
+    'MySQLdb',
+    'pg8000',
+    'psycopg2',
+    'pymongo',
+    'pymysql',
+    'pynamodb',
+    'pyqldb',
+    'qcloud_cos',
+    'redis',
+    'requests',
+    's3transfer',
+    'sqlalchemy',
+    'starlette',
+    'tornado',
+)
+
+LAMBDA_HANDLER_MODULE = 'benchmark_handler'
+LAMBDA_HANDLER = '''
+def handler(event, context):
+    return event
+'''
+
+# Runs in the measured interpreter. Reports the import wall time and the
+# peak RSS of the process as JSON on stdout.
+CHILD_CODE = '''
+import sys
+import json
+import time
+hidden = set(sys.argv[1].split(',')) if sys.argv[1] else set()
+preload = sys.argv[2].split(',') if sys.argv[2] else []
+target = sys.argv[3]
+
+
+class HiddenFinder(object):
+    def find_module(self, fullname, path=None):
+        if fullname.split('.', 1)[0] in hidden:
+            return self
+        return None
+
+    def find_spec(self, fullname, path=None, target=None):
+        if self.find_module(fullname, path):
+            raise ImportError('No module named {}'.format(fullname))
+        return None
+
+    def load_module(self, fullname):
+        raise ImportError('No module named {}'.format(fullname))
+
+
+if hidden:
+    sys.meta_path.insert(0, HiddenFinder())
+
+for library in preload:
+    __import__(library)
+
+timer = getattr(time, 'perf_counter', time.time)
+start = timer()
+if target:
+    __import__(target)
+duration = timer() - start
+
+try:
+    import resource
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    if sys.platform != 'darwin':
+        max_rss *= 1024
+except ImportError:
+    max_rss = None
+
+sys.stdout.write(json.dumps({
+    'import_ms': duration * 1000,
+    'max_rss': max_rss,
+    'modules': len(sys.modules),
+}))
+'''
+
+
+def installed_libraries():
+    """
+    Finds which of the optional libraries can be imported in this env.
+    :return: list of library names
+    """
+    code = (
+        'import sys, pkgutil\n'
+        'names = set(m[1] for m in pkgutil.iter_modules())\n'
+        'sys.stdout.write(",".join(n for n in sys.argv[1].split(",") '
+        'if n in names))'
+    )
+    output = subprocess.check_output(
+        [sys.executable, '-c', code, ','.join(OPTIONAL_LIBRARIES)]
+    ).decode('utf-8')
+    return [name for name in output.split(',') if name]
+
+
+def build_scenarios(handler_dir):
+    """
+    Builds the scenarios to measure.
+    :param handler_dir: directory of the simulated Lambda handler module
+    :return: list of (name, hidden, preload, target, extra env) tuples
+    """
+    libraries = installed_libraries()
+    lambda_env = {
+        'EPSAGON_HANDLER': '{}.handler'.format(LAMBDA_HANDLER_MODULE),
+        'AWS_LAMBDA_FUNCTION_NAME': 'epsagon-benchmark',
+        'AWS_REGION': 'us-east-1',
+        'PYTHONPATH': os.pathsep.join([ROOT_DIR, handler_dir]),
+    }
+    return [
+        ('baseline', (), (), '', {}),
+        ('minimal', OPTIONAL_LIBRARIES, (), 'epsagon', {}),
+        ('installed', (), (), 'epsagon', {}),
+        ('preloaded', (), libraries, 'epsagon', {}),
+        ('lambda', (), (), 'epsagon.handler', lambda_env),
+    ]
+
+
+def child_env(extra_env):
+    """
+    Environment of the measured interpreter. Epsagon's own variables are
+    cleared, so the results don't depend on the shell running the benchmark.
+    :param extra_env: variables to add
+    :return: dict
+    """
+    env = dict(
+        (key, value) for key, value in os.environ.items()
+        if not key.startswith('EPSAGON_') and key != 'DISABLE_EPSAGON'
+    )
+    env['PYTHONPATH'] = ROOT_DIR
+    env.update(extra_env)
+    return env
+
+
+def run_child(scenario, import_time=False):
+    """
+    Runs a single measurement in a fresh interpreter.
+    :param scenario: scenario tuple
+    :param import_time: run with `-X importtime`
+    :return: (measurement dict, stderr)
+    """
+    _, hidden, preload, target, extra_env = scenario
+    command = [sys.executable]
+    if import_time:
+        command += ['-X', 'importtime']
+    command += ['-c', CHILD_CODE, ','.join(hidden), ','.join(preload), target]
+    process = subprocess.Popen(
+        command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        env=child_env(extra_env),
+        cwd=ROOT_DIR,
+    )
+    stdout, stderr = process.communicate()
+    stderr = stderr.decode('utf-8', 'replace')
+    if process.returncode != 0:
+        raise RuntimeError(
+            'scenario {} failed:\n{}'.format(scenario[0], stderr)
+        )
+    return json.loads(stdout.decode('utf-8')), stderr
+
+
+def median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2.0
+
+
+def measure(scenario, runs):
+    """
+    Measures a scenario, after a warm-up run that compiles the bytecode.
+    :param scenario: scenario tuple
+    :param runs: number of measured runs
+    :return: dict of results
+    """
+    run_child(scenario)
+    results = [run_child(scenario)[0] for _ in range(runs)]
+    rss = [result['max_rss'] for result in results if result['max_rss']]
+    return {
+        'import_ms': median([result['import_ms'] for result in results]),
+        'min_import_ms': min(result['import_ms'] for result in results),
+        'max_rss_mb': median(rss) / (1024.0 * 1024) if rss else None,
+        'modules': results[-1]['modules'],
+    }
+
+
+def parse_import_time(stderr):
+    """
+    Parses `-X importtime` output.
+    :param stderr: the interpreter's stderr
+    :return: list of (module, self us, cumulative us)
+    """
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        modules.append(
+            (parts[2].strip(), int(parts[0]), int(parts[1]))
+        )
+    return modules
+
+
+def module_costs(scenario):
+    """
+    Per-module import cost of a scenario, or None if `-X importtime` isn't
+    supported (Python < 3.7).
+    :param scenario: scenario tuple
+    :return: dict with the epsagon modules and the libraries they import
+    """
+    if sys.version_info < (3, 7):
+        return None
+    _, stderr = run_child(scenario, import_time=True)
+    modules = parse_import_time(stderr)
+    epsagon_modules = [
+        module for module in modules
+        if module[0].split('.', 1)[0] == 'epsagon'
+    ]
+    # Top-level third-party imports triggered while importing epsagon
+    libraries = [
+        module for module in modules
+        if '.' not in module[0] and module[0] in OPTIONAL_LIBRARIES
+    ]
+    return {
+        'epsagon': sorted(epsagon_modules, key=lambda m: -m[1]),
+        'libraries': sorted(libraries, key=lambda m: -m[2]),
+    }
+
+
+def print_results(results, costs, top):
+    print('{:<12}{:>12}{:>12}{:>12}{:>10}'.format(
+        'scenario', 'import ms', 'min ms', 'max RSS MB', 'modules'
+    ))
+    for name, result in results.items():
+        print('{:<12}{:>12.1f}{:>12.1f}{:>12}{:>10}'.format(
+            name,
+            result['import_ms'],
+            result['min_import_ms'],
+            (
+                '{:.1f}'.format(result['max_rss_mb'])
+                if result['max_rss_mb'] is not None else '-'
+            ),
+            result['modules'],
+        ))
+
+    for name, cost in costs.items():
+        if not cost:
+            continue
+        print('\n[{}] epsagon modules by self import time:'.format(name))
+        for module, self_us, cumulative_us in cost['epsagon'][:top]:
+            print('  {:<45}{:>10.2f} ms{:>10.2f} ms cumulative'.format(
+                module, self_us / 1000.0, cumulative_us / 1000.0
+            ))
+        if cost['libraries']:
+            print('[{}] libraries imported:'.format(name))
+            for module, _, cumulative_us in cost['libraries'][:top]:
+                print('  {:<45}{:>10.2f} ms cumulative'.format(
+                    module, cumulative_us / 1000.0
+                ))
+
+
+def check(results, previous, tolerance, max_import_ms, max_rss_mb):
+    """
+    Checks the results against the budgets and the previous results.
+    :return: list of failure messages
+    """
+    failures = []
+    for name, result in results.items():
+        if name == 'baseline':
+            continue
+        if max_import_ms and result['import_ms'] > max_import_ms:
+            failures.append('{}: import took {:.1f}ms, budget is {}ms'.format(
+                name, result['import_ms'], max_import_ms
+            ))
+        if (
+                max_rss_mb and result['max_rss_mb'] and
+                result['max_rss_mb'] > max_rss_mb
+        ):
+            failures.append('{}: max RSS is {:.1f}MB, budget is {}MB'.format(
+                name, result['max_rss_mb'], max_rss_mb
+            ))
+
+        old = previous.get(name)
+        if not old:
+            continue
+        for key in ('import_ms', 'max_rss_mb'):
+            if old.get(key) and result[key] > old[key] * (1 + tolerance):
+                failures.append('{}: {} regressed from {:.1f} to {:.1f}'.format(
+                    name, key, old[key], result[key]
+                ))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument(
+        '--scenario',
+        action='append',
+        help='scenario to run, can be repeated (default: all)',
+    )
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--json', help='write the results to this file')
+    parser.add_argument('--compare', help='results file of a previous run')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('--max-import-ms', type=float)
+    parser.add_argument('--max-rss-mb', type=float)
+    args = parser.parse_args()
+
+    handler_dir = tempfile.mkdtemp()
+    try:
+        with open(
+            os.path.join(handler_dir, LAMBDA_HANDLER_MODULE + '.py'), 'w'
+        ) as handler_file:
+            handler_file.write(LAMBDA_HANDLER)
+
+        results = OrderedDict()
+        costs = OrderedDict()
+        for scenario in build_scenarios(handler_dir):
+            name = scenario[0]
+            if args.scenario and name not in args.scenario:
+                continue
+            results[name] = measure(scenario, args.runs)
+            if scenario[3]:
+                costs[name] = module_costs(scenario)
+    finally:
+        shutil.rmtree(handler_dir)
+
+    print_results(results, costs, args.top)
+
+    if args.json:
+        with open(args.json, 'w') as results_file:
+            json.dump(
+                {'python': sys.version.split()[0], 'results': results},
+                results_file,
+                indent=2,
+                sort_keys=True,
+            )
+
+    previous = {}
+    if args.compare:
+        with open(args.compare) as previous_file:
+            previous = json.load(previous_file)['results']
+
+    failures = check(
+        results,
+        previous,
+        args.tolerance,
+        args.max_import_ms,
+        args.max_rss_mb,
+    )
+    for failure in failures:
+        print('FAILED: {}'.format(failure), file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
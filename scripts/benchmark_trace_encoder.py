@@ -0,0 +1,206 @@
+"""
+Microbenchmark of trace encoding, per JSON backend.
+
+Encodes representative traces (botocore and HTTP events, with some non-JSON
+values) with the previous `TraceEncoder`, the current `to_json` with the
+default `json` backend, and the fast backends that are installed.
+
+The `json` backend is about as fast as the previous encoder: both spend
+most of their time in the C encoder of `json`, and the type dispatch only
+speeds up the few non-JSON values. Faster encoding needs `orjson` (which
+also checks the trace for values it encodes differently) or `ujson`.
+
+Usage:
+    python scripts/benchmark_trace_encoder.py [--number 2000] [--events 20]
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import json
+import time
+import timeit
+import argparse
+from datetime import datetime, date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+import epsagon.trace_encoder
+from epsagon.trace_encoder import to_json
+
+
+class LegacyTraceEncoder(json.JSONEncoder):
+    """
+    The TraceEncoder before the type dispatch
+    """
+
+    def default(self, o):  # pylint: disable=method-hidden
+        if isinstance(o, set):
+            return list(o)
+        if isinstance(o, (datetime, date)):
+            return o.isoformat()
+        if isinstance(o, bytes):
+            return o.decode('utf-8', errors='ignore')
+
+        output = repr(o)
+        try:
+            output = json.JSONEncoder.default(self, o)
+        except TypeError:
+            pass
+        return output
+
+
+class Response(object):
+    """
+    An object without a JSON form, encoded with `repr`
+    """
+
+
+def _botocore_event(index):
+    return {
+        'id': 'dynamodb-{}'.format(index),
+        'start_time': time.time(),
+        'duration': 0.0123,
+        'error_code': 0,
+        'exception': {},
+        'origin': 'botocore',
+        'resource': {
+            'name': 'users',
+            'type': 'dynamodb',
+            'operation': 'PutItem',
+            'metadata': {
+                'region': 'us-east-1',
+                'request_id': 'ABCDEFGHIJKLMNOPQRSTUVWXYZ{}'.format(index),
+                'retry_attempts': 0,
+                'status_code': 200,
+                'Item': {
+                    'id': {'S': 'user-{}'.format(index)},
+                    'name': {'S': 'name ' * 10},
+                    'tags': {'SS': ['a', 'b', 'c']},
+                    'created': {'N': '1600000000'},
+                },
+                'Item Hash': '0123456789abcdef' * 2,
+                'Last Modified': datetime(2020, 1, 1, 12, 0, 0),
+                'Keys': {'id', 'name'},
+                'Response': Response(),
+            },
+        },
+    }
+
+
+def _http_event(index):
+    return {
+        'id': 'http-{}'.format(index),
+        'start_time': time.time(),
+        'duration': 0.0456,
+        'error_code': 0,
+        'exception': {},
+        'origin': 'http',
+        'resource': {
+            'name': 'api.example.com',
+            'type': 'http',
+            'operation': 'POST',
+            'metadata': {
+                'url': 'https://api.example.com/v1/items?page={}'.format(
+                    index
+                ),
+                'status_code': 201,
+                'request_headers': {
+                    'Content-Type': 'application/json',
+                    'User-Agent': 'python-requests/2.25.1',
+                    'Authorization': 'Bearer token',
+                },
+                'response_headers': {
+                    'Content-Type': 'application/json',
+                    'Content-Length': '512',
+                },
+                'request_body': {
+                    'items': [
+                        {'id': item, 'value': 'value {}'.format(item)}
+                        for item in range(10)
+                    ],
+                },
+                'response_body': b'{"ok": true, "id": "' + b'x' * 400 + b'"}',
+            },
+        },
+    }
+
+
+def _trace(events_count):
+    return {
+        'token': 'token',
+        'app_name': 'app',
+        'events': [
+            (_botocore_event if index % 2 else _http_event)(index)
+            for index in range(events_count)
+        ],
+        'exceptions': [],
+        'version': '1.0.0',
+        'platform': 'Python {}.{}'.format(*sys.version_info[:2]),
+    }
+
+
+def _backends():
+    """
+    Returns the benchmarked encoders, by name.
+    """
+    backends = [
+        ('legacy', lambda trace: json.dumps(
+            trace, cls=LegacyTraceEncoder, ensure_ascii=True
+        )),
+        ('json', _backend_to_json(None)),
+    ]
+    for name, dumps in (
+            ('orjson', epsagon.trace_encoder._orjson_dumps),
+            ('ujson', epsagon.trace_encoder._ujson_dumps),
+    ):
+        if getattr(epsagon.trace_encoder, name) is None:
+            print('{} is not installed, skipped'.format(name))
+            continue
+        backends.append((name, _backend_to_json(dumps)))
+    return backends
+
+
+def _backend_to_json(dumps):
+    def _to_json(trace):
+        epsagon.trace_encoder._FAST_DUMPS = dumps
+        try:
+            return to_json(trace)
+        finally:
+            epsagon.trace_encoder._FAST_DUMPS = None
+    return _to_json
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--number', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--events', type=int, default=20)
+    args = parser.parse_args()
+
+    trace = _trace(args.events)
+    backends = _backends()
+    legacy_us = None
+    print('{:<10}{:>14}{:>12}{:>10}'.format(
+        'backend', 'us / trace', 'MB / s', 'speedup'
+    ))
+    for name, encode in backends:
+        encoded_size = len(encode(trace))
+        encode_us = min(timeit.repeat(
+            lambda: encode(trace),  # pylint: disable=cell-var-from-loop
+            repeat=args.repeat,
+            number=args.number,
+        )) / args.number * 1e6
+        legacy_us = legacy_us or encode_us
+        print('{:<10}{:>14.1f}{:>12.1f}{:>9.1f}x'.format(
+            name,
+            encode_us,
+            encoded_size / encode_us,
+            legacy_us / encode_us,
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+"""
+A minimal PostgreSQL server (simple query protocol only), for running
+psycopg2 without a database.
+Every query returns `rows`, and every `COPY ... FROM STDIN` data is kept in
+`copied_data`.
+"""
+import re
+import struct
+import threading
+import socketserver
+
+SSL_REQUEST = 80877103
+GSSENC_REQUEST = 80877104
+FETCH_RE = re.compile(r'FETCH FORWARD (\d+|ALL) FROM', re.IGNORECASE)
+
+
+def _message(message_type, body=b''):
+    return message_type + struct.pack('!i', len(body) + 4) + body
+
+
+def _command_complete(tag):
+    return _message(b'C', tag.encode() + b'\0')
+
+
+def _row_description():
+    return _message(
+        b'T',
+        struct.pack('!h', 1) + b'x\0' + struct.pack('!ihihih', 0, 0, 25, -1, -1, 0)
+    )
+
+
+def _data_row(value):
+    value = value.encode()
+    return _message(b'D', struct.pack('!hi', 1, len(value)) + value)
+
+
+class _Handler(socketserver.BaseRequestHandler):
+
+    def _read(self, size):
+        data = b''
+        while len(data) < size:
+            chunk = self.request.recv(size - len(data))
+            if not chunk:
+                raise EOFError()
+            data += chunk
+        return data
+
+    def _read_message(self):
+        message_type = self._read(1)
+        length, = struct.unpack('!i', self._read(4))
+        return message_type, self._read(length - 4)
+
+    def _startup(self):
+        while True:
+            length, code = struct.unpack('!ii', self._read(8))
+            self._read(length - 8)
+            if code in (SSL_REQUEST, GSSENC_REQUEST):
+                self.request.sendall(b'N')
+                continue
+            break
+        parameters = b''.join(
+            _message(b'S', name + b'\0' + value + b'\0')
+            for name, value in (
+                (b'server_version', b'13.0'),
+                (b'client_encoding', b'UTF8'),
+                (b'DateStyle', b'ISO, MDY'),
+                (b'integer_datetimes', b'on'),
+                (b'standard_conforming_strings', b'on'),
+            )
+        )
+        self.request.sendall(
+            _message(b'R', struct.pack('!i', 0)) +
+            parameters +
+            _message(b'K', struct.pack('!ii', 1, 1)) +
+            _message(b'Z', b'I')
+        )
+
+    def handle(self):
+        server = self.server
+        transaction_status = b'I'
+        try:
+            self._startup()
+            while True:
+                message_type, body = self._read_message()
+                if message_type != b'Q':
+                    return
+                query = body.rstrip(b'\0').decode()
+                server.queries.append(query)
+                command = query.split()[0].upper()
+                if command == 'BEGIN':
+                    transaction_status = b'T'
+                elif command in ('COMMIT', 'ROLLBACK'):
+                    transaction_status = b'I'
+                self.request.sendall(
+                    self._respond(command, query) +
+                    _message(b'Z', transaction_status)
+                )
+        except EOFError:
+            return
+
+    def _respond(self, command, query):
+        server = self.server
+        if command == 'COPY' and 'STDIN' in query.upper():
+            self.request.sendall(_message(b'G', struct.pack('!bh', 0, 0)))
+            data = b''
+            while True:
+                message_type, body = self._read_message()
+                if message_type != b'd':
+                    break
+                data += body
+            server.copied_data.append(data)
+            return _command_complete('COPY {}'.format(data.count(b'\n')))
+        if command == 'COPY':
+            rows = [row.encode() + b'\n' for row in server.rows]
+            return (
+                _message(b'H', struct.pack('!bh', 0, 0)) +
+                b''.join(_message(b'd', row) for row in rows) +
+                _message(b'c') +
+                _command_complete('COPY {}'.format(len(rows)))
+            )
+        if command in ('SELECT', 'FETCH'):
+            rows = server.rows
+            fetch = FETCH_RE.search(query)
+            if fetch:
+                count = fetch.group(1)
+                count = None if count.upper() == 'ALL' else int(count)
+                rows = server.cursor_rows[:count]
+                del server.cursor_rows[:count]
+            return (
+                _row_description() +
+                b''.join(_data_row(row) for row in rows) +
+                _command_complete('{} {}'.format(command, len(rows)))
+            )
+        if command == 'DECLARE':
+            server.cursor_rows = list(server.rows)
+            return _command_complete('DECLARE CURSOR')
+        if command in ('INSERT', 'UPDATE', 'DELETE'):
+            return _command_complete(
+                'INSERT 0 1' if command == 'INSERT' else command + ' 1'
+            )
+        return _command_complete(command)
+
+
+class FakePostgres(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, rows=('1',)):
+        socketserver.ThreadingTCPServer.__init__(
+            self, ('127.0.0.1', 0), _Handler
+        )
+        self.rows = list(rows)
+        self.cursor_rows = []
+        self.queries = []
+        self.copied_data = []
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def dsn(self):
+        return 'host=127.0.0.1 port={} dbname=db user=user sslmode=disable ' \
+               'gssencmode=disable'.format(self.server_address[1])
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
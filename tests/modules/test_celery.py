@@ -0,0 +1,40 @@
+import mock
+from epsagon.runners.celery import get_broker_metadata
+
+
+class App(object):
+    def __init__(self):
+        self.conf = mock.MagicMock(broker_url='amqp://broker:5672//')
+        self.connection = mock.MagicMock()
+        self.connection.return_value.hostname = 'broker'
+        self.connection.return_value.virtual_host = '/'
+        self.connection.return_value.transport.driver_type = 'amqp'
+
+
+def _set_current_app(import_module_mock, app):
+    current_app = import_module_mock.return_value.current_app
+    current_app._get_current_object.return_value = app
+
+
+@mock.patch('epsagon.runners.celery.import_module')
+def test_broker_metadata_cached_per_app(import_module_mock):
+    app = App()
+    _set_current_app(import_module_mock, app)
+
+    expected = {'hostname': 'broker', 'virtual_host': '/', 'driver': 'amqp'}
+    assert get_broker_metadata() == expected
+    assert get_broker_metadata() == expected
+    assert app.connection.call_count == 1
+    app.connection.return_value.release.assert_called_once_with()
+
+    # A broker config change refreshes the metadata
+    app.conf.broker_url = 'redis://other:6379/0'
+    app.connection.return_value.hostname = 'other'
+    assert get_broker_metadata()['hostname'] == 'other'
+    assert app.connection.call_count == 2
+
+    # Each app has its own broker
+    other_app = App()
+    _set_current_app(import_module_mock, other_app)
+    assert get_broker_metadata() == expected
+    assert other_app.connection.call_count == 1
@@ -0,0 +1,151 @@
+import sqlite3
+import mock
+import epsagon.events.dbapi
+import epsagon.modules.db_wrapper
+from epsagon.modules.db_wrapper import ConnectionWrapper
+from epsagon.trace import trace_factory
+
+INSERT_QUERY = 'INSERT INTO items VALUES (?, ?)'
+
+
+def setup_function(func):
+    trace_factory.get_or_create_trace()
+
+
+def _events():
+    return trace_factory.get_or_create_trace().events
+
+
+def _cursor():
+    connection = sqlite3.connect(':memory:')
+    connection.execute('CREATE TABLE items (id INTEGER, name TEXT)')
+    return ConnectionWrapper(connection, (), {'database': 'db'}).cursor()
+
+
+def test_execute_returns_value():
+    cursor = _cursor()
+    assert cursor.execute(INSERT_QUERY, (1, 'a')) is cursor.__wrapped__
+
+    event, = _events()
+    assert event.resource['name'] == 'db'
+    assert event.resource['operation'] == 'insert'
+    assert event.resource['metadata']['Related Rows Count'] == 1
+
+
+def test_executemany_list():
+    cursor = _cursor()
+    cursor.executemany(INSERT_QUERY, [(index, 'ab') for index in range(10)])
+
+    event, = _events()
+    metadata = event.resource['metadata']
+    assert event.resource['operation'] == 'insert'
+    assert metadata['Table Name'] == 'items'
+    assert metadata['Parameter Sets Count'] == 10
+    assert metadata['Parameters Size'] == 10 * 3
+    assert metadata['Related Rows Count'] == 10
+
+
+def test_executemany_generator():
+    cursor = _cursor()
+    cursor.executemany(INSERT_QUERY, ((index, 'abc') for index in range(5)))
+    cursor.execute('SELECT * FROM items')
+    assert len(cursor.fetchall()) == 5
+
+    event, _ = _events()
+    metadata = event.resource['metadata']
+    assert metadata['Parameter Sets Count'] == 5
+    assert metadata['Parameters Size'] == 5 * 4
+
+
+def test_callproc():
+    cursor = ConnectionWrapper(
+        mock.MagicMock(spec=['cursor']), (), {'database': 'db'}
+    ).cursor()
+    cursor.__wrapped__.rowcount = 2
+    cursor.callproc('refresh_items', (1,))
+
+    event, = _events()
+    assert event.resource['operation'] == 'callproc'
+    assert event.resource['metadata']['Procedure Name'] == 'refresh_items'
+    assert 'Table Name' not in event.resource['metadata']
+
+
+def test_execute_coalesced():
+    cursor = _cursor()
+    with mock.patch.object(
+            epsagon.events.dbapi, 'DBAPI_COALESCE_EXECUTE', True
+    ):
+        for index in range(10):
+            cursor.execute(INSERT_QUERY, (index, 'a'))
+        cursor.execute('SELECT * FROM items')
+
+    insert_event, select_event = _events()
+    assert insert_event.resource['metadata']['Executions Count'] == 10
+    assert insert_event.resource['metadata']['Related Rows Count'] == 10
+    assert select_event.resource['operation'] == 'select'
+    assert 'Executions Count' not in select_event.resource['metadata']
+
+
+class DsnConnection(object):
+    dsn = 'host=db.local dbname=shop user=app'
+
+    def cursor(self):
+        return mock.MagicMock(rowcount=1, query=b'SELECT * FROM a, b')
+
+
+def test_dsn_parsed_once():
+    cursor = ConnectionWrapper(DsnConnection(), (), {}).cursor()
+    with mock.patch(
+            'epsagon.events.dbapi.parse_dsn',
+            side_effect=epsagon.events.dbapi.parse_dsn
+    ) as parse_dsn_mock:
+        cursor.execute('SELECT * FROM a, b')
+        cursor.execute('SELECT * FROM a, b')
+
+    _, second_event = _events()
+    assert parse_dsn_mock.call_count == 1
+    assert second_event.resource['name'] == 'shop'
+    metadata = second_event.resource['metadata']
+    assert metadata['Host'] == 'db.local'
+    assert metadata['Table Name'] == 'a'
+    assert metadata['Table Names'] == ['a', 'b']
+    assert metadata['Query Fingerprint'] == 'SELECT * FROM a, b'
+
+
+def test_fetch_timing():
+    with mock.patch.object(
+            epsagon.events.dbapi, 'DBAPI_FETCH_TIMING', True
+    ), mock.patch.object(
+            epsagon.modules.db_wrapper, 'DBAPI_FETCH_TIMING', True
+    ):
+        cursor = _cursor()
+        cursor.executemany(INSERT_QUERY, [(index, 'ab') for index in range(5)])
+        cursor.execute('SELECT * FROM items')
+        assert cursor.fetchone() == (0, 'ab')
+        assert len(cursor.fetchmany(2)) == 2
+        assert len(list(cursor)) == 2
+        assert cursor.fetchall() == []
+        assert cursor.fetchone() is None
+
+    insert_event, select_event = _events()
+    assert 'Rows Fetched' not in insert_event.resource['metadata']
+    metadata = select_event.resource['metadata']
+    assert metadata['Rows Fetched'] == 5
+    assert metadata['Fetched Bytes'] == 5 * 3
+    assert metadata['Fetch Duration'] > 0
+
+
+def test_fetch_timing_reset_by_executemany():
+    with mock.patch.object(
+            epsagon.events.dbapi, 'DBAPI_FETCH_TIMING', True
+    ), mock.patch.object(
+            epsagon.modules.db_wrapper, 'DBAPI_FETCH_TIMING', True
+    ):
+        cursor = _cursor()
+        cursor.execute('SELECT * FROM items')
+        cursor.executemany(INSERT_QUERY, [(index, 'ab') for index in range(2)])
+        cursor.fetchall()
+
+    select_event, insert_event = _events()
+    assert 'Rows Fetched' not in select_event.resource['metadata']
+    assert 'Rows Fetched' not in insert_event.resource['metadata']
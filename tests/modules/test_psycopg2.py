@@ -0,0 +1,175 @@
+import io
+import select
+import psycopg2
+import psycopg2.extras
+import psycopg2.extensions
+import pytest
+import mock
+import epsagon.events.dbapi
+import epsagon.modules.psycopg2
+from epsagon.modules.psycopg2 import (
+    _connect_wrapper,
+    EpsagonConnection,
+    EpsagonCursor,
+)
+from epsagon.modules.db_wrapper import ConnectionWrapper
+from epsagon.trace import trace_factory
+from .fake_postgres import FakePostgres
+
+
+@pytest.fixture(scope='module')
+def server():
+    fake_postgres = FakePostgres(rows=['a', 'b'])
+    yield fake_postgres
+    fake_postgres.stop()
+
+
+def setup_function(func):
+    trace_factory.get_or_create_trace()
+
+
+def _events():
+    return trace_factory.get_or_create_trace().events
+
+
+def _connect(server, *args, **kwargs):
+    # psycopg2 may be patched already
+    connect = getattr(psycopg2.connect, '__wrapped__', psycopg2.connect)
+    return _connect_wrapper(connect, None, (server.dsn,) + args, kwargs)
+
+
+def _wait(connection):
+    while True:
+        state = connection.poll()
+        if state == psycopg2.extensions.POLL_OK:
+            return
+        if state == psycopg2.extensions.POLL_READ:
+            select.select([connection.fileno()], [], [])
+        else:
+            select.select([], [connection.fileno()], [])
+
+
+def test_execute(server):
+    connection = _connect(server)
+    cursor = connection.cursor()
+    assert type(connection) is EpsagonConnection
+    assert type(cursor) is EpsagonCursor
+
+    cursor.execute('SELECT * FROM items WHERE id = %s', (1,))
+    assert cursor.fetchall() == [('a',), ('b',)]
+
+    event, = _events()
+    assert event.resource['name'] == 'db'
+    assert event.resource['operation'] == 'select'
+    metadata = event.resource['metadata']
+    assert metadata['Driver'] == 'psycopg2'
+    assert metadata['Table Name'] == 'items'
+    assert metadata['Related Rows Count'] == 2
+    assert 'Cursor Name' not in metadata
+
+
+def test_user_factories(server):
+    connection = _connect(
+        server,
+        connection_factory=psycopg2.extras.DictConnection
+    )
+    cursor = connection.cursor()
+    assert isinstance(connection, psycopg2.extras.DictConnection)
+    assert isinstance(cursor, psycopg2.extras.DictCursor)
+
+    cursor.execute('SELECT x FROM items')
+    assert cursor.fetchone()['x'] == 'a'
+    assert len(_events()) == 1
+
+    # The instrumented subclasses are created once per factory
+    connection = _connect(server, None, psycopg2.extras.NamedTupleCursor)
+    assert type(connection.cursor()) is type(connection.cursor())
+    assert isinstance(connection.cursor(), psycopg2.extras.NamedTupleCursor)
+
+
+def test_connection_factory_function(server):
+    connection = _connect(
+        server,
+        connection_factory=lambda dsn: psycopg2.extensions.connection(dsn)
+    )
+    assert isinstance(connection, ConnectionWrapper)
+    connection.cursor().execute('SELECT 1')
+    assert len(_events()) == 1
+
+    # The proxy is stripped by the patched psycopg2 functions
+    psycopg2.extensions.register_type(psycopg2.extensions.UNICODE, connection)
+    psycopg2.extensions.register_type(
+        psycopg2.extensions.UNICODE,
+        connection.cursor()
+    )
+    assert psycopg2.extensions.adapt('a').getquoted() == b"'a'"
+    adapter = psycopg2.extensions.adapt('a')
+    adapter.prepare(connection)
+    assert adapter.getquoted() == b"'a'"
+
+
+def test_named_cursor(server):
+    cursor = _connect(server).cursor('items_cursor')
+    cursor.execute('SELECT * FROM items')
+    assert cursor.fetchmany(1) == [('a',)]
+
+    event, = _events()
+    assert event.resource['metadata']['Cursor Name'] == 'items_cursor'
+    assert event.resource['metadata']['Table Name'] == 'items'
+
+
+def test_copy(server):
+    cursor = _connect(server).cursor()
+    cursor.copy_expert('COPY items FROM STDIN', io.BytesIO(b'1\t\xc3\xa9\n'))
+    cursor.copy_from(io.StringIO(u'2\t\xe9\n'), 'items')
+    output = io.StringIO()
+    cursor.copy_to(output, 'items')
+
+    assert server.copied_data[-2:] == [b'1\t\xc3\xa9\n', b'2\t\xc3\xa9\n']
+    assert output.getvalue() == 'a\nb\n'
+    events = _events()
+    assert [event.resource['operation'] for event in events] == ['copy'] * 3
+    assert [
+        event.resource['metadata']['Bytes Copied'] for event in events
+    ] == [5, 5, 4]
+    assert events[0].resource['metadata']['Table Name'] == 'items'
+    # The copied files aren't kept by the events
+    assert all(isinstance(event.statement, bytes) for event in events[1:])
+
+
+def test_async_connection(server):
+    connection = _connect(server, async_=True)
+    _wait(connection)
+    cursor = connection.cursor()
+    cursor.execute('SELECT * FROM items')
+    assert not _events()
+
+    _wait(connection)
+    assert cursor.fetchall() == [('a',), ('b',)]
+    event, = _events()
+    assert event.resource['operation'] == 'select'
+    assert event.resource['metadata']['Related Rows Count'] == 2
+
+
+def test_fetch_timing(server):
+    with mock.patch.object(
+            epsagon.events.dbapi, 'DBAPI_FETCH_TIMING', True
+    ), mock.patch.object(
+            epsagon.modules.psycopg2, 'DBAPI_FETCH_TIMING', True
+    ):
+        connection = _connect(server)
+        cursor = connection.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        cursor.execute('SELECT * FROM items')
+        assert cursor.fetchone()['x'] == 'a'
+        assert [row['x'] for row in cursor] == ['b']
+
+        named_cursor = connection.cursor('items_cursor')
+        named_cursor.execute('SELECT * FROM items')
+        assert named_cursor.fetchmany(size=1) == [('a',)]
+        assert named_cursor.fetchall() == [('b',)]
+
+    for event in _events():
+        metadata = event.resource['metadata']
+        assert metadata['Rows Fetched'] == 2
+        assert metadata['Fetched Bytes'] == 2
+        assert metadata['Fetch Duration'] > 0
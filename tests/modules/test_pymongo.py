@@ -0,0 +1,290 @@
+import mock
+import epsagon.constants
+from epsagon.common import ErrorCode
+from epsagon.modules.pymongo import CommandListener
+from epsagon.events.pymongo import _document_size
+from epsagon.trace import trace_factory
+
+DOCUMENTS = [{'_id': i, 'value': 'document {}'.format(i)} for i in range(20)]
+CONNECTION_ID = ('localhost', 27017)
+
+
+def setup_function(func):
+    trace_factory.get_or_create_trace()
+
+
+def _events():
+    return trace_factory.get_or_create_trace().events
+
+
+def _started(request_id, command_name, command):
+    return mock.MagicMock(
+        connection_id=CONNECTION_ID,
+        request_id=request_id,
+        command_name=command_name,
+        command=command,
+        database_name='db',
+    )
+
+
+def _succeeded(request_id, reply, duration_micros=2000):
+    return mock.MagicMock(
+        connection_id=CONNECTION_ID,
+        request_id=request_id,
+        reply=reply,
+        duration_micros=duration_micros,
+    )
+
+
+def _failed(request_id, failure, duration_micros=2000):
+    return mock.MagicMock(
+        connection_id=CONNECTION_ID,
+        request_id=request_id,
+        failure=failure,
+        duration_micros=duration_micros,
+    )
+
+
+def test_insert_command():
+    listener = CommandListener()
+    trace_factory.metadata_only = False
+    try:
+        listener.started(_started(1, 'insert', {
+            'insert': 'collection', 'documents': DOCUMENTS[:2],
+        }))
+        listener.succeeded(_succeeded(1, {'n': 2, 'ok': 1}))
+        listener.started(_started(2, 'insert', {
+            'insert': 'collection', 'documents': DOCUMENTS[2:3],
+        }))
+        listener.succeeded(_succeeded(2, {'n': 1, 'ok': 1}))
+    finally:
+        trace_factory.metadata_only = True
+
+    insert_many_event, insert_one_event = _events()
+    assert insert_many_event.resource['name'] == 'collection'
+    assert insert_many_event.resource['operation'] == 'insert_many'
+    assert insert_many_event.duration == 0.002
+    metadata = insert_many_event.resource['metadata']
+    assert metadata['DB URL'] == 'localhost:27017'
+    assert metadata['DB Name'] == 'db'
+    assert metadata['Collection Name'] == 'collection'
+    assert metadata['Items'] == DOCUMENTS[:2]
+    assert metadata['inserted_ids'] == ['0', '1']
+    assert metadata['inserted_count'] == 2
+    assert metadata['Reply Size'] > 0
+
+    assert insert_one_event.resource['operation'] == 'insert_one'
+    metadata = insert_one_event.resource['metadata']
+    assert metadata['Item'] == DOCUMENTS[2]
+    assert metadata['inserted_id'] == ['2']
+
+
+def test_update_and_delete_commands():
+    listener = CommandListener()
+    trace_factory.metadata_only = False
+    try:
+        listener.started(_started(1, 'update', {
+            'update': 'collection',
+            'updates': [{'q': {'_id': 1}, 'u': {'$set': {'value': 'x'}}}],
+        }))
+        listener.succeeded(_succeeded(1, {'n': 1, 'nModified': 1}))
+        listener.started(_started(2, 'update', {
+            'update': 'collection',
+            'updates': [{'q': {}, 'u': {'value': 'x'}, 'multi': True}],
+        }))
+        listener.succeeded(_succeeded(2, {'n': 3, 'nModified': 2}))
+        listener.started(_started(3, 'delete', {
+            'delete': 'collection',
+            'deletes': [{'q': {'value': 'x'}, 'limit': 0}],
+        }))
+        listener.succeeded(_succeeded(3, {'n': 2}))
+        listener.started(_started(4, 'delete', {
+            'delete': 'collection',
+            'deletes': [{'q': {'_id': 1}, 'limit': 1}] * 2,
+        }))
+        listener.succeeded(_succeeded(4, {'n': 2}))
+    finally:
+        trace_factory.metadata_only = True
+
+    events = _events()
+    assert [event.resource['operation'] for event in events] == [
+        'update_one', 'update_many', 'delete_many', 'bulk_write'
+    ]
+    metadata = events[0].resource['metadata']
+    assert metadata['Filter'] == {'_id': 1}
+    assert metadata['New Values'] == {'$set': {'value': 'x'}}
+    assert metadata['matched_count'] == 1
+    assert metadata['modified_count'] == 1
+    assert events[1].resource['metadata']['modified_count'] == 2
+    metadata = events[2].resource['metadata']
+    assert metadata['Filter'] == {'value': 'x'}
+    assert metadata['deleted_count'] == 2
+    assert events[3].resource['metadata']['Filter'] == [{'_id': 1}] * 2
+
+
+def test_find_with_get_more():
+    listener = CommandListener()
+    trace_factory.metadata_only = False
+    try:
+        listener.started(_started(1, 'find', {
+            'find': 'collection', 'filter': {'value': 'x'},
+        }))
+        listener.succeeded(_succeeded(1, {
+            'cursor': {'id': 5, 'firstBatch': DOCUMENTS[:4]},
+        }, duration_micros=3000))
+        listener.started(_started(2, 'getMore', {
+            'getMore': 5, 'collection': 'collection',
+        }))
+        listener.succeeded(_succeeded(2, {
+            'cursor': {'id': 0, 'nextBatch': DOCUMENTS[4:]},
+        }))
+    finally:
+        trace_factory.metadata_only = True
+
+    event, = _events()
+    assert event.resource['operation'] == 'find'
+    assert event.duration == 0.005
+    assert event.resource['metadata']['First Batch Duration'] == 0.003
+    metadata = event.resource['metadata']
+    assert metadata['Filter'] == {'value': 'x'}
+    assert metadata['Results Count'] == len(DOCUMENTS)
+    assert metadata['Results'] == DOCUMENTS[
+        :epsagon.constants.PYMONGO_MAX_RESULTS
+    ]
+    assert metadata['Batches'] == 2
+    # Estimated from the first document of each batch
+    assert metadata['Reply Size'] == (
+        4 * _document_size(DOCUMENTS[0]) + 16 * _document_size(DOCUMENTS[4])
+    )
+    assert not listener._cursors
+
+
+def test_metadata_only_and_ignored_commands():
+    listener = CommandListener()
+    listener.started(_started(1, 'hello', {'hello': 1}))
+    listener.succeeded(_succeeded(1, {'ok': 1}))
+    listener.started(_started(2, 'find', {
+        'find': 'collection', 'filter': {'value': 'x'},
+    }))
+    listener.succeeded(_succeeded(2, {
+        'cursor': {'id': 0, 'firstBatch': DOCUMENTS},
+    }))
+
+    event, = _events()
+    metadata = event.resource['metadata']
+    assert metadata['Filter'] is None
+    assert metadata['Results'] is None
+    assert metadata['Results Count'] == len(DOCUMENTS)
+
+
+def test_large_document_not_collected():
+    listener = CommandListener()
+    document = {
+        'value': 'x' * (epsagon.constants.PYMONGO_MAX_DOCUMENT_SIZE + 1)
+    }
+    trace_factory.metadata_only = False
+    try:
+        listener.started(_started(1, 'insert', {
+            'insert': 'collection', 'documents': [document],
+        }))
+        listener.succeeded(_succeeded(1, {'n': 1, 'ok': 1}))
+    finally:
+        trace_factory.metadata_only = True
+
+    event, = _events()
+    assert event.resource['metadata']['Item'].startswith(
+        'Document too large'
+    )
+
+
+def test_failed_command():
+    listener = CommandListener()
+    listener.started(_started(1, 'delete', {
+        'delete': 'collection', 'deletes': [],
+    }))
+    listener.failed(_failed(1, {'errmsg': 'not primary', 'code': 10107}))
+
+    event, = _events()
+    assert event.error_code == ErrorCode.ERROR
+    assert event.resource['metadata']['Error Message'] == 'not primary'
+    assert event.resource['metadata']['Error Code'] == 10107
+
+
+def test_events_aggregated_per_collection():
+    listener = CommandListener()
+    max_events = epsagon.constants.PYMONGO_MAX_EVENTS_PER_COLLECTION
+    for request_id in range(max_events + 5):
+        listener.started(_started(request_id, 'update', {
+            'update': 'collection', 'updates': [],
+        }))
+        listener.succeeded(_succeeded(request_id, {'n': 1, 'nModified': 1}))
+    listener.started(_started(-1, 'update', {
+        'update': 'other', 'updates': [],
+    }))
+    listener.succeeded(_succeeded(-1, {'n': 1, 'nModified': 1}))
+
+    trace = trace_factory.get_or_create_trace()
+    # The collection events, the other collection event and the aggregation
+    assert len(trace.events) == max_events + 2
+    aggregated_event, = trace.aggregated_events.values()
+    assert aggregated_event.resource['name'] == 'collection'
+
+
+def _find_with_get_more(listener, request_id, cursor_id):
+    listener.started(_started(request_id, 'find', {
+        'find': 'collection', 'filter': {'value': 'x'},
+    }))
+    listener.succeeded(_succeeded(request_id, {
+        'cursor': {'id': cursor_id, 'firstBatch': DOCUMENTS[:4]},
+    }))
+    listener.started(_started(-request_id, 'getMore', {
+        'getMore': cursor_id, 'collection': 'collection',
+    }))
+    listener.succeeded(_succeeded(-request_id, {
+        'cursor': {'id': 0, 'nextBatch': DOCUMENTS[4:]},
+    }))
+
+
+def test_get_more_of_aggregated_event():
+    listener = CommandListener()
+    trace = trace_factory.get_or_create_trace()
+    with mock.patch.object(trace, 'max_events_per_type', 1):
+        _find_with_get_more(listener, 1, 5)
+        _find_with_get_more(listener, 2, 6)
+
+    # The cursor of the aggregated find isn't tracked, its getMore is
+    # aggregated on its own.
+    find_event, aggregated_find, aggregated_get_more = trace.events
+    assert find_event.resource['metadata']['Batches'] == 2
+    assert aggregated_find.resource['operation'] == 'find'
+    assert aggregated_get_more.resource['operation'] == 'getMore'
+    assert not listener._cursors
+
+
+def test_get_more_of_sent_trace():
+    listener = CommandListener()
+    listener.started(_started(1, 'find', {
+        'find': 'collection', 'filter': {'value': 'x'},
+    }))
+    listener.succeeded(_succeeded(1, {
+        'cursor': {'id': 5, 'firstBatch': DOCUMENTS[:4]},
+    }))
+    event, = _events()
+
+    trace_factory.get_or_create_trace().clear_events()
+    with mock.patch.object(
+            trace_factory, 'get_trace', return_value=mock.MagicMock()
+    ):
+        listener.started(_started(2, 'getMore', {
+            'getMore': 5, 'collection': 'collection',
+        }))
+    listener.succeeded(_succeeded(2, {
+        'cursor': {'id': 0, 'nextBatch': DOCUMENTS[4:]},
+    }))
+
+    # The getMore gets its own event
+    get_more_event, = _events()
+    assert get_more_event is not event
+    assert get_more_event.resource['operation'] == 'getMore'
+    assert 'Batches' not in event.resource['metadata']
+    assert not listener._cursors
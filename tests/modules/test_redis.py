@@ -0,0 +1,47 @@
+import mock
+from epsagon.modules.redis import _multi_wrapper
+from epsagon.events.redis import MAX_CMD_PIPELINE
+from epsagon.trace import trace_factory
+
+
+def setup_function(func):
+    trace_factory.get_or_create_trace()
+
+
+def _pipeline(command_stack):
+    pipeline = mock.MagicMock(command_stack=command_stack)
+    pipeline.connection_pool.connection_kwargs = {
+        'host': 'localhost', 'port': 6379, 'db': 0
+    }
+    return pipeline
+
+
+def test_pipeline_snapshot():
+    command_stack = [
+        (('SET', 'key{}'.format(i), 'x' * 100), {}) for i in range(20)
+    ]
+    pipeline = _pipeline(command_stack)
+
+    def execute():
+        # The pipeline resets its command stack once executed
+        del command_stack[:]
+        return [True] * 20
+
+    assert _multi_wrapper(execute, pipeline, (), {}) == [True] * 20
+
+    event, = trace_factory.get_or_create_trace().events
+    metadata = event.resource['metadata']
+    assert event.resource['operation'] == 'Pipeline'
+    assert metadata['Stack Count'] == 20
+    assert metadata['Actions'] == [
+        'SET key{}'.format(i) for i in range(MAX_CMD_PIPELINE)
+    ]
+    assert metadata['Payload Size'] == 20 * (3 + 4 + 100) + 10 * 1
+
+
+def test_pipeline_snapshot_failsafe():
+    pipeline = _pipeline(None)
+    assert _multi_wrapper(lambda: 'result', pipeline, (), {}) == 'result'
+
+    event, = trace_factory.get_or_create_trace().events
+    assert event.resource['metadata']['Stack Count'] == 0
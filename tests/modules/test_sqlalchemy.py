@@ -1,9 +1,25 @@
+import sqlite3
+import pytest
 import epsagon.wrappers.python_function
 import epsagon.runners.python_function
 import epsagon.constants
+import epsagon.events.dbapi
+import epsagon.events.sqlalchemy
+import epsagon.modules.sqlalchemy
 import mock
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text, select, bindparam
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.sql import table, column
+from epsagon.common import ErrorCode
+from epsagon.events.dbapi import DBAPIEvent
+from epsagon.events.sqlalchemy import (
+    SqlAlchemyStatementEvent,
+    SqlAlchemyPoolEvent,
+)
+from epsagon.modules.db_wrapper import ConnectionWrapper
+from epsagon.trace import trace_factory
 
 
 DB_NAME = 'db'
@@ -33,3 +49,128 @@ def test_sanity(sqlalchemy_event_mock):
     init_instrumentation[1].bind.url.host = HOST_NAME
     close_instrumentation[1].bind.url.database = DB_NAME
     close_instrumentation[1].bind.url.host = HOST_NAME
+
+
+def _events():
+    return trace_factory.get_or_create_trace().events
+
+
+def _sqlite_engine(**kwargs):
+    epsagon.modules.sqlalchemy.patch()
+    engine = create_engine('sqlite://', **kwargs)
+    engine.execute('CREATE TABLE items (id INTEGER, name TEXT)')
+    trace_factory.get_or_create_trace().clear_events()
+    return engine
+
+
+def test_statement_events():
+    trace_factory.get_or_create_trace()
+    engine = _sqlite_engine()
+    with engine.connect() as connection:
+        connection.execute(
+            text('INSERT INTO items VALUES (:id, :name)'),
+            [{'id': 1, 'name': 'a'}, {'id': 2, 'name': 'b'}],
+        )
+        rows = connection.execute(
+            'SELECT * FROM items WHERE id > ?', 0
+        ).fetchall()
+        assert len(rows) == 2
+        with pytest.raises(OperationalError):
+            connection.execute('SELECT * FROM missing')
+
+    insert_event, select_event, error_event = [
+        event for event in _events()
+        if isinstance(event, SqlAlchemyStatementEvent)
+    ]
+    metadata = insert_event.resource['metadata']
+    assert insert_event.resource['operation'] == 'insert'
+    assert metadata['Driver'] == 'pysqlite'
+    assert metadata['Table Name'] == 'items'
+    assert metadata['Parameter Sets Count'] == 2
+    assert metadata['Related Rows Count'] == 2
+    assert select_event.resource['metadata']['Query Fingerprint'] == (
+        'SELECT * FROM items WHERE id > ?'
+    )
+    assert error_event.error_code == ErrorCode.EXCEPTION
+    assert error_event.resource['metadata']['Table Name'] == 'missing'
+
+
+def test_statement_analyzed_once_with_compiled_cache():
+    trace_factory.get_or_create_trace()
+    engine = _sqlite_engine()
+    items = table('items', column('id'), column('name'))
+    statement = select([items]).where(items.c.id == bindparam('id'))
+    with engine.connect() as connection:
+        connection = connection.execution_options(compiled_cache={})
+        with mock.patch(
+                'epsagon.events.sqlalchemy.analyze',
+                side_effect=epsagon.events.sqlalchemy.analyze,
+        ) as analyze_mock:
+            for index in range(3):
+                connection.execute(statement, id=index)
+
+    assert analyze_mock.call_count == 1
+    assert len([
+        event for event in _events()
+        if isinstance(event, SqlAlchemyStatementEvent)
+    ]) == 3
+
+
+def test_fetch_timing():
+    trace_factory.get_or_create_trace()
+    engine = _sqlite_engine()
+    engine.execute("INSERT INTO items VALUES (1, 'a'), (2, 'b')")
+    trace_factory.get_or_create_trace().clear_events()
+    with mock.patch.object(
+            epsagon.events.dbapi, 'DBAPI_FETCH_TIMING', True
+    ), mock.patch.object(
+            epsagon.modules.sqlalchemy, 'DBAPI_FETCH_TIMING', True
+    ):
+        with engine.connect() as connection:
+            result = connection.execute('SELECT name FROM items')
+            assert result.fetchone() == ('a',)
+            assert result.fetchall() == [('b',)]
+
+    event, = [
+        event for event in _events()
+        if isinstance(event, SqlAlchemyStatementEvent)
+    ]
+    metadata = event.resource['metadata']
+    assert metadata['Rows Fetched'] == 2
+    assert metadata['Fetched Bytes'] == 2
+    assert metadata['Fetch Duration'] > 0
+
+
+def test_instrumented_cursor_traced_once():
+    trace_factory.get_or_create_trace()
+    engine = _sqlite_engine(creator=lambda: ConnectionWrapper(
+        sqlite3.connect(':memory:'), (), {'database': 'db'}
+    ))
+    engine.execute('SELECT 1')
+
+    events = [
+        event for event in _events()
+        if not isinstance(event, SqlAlchemyPoolEvent)
+    ]
+    assert [type(event) for event in events] == [DBAPIEvent]
+
+
+def test_pool_event():
+    trace_factory.get_or_create_trace()
+    engine = _sqlite_engine(poolclass=QueuePool, pool_size=1, max_overflow=0)
+    for _ in range(3):
+        with engine.connect() as connection:
+            connection.execute('SELECT 1')
+
+    pool_event, = [
+        event for event in _events()
+        if isinstance(event, SqlAlchemyPoolEvent)
+    ]
+    metadata = pool_event.resource['metadata']
+    assert pool_event.resource['operation'] == 'checkout'
+    assert metadata['Pool Class'] == 'QueuePool'
+    assert metadata['Checkouts Count'] == 3
+    assert metadata['Checkins Count'] == 3
+    assert metadata['Pool Size'] == 1
+    assert metadata['Checked Out'] == 1
+    assert pool_event.duration >= metadata['Max Checkout Duration']
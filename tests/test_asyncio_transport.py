@@ -0,0 +1,192 @@
+import json
+import asyncio
+from epsagon.asyncio_transport import AsyncioBatchHTTPTransport
+
+
+OK_RESPONSE = b'HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok'
+
+
+class Collector(object):
+    """
+    A minimal HTTP collector, closes the connection after `max_requests`.
+    """
+
+    def __init__(self, max_requests=None, response=OK_RESPONSE):
+        self.max_requests = max_requests
+        self.response = response
+        self.requests = []
+        self.connections = 0
+        self.server = None
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        handled = 0
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            headers = {}
+            line = await reader.readline()
+            while line != b'\r\n':
+                name, _, value = line.decode().partition(':')
+                headers[name.lower()] = value.strip()
+                line = await reader.readline()
+            body = await reader.readexactly(int(headers['content-length']))
+            self.requests.append((request_line, headers, json.loads(body)))
+
+            handled += 1
+            writer.write(self.response)
+            await writer.drain()
+            if handled == self.max_requests:
+                break
+        writer.close()
+
+    async def start(self):
+        self.server = await asyncio.start_server(
+            self.handle, '127.0.0.1', 0
+        )
+        return 'http://127.0.0.1:{}/traces'.format(
+            self.server.sockets[0].getsockname()[1]
+        )
+
+
+def _run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def test_traces_sent_over_kept_alive_connection():
+    async def _test():
+        collector = Collector()
+        transport = AsyncioBatchHTTPTransport(
+            await collector.start(), 'token'
+        )
+        for index in range(5):
+            transport.send(None, json.dumps({'index': index}))
+        assert await transport.flush(timeout=5)
+        await transport.close()
+        collector.server.close()
+        return collector, transport
+
+    collector, transport = _run(_test())
+    assert [body for _, _, body in collector.requests] == [
+        {'index': index} for index in range(5)
+    ]
+    request_line, headers, _ = collector.requests[0]
+    assert request_line == b'POST /traces HTTP/1.1\r\n'
+    assert headers['host'] == '127.0.0.1:{}'.format(transport._port)
+    assert headers['authorization'] == 'Bearer token'
+    assert collector.connections == 1
+    assert transport.failed_traces == 0
+
+
+def test_host_header():
+    for dest, host in (
+            ('http://collector/traces', 'collector'),
+            ('http://collector:80/traces', 'collector'),
+            ('http://collector:8080/traces', 'collector:8080'),
+            ('https://collector:443/traces', 'collector'),
+            ('https://[::1]:8443/traces', '[::1]:8443'),
+    ):
+        head = AsyncioBatchHTTPTransport(dest, 'token')._request_head(b'')
+        assert 'Host: {}\r\n'.format(host).encode() in head
+
+
+def test_reconnect_after_connection_closed():
+    async def _test():
+        collector = Collector(max_requests=1)
+        transport = AsyncioBatchHTTPTransport(
+            await collector.start(), 'token'
+        )
+        for index in range(3):
+            transport.send(None, json.dumps({'index': index}))
+            assert await transport.flush(timeout=5)
+        await transport.close()
+        collector.server.close()
+        return collector, transport
+
+    collector, transport = _run(_test())
+    assert len(collector.requests) == 3
+    assert collector.connections == 3
+    assert transport.failed_traces == 0
+
+
+def test_queue_full_drops_traces():
+    async def _test():
+        collector = Collector()
+        transport = AsyncioBatchHTTPTransport(
+            await collector.start(), 'token', max_queue_size=2
+        )
+        # The sender task doesn't run until the caller yields
+        for index in range(5):
+            transport.send(None, json.dumps({'index': index}))
+        assert await transport.flush(timeout=5)
+        await transport.close()
+        collector.server.close()
+        return collector, transport
+
+    collector, transport = _run(_test())
+    assert transport.dropped_traces == 3
+    assert len(collector.requests) == 2
+
+
+def _send_traces(collector, count, delay=0):
+    async def _test():
+        transport = AsyncioBatchHTTPTransport(
+            await collector.start(), 'token'
+        )
+        for index in range(count):
+            transport.send(None, json.dumps({'index': index}))
+            assert await transport.flush(timeout=5)
+            await asyncio.sleep(delay)
+        await transport.close()
+        collector.server.close()
+        return transport
+
+    return _run(_test())
+
+
+def test_chunked_response():
+    collector = Collector(response=(
+        b'HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n'
+        b'2;ext=1\r\nok\r\n0\r\nTrailer: value\r\n\r\n'
+    ))
+    transport = _send_traces(collector, 3)
+    assert len(collector.requests) == 3
+    assert collector.connections == 1
+    assert transport.failed_traces == 0
+
+
+def test_interim_and_no_body_responses():
+    # No Content-Length, the connection is kept alive
+    collector = Collector(response=(
+        b'HTTP/1.1 100 Continue\r\n\r\n'
+        b'HTTP/1.1 204 No Content\r\n\r\n'
+    ))
+    transport = _send_traces(collector, 3)
+    assert len(collector.requests) == 3
+    assert collector.connections == 1
+    assert transport.failed_traces == 0
+
+
+def test_reuse_after_collector_closed_idle_connection():
+    # The collector closes the connection while it is idle, without a
+    # `Connection: close` header
+    collector = Collector(max_requests=1)
+    transport = _send_traces(collector, 3, delay=0.05)
+    assert len(collector.requests) == 3
+    assert collector.connections == 3
+    assert transport.failed_traces == 0
+
+
+def test_http_1_0_response_closes_connection():
+    collector = Collector(response=(
+        b'HTTP/1.0 200 OK\r\nContent-Length: 2\r\n\r\nok'
+    ))
+    transport = _send_traces(collector, 2)
+    assert len(collector.requests) == 2
+    assert collector.connections == 2
+    assert transport.failed_traces == 0
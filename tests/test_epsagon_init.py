@@ -83,6 +83,7 @@ default_http = HTTPTransport("epsagon", "1234")
     'EPSAGON_IGNORED_KEYS': '',
     'EPSAGON_ALLOWED_KEYS': '',
     'EPSAGON_LOG_TRANSPORT': 'FALSE',
+    'EPSAGON_ASYNC_TRANSPORT': 'FALSE',
     'EPSAGON_ENDPOINTS_TO_IGNORE': '',
     'EPSAGON_SPLIT_ON_SEND': 'FALSE',
     'EPSAGON_PROPAGATE_LAMBDA_ID': 'FALSE',
@@ -134,6 +135,7 @@ def test_epsagon_wrapper_env_init(_wrapped_get, wrapped_init, wrapped_create):
     'EPSAGON_STEPS_OUTPUT_PATH': '',
     'EPSAGON_ENDPOINTS_TO_IGNORE': '/health,/test',
     'EPSAGON_LOG_TRANSPORT': 'FALSE',
+    'EPSAGON_ASYNC_TRANSPORT': 'FALSE',
     'EPSAGON_SPLIT_ON_SEND': 'FALSE',
     'EPSAGON_PROPAGATE_LAMBDA_ID': 'FALSE',
     'EPSAGON_LOGGING_TRACING_ENABLED': 'TRUE',
@@ -0,0 +1,83 @@
+import json
+import mock
+import epsagon.constants
+import epsagon.http_capture
+import epsagon.key_filter
+from epsagon.trace import trace_factory
+
+
+def setup_function(func):
+    trace_factory.get_or_create_trace()
+
+
+def test_add_body_if_needed():
+    """
+    Validate HTTP bodies are truncated when captured.
+    :return: None
+    """
+    max_size = epsagon.constants.HTTP_MAX_FIELD_SIZE
+    metadata = {}
+    trace_factory.metadata_only = False
+    try:
+        epsagon.http_capture.add_body_if_needed(metadata, 'small', b'{"a": 1}')
+        epsagon.http_capture.add_body_if_needed(
+            metadata, 'large', bytearray(b'x' * (max_size * 10))
+        )
+        epsagon.http_capture.add_body_if_needed(metadata, 'parsed', {'a': 1})
+    finally:
+        trace_factory.metadata_only = True
+
+    assert metadata['small'] == b'{"a": 1}'
+    assert 'small_size' not in metadata
+    assert metadata['large'] == b'x' * max_size
+    assert metadata['large_size'] == max_size * 10
+    assert metadata['parsed'] == {'a': 1}
+
+    epsagon.http_capture.add_body_if_needed(metadata, 'small', b'{"a": 1}')
+    assert metadata['small'] is None
+
+
+def test_add_body_if_needed_ignored_keys():
+    """
+    Validate ignored keys are removed from a JSON body before it is
+    truncated.
+    :return: None
+    """
+    body = json.dumps({
+        'password': 'secret', 'data': 'x' * 4096,
+    }).encode('utf-8')
+    key_filter = epsagon.key_filter.KeyFilter(keys_to_ignore=['password'])
+    metadata = {}
+    trace_factory.metadata_only = False
+    try:
+        with mock.patch.object(trace_factory, 'key_filter', key_filter):
+            epsagon.http_capture.add_body_if_needed(metadata, 'body', body)
+    finally:
+        trace_factory.metadata_only = True
+
+    assert 'secret' not in metadata['body']
+    assert metadata['body'].startswith('{"data": "xxx')
+    assert len(metadata['body']) == epsagon.constants.HTTP_MAX_FIELD_SIZE
+    assert metadata['body_size'] == len(body)
+
+
+def test_add_headers_if_needed():
+    """
+    Validate HTTP header values are truncated when captured.
+    :return: None
+    """
+    max_size = epsagon.constants.HTTP_MAX_FIELD_SIZE
+    metadata = {}
+    trace_factory.metadata_only = False
+    try:
+        epsagon.http_capture.add_headers_if_needed(metadata, 'headers', {
+            'Cookie': 'x' * (max_size + 1),
+            'Content-Length': 3,
+        })
+    finally:
+        trace_factory.metadata_only = True
+
+    assert metadata['headers'] == {
+        'Cookie': 'x' * max_size,
+        'Content-Length': 3,
+    }
@@ -0,0 +1,66 @@
+import uuid
+import mock
+import epsagon.id_generator
+from epsagon.id_generator import (
+    RandomIdGenerator,
+    Uuid4IdGenerator,
+    set_id_generator,
+    generate_uuid,
+    generate_trace_id,
+    generate_span_id,
+)
+from epsagon.utils import get_epsagon_http_trace_id
+
+
+def test_generate_uuid():
+    ids = set()
+    for _ in range(1000):
+        generated_id = generate_uuid()
+        parsed = uuid.UUID(generated_id)
+        assert str(parsed) == generated_id
+        assert parsed.version == 4
+        assert parsed.variant == uuid.RFC_4122
+        ids.add(generated_id)
+    assert len(ids) == 1000
+
+
+def test_generate_trace_and_span_ids():
+    trace_id = generate_trace_id()
+    span_id = generate_span_id()
+    assert len(trace_id) == 32
+    assert len(span_id) == 16
+    int(trace_id, 16)
+    int(span_id, 16)
+
+
+def test_reseed_after_fork():
+    generator = RandomIdGenerator()
+    with mock.patch('os.getpid', return_value=1):
+        generator.generate_uuid()
+        parent_state = generator._getrandbits.__self__.getstate()
+    with mock.patch('os.getpid', return_value=2):
+        generator.generate_uuid()
+        assert generator._getrandbits.__self__.getstate() != parent_state
+
+
+def test_http_trace_id():
+    trace_id, span_id, parent_span_id, flags = (
+        get_epsagon_http_trace_id().split(':')
+    )
+    assert len(trace_id) == 32
+    assert len(span_id) == 16
+    assert len(parent_span_id) == 16
+    assert flags == '1'
+
+
+def test_set_id_generator():
+    generator = mock.MagicMock()
+    generator.generate_uuid.return_value = 'custom-id'
+    default_generator = epsagon.id_generator._id_generator
+    try:
+        set_id_generator(generator)
+        assert generate_uuid() == 'custom-id'
+        set_id_generator(Uuid4IdGenerator())
+        assert uuid.UUID(generate_uuid()).version == 4
+    finally:
+        set_id_generator(default_generator)
@@ -0,0 +1,67 @@
+""" Tests for key_filter.py """
+import json
+import mock
+from epsagon.key_filter import KeyFilter
+
+
+def test_ignored_keys_normalized():
+    key_filter = KeyFilter(keys_to_ignore=['Pass-Word'])
+    metadata = {'password': 1, 'pass_word': 2, 'PASS WORD': 3, 'user': 4}
+    assert key_filter.filter(metadata) == {'user': 4}
+    assert len(metadata) == 4
+
+
+def test_unfiltered_dict_not_copied():
+    key_filter = KeyFilter(keys_to_ignore=['password'])
+    metadata = {'a': {'b': 'c'}, 'd': '{"e": 1}'}
+    assert key_filter.filter(metadata) is metadata
+
+
+def test_nested_json_string():
+    key_filter = KeyFilter(keys_to_ignore=['password'])
+    body = json.dumps({'user': 'u', 'password': 'p'})
+    filtered = key_filter.filter({'body': '  ' + body, 'other': 'password'})
+    assert json.loads(filtered['body']) == {'user': 'u'}
+    assert filtered['other'] == 'password'
+
+
+def test_nested_json_bytes():
+    key_filter = KeyFilter(keys_to_ignore=['password'])
+    body = json.dumps({'user': 'u', 'password': 'p'}).encode('utf-8')
+    filtered = key_filter.filter({
+        'bytes': b'\n' + body,
+        'bytearray': bytearray(body),
+        'memoryview': memoryview(body),
+        'other': b'password',
+    })
+    for key in ('bytes', 'bytearray', 'memoryview'):
+        assert json.loads(filtered[key]) == {'user': 'u'}
+    assert filtered['other'] == b'password'
+
+
+def test_json_probing_skipped():
+    key_filter = KeyFilter(keys_to_ignore=['password'])
+    with mock.patch('json.loads') as loads_mock:
+        key_filter.filter({'a': 'text', 'b': '[{"password": 1}]', 'c': ''})
+    loads_mock.assert_not_called()
+
+
+def test_ignore_and_allow_single_walk():
+    key_filter = KeyFilter(keys_to_ignore=['secret'], keys_to_allow=['keep'])
+    metadata = {
+        'keep': {'secret': 1, 'a': 2},
+        'b': {'c': {'keep': '{"secret": 1, "d": 2}'}, 'e': 3},
+        'f': 'g',
+    }
+    filtered = key_filter.filter(metadata)
+    assert filtered['keep'] == {'a': 2}
+    assert json.loads(filtered['b']['c']['keep']) == {'d': 2}
+    assert set(filtered) == {'keep', 'b'}
+    assert set(filtered['b']) == {'c'}
+
+
+def test_empty_filter():
+    key_filter = KeyFilter()
+    metadata = {'a': 1}
+    assert not key_filter
+    assert key_filter.filter(metadata) is metadata
@@ -1,8 +1,10 @@
 import mock
+import pytest
 
 from epsagon.modules.botocore import _wrapper as _botocore_wrapper
 from epsagon.modules.requests import _wrapper as _request_wrapper
-from epsagon.modules.pymongo import _wrapper as _pymongo_wrapper
+from epsagon.modules.pymongo import CommandListener
+from epsagon.modules.general_wrapper import wrapper as general_wrapper
 from epsagon.trace import trace_factory
 
 EXCEPTION_MESSAGE = 'Test exception'
@@ -42,9 +44,9 @@ def test_request_wrapper_failsafe(_):
 @mock.patch('epsagon.events.pymongo.PyMongoEventFactory.create_event',
             side_effect=raise_exception)
 def test_pymongo_wrapper_failsafe(_):
-    """Validates that the pymongo wrapper is not raising any exception to
-    the user."""
-    _test(_pymongo_wrapper)
+    """Validates that the pymongo command listener is not raising any
+    exception to the user."""
+    _test(lambda *args: CommandListener().started(mock.MagicMock()))
 
 
 @mock.patch('epsagon.events.botocore.BotocoreEventFactory.create_event',
@@ -53,3 +55,28 @@ def test_botocore_wrapper_failsafe(_):
     """Validates that the botocore wrapper is not raising any exception to
     the user."""
     _test(_botocore_wrapper)
+
+
+@mock.patch('random.uniform', side_effect=lambda x, y: 0.5)
+def test_general_wrapper_skips_sampled_out_trace(_):
+    """Validates that no event is created for a trace dropped by sampling,
+    unless the instrumented call fails."""
+    trace = trace_factory.get_or_create_trace()
+    trace.sample_rate = 0.3
+    trace.prepare()
+    assert trace.sampled is False
+
+    factory = mock.MagicMock()
+    assert general_wrapper(
+        factory, lambda: 'response', None, [], {}
+    ) == 'response'
+    factory.create_event.assert_not_called()
+
+    with pytest.raises(EXCEPTION_TYPE):
+        general_wrapper(factory, raise_exception, None, [], {})
+    factory.create_event.assert_called_once()
+    assert trace.sampled
+
+    # The trace is kept from now on
+    general_wrapper(factory, lambda: 'response', None, [], {})
+    assert factory.create_event.call_count == 2
@@ -1,46 +1,53 @@
 import os
+import sys
 import mock
-import collections
-import importlib
-from imp import reload
 
 
 os.environ['DISABLE_EPSAGON_PATCH'] = 'TRUE'
 import epsagon.patcher
 
-@mock.patch('epsagon.patcher.import_module', side_effect=[True])
+
+@mock.patch('epsagon.patcher.import_module')
 @mock.patch('epsagon.modules')
-def test_patch_all(patched_modules, _):
+def test_patch_all_imported_module(patched_modules, patched_import):
     module_mock = mock.NonCallableMagicMock(patch=mock.MagicMock())
-    patched_modules.MODULES = {'test': module_mock}
+    patched_import.return_value = module_mock
+    patched_modules.MODULES = {'json': 'epsagon.modules.json'}
     epsagon.patcher.patch_all()
+    patched_import.assert_called_with('epsagon.modules.json')
     module_mock.patch.assert_called()
+    assert epsagon.patcher.get_patch_report()['json']['patched']
 
-@mock.patch('epsagon.patcher.import_module', side_effect=ImportError())
+
+@mock.patch('epsagon.patcher.import_module')
 @mock.patch('epsagon.modules')
-def test_patch_all_import_error(patched_modules, _,):
-    reload(importlib)
+def test_patch_all_on_import(patched_modules, patched_import, tmp_path):
+    module_name = 'epsagon_test_lazy_module'
     module_mock = mock.NonCallableMagicMock(patch=mock.MagicMock())
-    patched_modules.MODULES = {'test': module_mock}
+    patched_import.return_value = module_mock
+    patched_modules.MODULES = {module_name: 'epsagon.modules.test'}
     epsagon.patcher.patch_all()
+
+    # Not patched until the library is imported
     module_mock.patch.assert_not_called()
+    assert module_name not in epsagon.patcher.get_patch_report()
 
+    (tmp_path / '{}.py'.format(module_name)).write_text(u'')
+    sys.path.insert(0, str(tmp_path))
+    try:
+        __import__(module_name)
+    finally:
+        sys.path.remove(str(tmp_path))
+        sys.modules.pop(module_name, None)
+    module_mock.patch.assert_called_once()
+    assert epsagon.patcher.get_patch_report()[module_name]['patched']
 
-@mock.patch('epsagon.patcher.import_module')
-@mock.patch('epsagon.modules')
-def test_patch_all_import_ok_then_error(patched_modules, patched_import):
-    def import_side_effect():
-        yield 'True'
-        raise ImportError()
-
-    patched_import.side_effect = import_side_effect()
-    module1_mock = mock.NonCallableMagicMock(patch=mock.MagicMock())
-    module2_mock = mock.NonCallableMagicMock(patch=mock.MagicMock())
-    patched_modules.MODULES = collections.OrderedDict(
-        [('module1', module1_mock, ), ('module2', module2_mock,)]
-    )
 
+@mock.patch('epsagon.patcher.import_module', side_effect=ImportError())
+@mock.patch('epsagon.modules')
+def test_patch_all_import_error(patched_modules, _):
+    patched_modules.MODULES = {'base64': 'epsagon.modules.base64'}
     epsagon.patcher.patch_all()
-    module1_mock.patch.assert_called()
-    module2_mock.patch.assert_not_called()
-
+    report = epsagon.patcher.get_patch_report()['base64']
+    assert not report['patched']
+    assert 'error' in report
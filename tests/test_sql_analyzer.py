@@ -0,0 +1,74 @@
+""" Tests for sql_analyzer.py """
+import mock
+import epsagon.sql_analyzer
+from epsagon.sql_analyzer import analyze
+
+
+STATEMENTS = [
+    ('SELECT * FROM users WHERE id = 1', 'select', ('users',)),
+    ('insert into items(id, name) values (%s, %s)', 'insert', ('items',)),
+    ('UPDATE public.items SET name = ? WHERE id = ?', 'update',
+     ('public.items',)),
+    ('DELETE FROM ONLY items WHERE id IN (1, 2)', 'delete', ('items',)),
+    ('CREATE TABLE IF NOT EXISTS items (id int)', 'create', ('items',)),
+    (
+        'SELECT * FROM users u JOIN orders AS o ON u.id = o.uid '
+        'LEFT JOIN "Items" i ON i.id = o.iid',
+        'select',
+        ('users', 'orders', '"Items"'),
+    ),
+    ('SELECT * FROM a, b AS x, (SELECT * FROM c) s, d', 'select',
+     ('a', 'b', 'c', 'd')),
+    ('SELECT EXTRACT(YEAR FROM created) FROM events', 'select', ('events',)),
+    (
+        'WITH recent AS (SELECT * FROM orders), totals (n) AS (SELECT 1) '
+        'INSERT INTO archive SELECT * FROM recent',
+        'insert',
+        ('orders', 'archive'),
+    ),
+    ('COPY items (id, name) FROM STDIN', 'copy', ('items',)),
+    ('COPY (SELECT * FROM items) TO STDOUT', 'copy', ('items',)),
+    ('  ', '', ()),
+]
+
+
+def test_operation_and_tables():
+    for query, operation, tables in STATEMENTS:
+        statement = analyze(query)
+        assert statement.operation == operation
+        assert statement.tables == tables
+
+
+def test_fingerprint():
+    assert analyze(
+        "SELECT *  FROM t -- comment\n"
+        "WHERE a = 'it''s' AND b IN (1, 2.5, -3) AND c = %(c)s"
+    ).fingerprint == (
+        'SELECT * FROM t WHERE a = ? AND b IN (?) AND c = ?'
+    )
+    assert analyze(
+        "INSERT INTO t (a, b) VALUES (1, 'x'), (2, 'y')"
+    ).fingerprint == analyze(
+        'INSERT INTO t (a, b) VALUES ($1, $2)'
+    ).fingerprint == 'INSERT INTO t (a, b) VALUES (?)'
+
+
+def test_bytes_query():
+    assert analyze(b'SELECT * FROM t').tables == ('t',)
+
+
+def test_cache():
+    with mock.patch.object(epsagon.sql_analyzer, 'MAX_CACHED_STATEMENTS', 2):
+        epsagon.sql_analyzer._cache.clear()
+        first = analyze('SELECT 1')
+        with mock.patch(
+                'epsagon.sql_analyzer._analyze',
+                side_effect=epsagon.sql_analyzer._analyze
+        ) as analyze_mock:
+            assert analyze('SELECT 1') is first
+            assert not analyze_mock.called
+            analyze('SELECT 2')
+            analyze('SELECT 3')
+            analyze('SELECT 1')
+            assert analyze_mock.call_count == 3
+        assert len(epsagon.sql_analyzer._cache) == 2
@@ -7,6 +7,7 @@ import uuid
 import json
 import time
 import platform
+import threading
 from datetime import datetime
 import mock
 import pytest
@@ -28,6 +29,7 @@ from epsagon.trace import (
 )
 from epsagon.utils import get_tc_url
 from epsagon.common import ErrorCode
+from epsagon.event import BaseEvent
 from epsagon.trace_transports import HTTPTransport
 from .conftest import init_epsagon
 
@@ -320,6 +322,65 @@ def test_load_from_dict_with_exceptions():
             assert new_trace.exceptions == trace_data['exceptions']
 
 
+def test_thread_trace_lookup_without_lock():
+    trace_factory.switch_to_multiple_traces()
+    trace = trace_factory.get_or_create_trace()
+    assert trace_factory.traces[epsagon.trace.get_thread_id()] is trace
+
+    with mock.patch.object(
+        epsagon.trace.TraceFactory, 'LOCK'
+    ) as lock_mock:
+        assert trace_factory.get_or_create_trace() is trace
+        assert trace_factory.get_trace() is trace
+    lock_mock.__enter__.assert_not_called()
+
+    thread_traces = []
+    thread = threading.Thread(
+        target=lambda: thread_traces.append(
+            trace_factory.get_or_create_trace()
+        )
+    )
+    thread.start()
+    thread.join()
+    assert thread_traces[0] is not trace
+    assert len(trace_factory.traces) == 2
+
+
+def test_unique_id_trace_lookup_without_lock():
+    first_trace = trace_factory.get_or_create_trace(unique_id='first')
+    second_trace = trace_factory.get_or_create_trace(unique_id='second')
+    assert first_trace is not second_trace
+
+    with mock.patch.object(
+        epsagon.trace.TraceFactory, 'LOCK'
+    ) as lock_mock:
+        for _ in range(2):
+            assert trace_factory.get_or_create_trace('first') is first_trace
+            assert trace_factory.get_or_create_trace('second') is second_trace
+    lock_mock.__enter__.assert_not_called()
+
+
+def test_thread_local_unique_id():
+    unique_id = trace_factory.set_thread_local_unique_id('unique-id')
+    assert unique_id == 'unique-id'
+    trace = trace_factory.get_or_create_trace()
+    assert trace.unique_id == 'unique-id'
+
+    thread_unique_ids = []
+    thread = threading.Thread(
+        target=lambda: thread_unique_ids.append(
+            trace_factory.get_thread_local_unique_id()
+        )
+    )
+    thread.start()
+    thread.join()
+    assert thread_unique_ids == [None]
+
+    trace_factory.unset_thread_local_unique_id()
+    assert trace_factory.get_thread_local_unique_id() is None
+    assert trace_factory.get_thread_local_unique_id('other') == 'other'
+
+
 def test_add_event():
     event = EventMock()
     trace = trace_factory.get_or_create_trace()
@@ -331,6 +392,119 @@ def test_add_event():
         assert event.terminated
 
 
+def _create_event(resource_type, operation, duration, error=False):
+    event = BaseEvent(time.time())
+    event.resource['type'] = resource_type
+    event.resource['name'] = 'name'
+    event.resource['operation'] = operation
+    event.duration = duration
+    event.terminated = True
+    if error:
+        event.set_error()
+    return event
+
+
+def test_add_event_per_type_cap():
+    trace = trace_factory.get_or_create_trace()
+    trace.prepare()
+    trace.max_events_per_type = 2
+    trace.set_runner(RunnerEventMock())
+    for index in range(5):
+        trace.add_event(_create_event('redis', 'get', index, error=index == 4))
+    trace.add_event(_create_event('redis', 'set', 1))
+    trace.add_event(_create_event('dynamodb', 'get', 1))
+
+    events = trace.to_dict()['events']
+    # runner, 2 redis events, 2 aggregations and the dynamodb event
+    assert len(events) == 6
+    aggregated = [
+        event for event in events
+        if event['resource']['metadata'].get('aggregated')
+    ]
+    assert len(aggregated) == 2
+    get_aggregation, set_aggregation = aggregated
+    assert get_aggregation['resource']['operation'] == 'get'
+    assert get_aggregation['error_code'] == ErrorCode.ERROR
+    assert get_aggregation['resource']['metadata'] == {
+        'aggregated': True,
+        'count': 3,
+        'error_count': 1,
+        'total_duration': 2 + 3 + 4,
+        'min_duration': 2,
+        'max_duration': 4,
+    }
+    assert set_aggregation['resource']['operation'] == 'set'
+    assert set_aggregation['resource']['metadata']['count'] == 1
+
+
+def test_add_event_trace_cap():
+    trace = trace_factory.get_or_create_trace()
+    trace.prepare()
+    trace.max_events = 3
+    trace.set_runner(RunnerEventMock())
+    for resource_type in ('redis', 'dynamodb', 'sqs', 'sns', 'sns'):
+        trace.add_event(_create_event(resource_type, 'op', 1))
+
+    events = trace.to_dict()['events']
+    # runner, 3 events and the sns aggregation
+    assert len(events) == 5
+    assert events[-1]['resource']['type'] == 'sns'
+    assert events[-1]['resource']['metadata']['count'] == 2
+
+    # Caps are reset for a new invocation
+    trace.prepare()
+    trace.add_event(_create_event('redis', 'op', 1))
+    assert not trace.events[0].resource['metadata'].get('aggregated')
+
+
+def test_add_event_unterminated_not_aggregated():
+    trace = trace_factory.get_or_create_trace()
+    trace.prepare()
+    trace.max_events_per_type = 1
+    trace.add_event(_create_event('redis', 'get', 1))
+    event = BaseEvent(time.time())
+    event.resource['type'] = 'redis'
+    event.resource['operation'] = 'get'
+    trace.add_event(event, should_terminate=False)
+
+    # Kept as is, to be finished by the caller
+    assert trace.events[-1] is event
+    assert not trace.aggregated_events
+
+
+def test_event_to_dict():
+    event = BaseEvent(1.0)
+    assert event.to_dict() == {
+        'id': '',
+        'start_time': 1.0,
+        'duration': 0.0,
+        'origin': 'base',
+        'error_code': ErrorCode.OK,
+        'resource': {
+            'type': 'base',
+            'name': '',
+            'operation': '',
+            'metadata': {},
+        },
+    }
+    assert not hasattr(event, '__dict__')
+
+
+def test_event_id_generated_once():
+    class PrefixedEvent(BaseEvent):
+        __slots__ = ()
+        ID_PREFIX = 'prefixed-'
+
+    event = PrefixedEvent(time.time())
+    event_id = event.event_id
+    assert event_id.startswith('prefixed-')
+    uuid.UUID(event_id[len('prefixed-'):])
+    assert event.to_dict()['id'] == event_id
+
+    event.event_id = 'explicit'
+    assert event.to_dict()['id'] == 'explicit'
+
+
 def test_to_dict():
     trace = epsagon.trace.Trace()
     expected_dict = {
@@ -593,6 +767,46 @@ def test_send_traces_sanity(wrapped_post):
     )
 
 
+@mock.patch('urllib3.PoolManager.request')
+def test_send_traces_encodes_events_once(wrapped_post):
+    trace = trace_factory.get_or_create_trace()
+    runner = RunnerEventMock()
+    trace.set_runner(runner)
+    events = [EventMock() for _ in range(5)]
+    for event in events:
+        event.resource['metadata'] = {'headers': {'a': 'b'}}
+        trace.add_event(event)
+
+    with mock.patch.object(
+        EventMock,
+        'to_dict',
+        autospec=True,
+        side_effect=EventMock.to_dict,
+    ) as to_dict_mock:
+        trace_factory.send_traces()
+    assert to_dict_mock.call_count == len(events) + 1
+
+    wrapped_post.assert_called_with(
+        'POST',
+        'collector',
+        body=json.dumps(trace.to_dict()),
+        timeout=epsagon.constants.SEND_TIMEOUT,
+        retries=False,
+    )
+
+
+def test_send_traces_transport_gets_encoded_trace(trace_transport):
+    trace = trace_factory.get_or_create_trace()
+    runner = RunnerEventMock()
+    trace.set_runner(runner)
+    trace.add_event(EventMock())
+    trace_factory.send_traces()
+
+    sent_trace, encoded_trace = trace_transport.send.call_args[0]
+    assert sent_trace is trace
+    assert encoded_trace == json.dumps(trace.to_dict(), cls=TraceEncoder)
+
+
 @mock.patch('urllib3.PoolManager.request')
 def test_send_traces_unicode(wrapped_post):
     trace = trace_factory.get_or_create_trace()
@@ -1468,6 +1682,44 @@ def test_send_with_split_on_big_trace(wrapped_post, monkeypatch):
     assert wrapped_post.call_count == 3
 
 
+def test_send_with_split_encodes_events_once(trace_transport, monkeypatch):
+    monkeypatch.setenv('EPSAGON_MAX_TRACE_SIZE', '500')
+    trace = trace_factory.get_or_create_trace()
+    trace.set_runner(RunnerEventMock())
+    trace.split_on_send = True
+    events = [EventMock() for _ in range(100)]
+    for event in events:
+        trace.add_event(event)
+
+    fragments = []
+    trace_transport.send.side_effect = (
+        lambda trace, encoded_trace: fragments.append(
+            (json.loads(encoded_trace), [event for event in trace.events])
+        )
+    )
+    with mock.patch.object(
+        EventMock,
+        'to_dict',
+        autospec=True,
+        side_effect=EventMock.to_dict,
+    ) as to_dict_mock:
+        trace_factory.send_traces()
+
+    assert len(fragments) > 1
+    # Each event is encoded once, and the runner once more per fragment
+    assert to_dict_mock.call_count <= len(events) + 1 + 2 * len(fragments)
+
+    sent_events = []
+    for fragment_seq, (fragment, fragment_events) in enumerate(fragments, 1):
+        assert len(json.dumps(fragment)) <= 500
+        runner = fragment['events'][0]
+        assert runner['origin'] == 'runner'
+        assert runner['resource']['metadata']['fragment_seq'] == fragment_seq
+        assert fragment_events[0] is trace.runner
+        sent_events.extend(fragment_events[1:])
+    assert sent_events == events
+
+
 @mock.patch('urllib3.PoolManager.request')
 def test_send_with_split_on_small_trace(wrapped_post, monkeypatch):
     # Should be low enough to force trace split.
@@ -1554,6 +1806,47 @@ def test_send_with_sample_good_rate_with_error(wrapped_post, _):
     wrapped_post.assert_called_once()
 
 
+@mock.patch('random.uniform', side_effect=lambda x, y: 0.4)
+@mock.patch('urllib3.PoolManager.request')
+def test_sample_decision_on_prepare(wrapped_post, random_mock):
+    trace = trace_factory.get_or_create_trace()
+    trace.sample_rate = 0.3
+    trace.prepare()
+    assert trace.sampled is False
+    assert trace_factory.is_sampled_out()
+    trace.set_runner(RunnerEventMock())
+    trace.runner.error_code = ErrorCode.OK
+    trace.token = 'a'
+    trace_factory.send_traces()
+    wrapped_post.assert_not_called()
+    # The decision isn't made again on send
+    random_mock.assert_called_once()
+
+
+@mock.patch('random.uniform', side_effect=lambda x, y: 0.4)
+@mock.patch('urllib3.PoolManager.request')
+def test_sampled_out_trace_kept_on_error(wrapped_post, _):
+    trace = trace_factory.get_or_create_trace()
+    trace.sample_rate = 0.3
+    trace.prepare()
+    trace.set_runner(RunnerEventMock())
+    trace.token = 'a'
+    trace_factory.set_error(Exception('error'))
+    assert trace.sampled
+    assert not trace_factory.is_sampled_out()
+    trace_factory.send_traces()
+    wrapped_post.assert_called_once()
+
+
+@mock.patch('random.uniform')
+def test_no_sample_decision_on_full_sample_rate(random_mock):
+    trace = trace_factory.get_or_create_trace()
+    trace.sample_rate = 1
+    trace.prepare()
+    assert trace.sampled
+    random_mock.assert_not_called()
+
+
 @mock.patch('epsagon.utils.create_transport', side_effect=lambda x, y: default_http)
 @mock.patch('epsagon.trace.TraceFactory.initialize')
 def test_init_propagate_lambda_identifier_env(wrapped_init, _create, monkeypatch):
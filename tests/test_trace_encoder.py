@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+""" Tests for trace_encoder.py """
+import json
+import uuid
+from enum import Enum, IntEnum
+from collections import OrderedDict
+from datetime import datetime
+import mock
+import pytest
+import epsagon.trace_encoder
+from epsagon.trace_encoder import (
+    TraceEncoder,
+    to_json,
+    register_serializer,
+    SERIALIZERS,
+)
+
+TRACE = {
+    'events': [{
+        'id': 'id',
+        'start_time': 1.5,
+        'resource': {
+            'metadata': {
+                'tags': {'a', 'b'},
+                'date': datetime(2020, 1, 1),
+                'body': b'\xffbody',
+                'nested': [{'n': None, 'b': True}],
+            },
+        },
+    }],
+}
+
+
+class Color(Enum):
+    RED = 1
+
+
+class Size(IntEnum):
+    SMALL = 1
+
+
+class Point(object):
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+class Point3D(Point):
+    pass
+
+
+@pytest.fixture
+def point_serializer():
+    register_serializer(Point, lambda point: [point.x, point.y])
+    yield
+    SERIALIZERS.pop(Point)
+    epsagon.trace_encoder._SERIALIZERS_CACHE.clear()
+
+
+def test_non_json_types():
+    assert to_json({'a': Point(1, 2)}).startswith('{"a": "<')
+    decoded = json.loads(json.dumps(TRACE, cls=TraceEncoder))
+    metadata = decoded['events'][0]['resource']['metadata']
+    assert sorted(metadata['tags']) == ['a', 'b']
+    assert metadata['date'] == '2020-01-01T00:00:00'
+    assert metadata['body'] == 'body'
+    assert to_json(TRACE) == json.dumps(
+        TRACE, cls=TraceEncoder, ensure_ascii=True
+    )
+
+
+def test_registered_serializer(point_serializer):
+    assert to_json({'a': Point(1, 2), 'b': Point3D(3, 4)}) == (
+        '{"a": [1, 2], "b": [3, 4]}'
+    )
+
+
+def test_custom_default():
+    seen = []
+
+    def default(o):
+        seen.append(o)
+        return 'object'
+
+    assert to_json({'a': Point(1, 2), 'b': 1}, default=default) == (
+        '{"a": "object", "b": 1}'
+    )
+    assert len(seen) == 1
+
+
+@pytest.mark.skipif(
+    epsagon.trace_encoder.orjson is None, reason='orjson is not installed'
+)
+def test_orjson_backend():
+    with mock.patch(
+            'epsagon.trace_encoder._FAST_DUMPS',
+            epsagon.trace_encoder._orjson_dumps
+    ):
+        encoded = to_json(TRACE)
+        assert json.loads(encoded) == json.loads(
+            json.dumps(TRACE, cls=TraceEncoder)
+        )
+        # Falls back to `json` for non-ASCII and unsupported values
+        assert to_json({'a': u'ש'}) == '{"a": "\\u05e9"}'
+        assert to_json({'a': 2 ** 70}) == '{{"a": {}}}'.format(2 ** 70)
+
+
+def test_fast_backends_same_output():
+    traces = [
+        TRACE,
+        {'id': uuid.UUID(int=1)},
+        {'colors': [Color.RED, Size.SMALL]},
+        {'duration': float('nan')},
+        {'values': (1.5, float('-inf'))},
+        {'ordered': OrderedDict(a=float('inf'))},
+    ]
+
+    def _decoded(trace):
+        # Keeps NaN and infinity comparable
+        return json.loads(to_json(trace), parse_constant=str)
+
+    expected = [_decoded(trace) for trace in traces]
+    assert expected[3] == {'duration': 'NaN'}
+    assert expected[1] == {'id': repr(uuid.UUID(int=1))}
+    for name, dumps in (
+            ('orjson', epsagon.trace_encoder._orjson_dumps),
+            ('ujson', epsagon.trace_encoder._ujson_dumps),
+    ):
+        if getattr(epsagon.trace_encoder, name) is None:
+            continue
+        with mock.patch('epsagon.trace_encoder._FAST_DUMPS', dumps):
+            assert [_decoded(trace) for trace in traces] == expected
@@ -1,8 +1,17 @@
+import gzip
+import json
 import time
+import threading
+import mock
 import pytest
 import urllib3
-from epsagon.trace_transports import HTTPTransport
-from epsagon.trace import (trace_factory)
+import epsagon.trace_transports
+from epsagon.trace_transports import (
+    HTTPTransport,
+    BatchHTTPTransport,
+    to_json,
+)
+from epsagon.trace import trace_factory, create_transport
 
 
 def test_httptransport_sanity(httpserver):
@@ -28,3 +37,109 @@ def test_httptransport_timeout():
     # Making sure that an unreachable url will result in duration almost equal to the
     # timeout duration set
     assert http_transport.timeout < duration < http_transport.timeout + 0.3
+
+
+def test_batch_httptransport_sanity(httpserver):
+    collector_url = '/collector'
+    httpserver.expect_request(collector_url).respond_with_data("success")
+    http_transport = BatchHTTPTransport(
+        httpserver.url_for(collector_url),
+        'token'
+    )
+    trace = trace_factory.get_or_create_trace()
+    expected_trace = json.loads(to_json(trace.to_dict()))
+    for _ in range(3):
+        http_transport.send(trace)
+
+    assert http_transport.flush(timeout=5)
+    assert len(httpserver.log) == 3
+    request, _ = httpserver.log[0]
+    assert request.get_json() == expected_trace
+    assert request.headers['Authorization'] == 'Bearer token'
+
+
+def test_batch_httptransport_compression(httpserver):
+    collector_url = '/collector'
+    httpserver.expect_request(collector_url).respond_with_data("success")
+    http_transport = BatchHTTPTransport(
+        httpserver.url_for(collector_url),
+        'token',
+        compress=True
+    )
+    trace = trace_factory.get_or_create_trace()
+    expected_trace = json.loads(to_json(trace.to_dict()))
+    http_transport.send(trace)
+
+    assert http_transport.flush(timeout=5)
+    request, _ = httpserver.log[0]
+    assert request.headers['Content-Encoding'] == 'gzip'
+    assert (
+        json.loads(gzip.decompress(request.get_data()).decode('utf-8')) ==
+        expected_trace
+    )
+
+
+def test_batch_httptransport_does_not_block():
+    collector_unblocked = threading.Event()
+    http_transport = BatchHTTPTransport(
+        'http://collector',
+        'token',
+        max_queue_size=1,
+        max_batch_size=1
+    )
+    trace = trace_factory.get_or_create_trace()
+
+    with mock.patch.object(
+        http_transport.session,
+        'request',
+        side_effect=lambda *args, **kwargs: collector_unblocked.wait(),
+    ) as wrapped_post:
+        start_time = time.time()
+        for _ in range(5):
+            http_transport.send(trace)
+        assert time.time() - start_time < http_transport.timeout
+
+        # At most one trace is being sent and one is queued
+        assert http_transport.dropped_traces >= 3
+        assert not http_transport.flush(timeout=0.1)
+
+        collector_unblocked.set()
+        assert http_transport.flush(timeout=5)
+        assert wrapped_post.call_count == 5 - http_transport.dropped_traces
+
+
+def test_batch_transports_flushed_on_exit(httpserver):
+    collector_url = '/collector'
+    httpserver.expect_request(collector_url).respond_with_data("success")
+    idle_transport = BatchHTTPTransport(
+        httpserver.url_for(collector_url),
+        'token'
+    )
+    http_transport = BatchHTTPTransport(
+        httpserver.url_for(collector_url),
+        'token'
+    )
+    http_transport.send(trace_factory.get_or_create_trace())
+
+    # Only transports with a sender thread are flushed on exit
+    assert idle_transport not in epsagon.trace_transports._BATCH_TRANSPORTS
+    assert http_transport in epsagon.trace_transports._BATCH_TRANSPORTS
+    with mock.patch.object(
+            http_transport, 'flush', wraps=http_transport.flush
+    ) as flush:
+        epsagon.trace_transports._flush_batch_transports()
+    flush.assert_called_once_with()
+    assert len(httpserver.log) == 1
+
+
+def test_create_transport_async(monkeypatch):
+    monkeypatch.setenv('EPSAGON_ASYNC_TRANSPORT', 'TRUE')
+    assert isinstance(
+        create_transport('http://collector', 'token'),
+        BatchHTTPTransport
+    )
+    monkeypatch.delenv('EPSAGON_ASYNC_TRANSPORT')
+    assert not isinstance(
+        create_transport('http://collector', 'token'),
+        BatchHTTPTransport
+    )
@@ -1,10 +1,12 @@
 """
 FastAPI wrapper tests
 """
+import json
 import time
 import pytest
 import asynctest
 import asyncio
+import mock
 from typing import List
 from httpx import AsyncClient
 from pydantic import BaseModel
@@ -14,12 +16,14 @@ from fastapi.responses import JSONResponse
 from fastapi.encoders import jsonable_encoder
 from epsagon import trace_factory
 from epsagon.common import ErrorCode
+from epsagon.key_filter import KeyFilter
 from epsagon.runners.fastapi import FastapiRunner
 from epsagon.wrappers.fastapi import (
     DEFAULT_SUCCESS_STATUS_CODE,
     DEFAULT_ERROR_STATUS_CODE,
     _initialize_async_mode,
 )
+from epsagon.wrappers.asgi import RequestBodyCapture, ASYNCIO_TRANSPORTS
 from .common import multiple_threads_handler
 
 RETURN_VALUE = 'testresponsedata'
@@ -472,11 +476,101 @@ async def test_fastapi_given_request(trace_transport, fastapi_app):
         expected_response_data
     )
     assert runner.resource['metadata']['Query Params'] == { 'x': 'testval'}
+    assert json.loads(
+        runner.resource['metadata']['Request Data']
+    ) == TEST_POST_DATA
+    assert runner.resource['metadata']['Request Data Size'] == len(
+        json.dumps(TEST_POST_DATA)
+    )
     assert response_data == expected_response_data
     # validating no `zombie` traces exist
     assert not trace_factory.traces
 
 
+@pytest.mark.asyncio
+async def test_fastapi_request_body_ignored_keys(
+        trace_transport,
+        sync_fastapi_app
+):
+    """Ignored keys are removed from the captured request body."""
+    key_filter = KeyFilter(keys_to_ignore=['post_test'])
+    with mock.patch.object(trace_factory, 'key_filter', key_filter):
+        async with AsyncClient(
+                app=sync_fastapi_app,
+                base_url="http://test"
+        ) as ac:
+            await ac.post(REQUEST_OBJ_PATH, json=TEST_POST_DATA)
+    runner = trace_transport.last_trace.events[0]
+    assert json.loads(runner.resource['metadata']['Request Data']) == {}
+
+
+def test_partial_request_body_skipped_with_ignored_keys():
+    """A body prefix can't be filtered, so it is not collected."""
+    request = Request({
+        'type': 'http',
+        'method': 'POST',
+        'scheme': 'http',
+        'server': ('test', 80),
+        'client': ('127.0.0.1', 1234),
+        'root_path': '',
+        'path': REQUEST_OBJ_PATH,
+        'query_string': b'',
+        'headers': [],
+    })
+    runner = FastapiRunner(time.time(), request)
+    key_filter = KeyFilter(keys_to_ignore=['password'])
+    trace_factory.metadata_only = False
+    try:
+        with mock.patch.object(trace_factory, 'key_filter', key_filter):
+            runner.update_request_body(b'{"password": "sec', 100)
+        assert 'Request Data' not in runner.resource['metadata']
+
+        # Without ignored keys, the prefix is collected
+        runner.update_request_body(b'{"password": "sec', 100)
+    finally:
+        trace_factory.metadata_only = True
+    assert runner.resource['metadata']['Request Data'] == b'{"password": "sec'
+    assert runner.resource['metadata']['Request Data Size'] == 100
+
+
+@pytest.mark.asyncio
+async def test_request_body_capture_max_size():
+    """Only a prefix of a large body is kept."""
+    messages = [
+        {'type': 'http.request', 'body': b'a' * 10, 'more_body': True},
+        {'type': 'http.request', 'body': b'b' * 10, 'more_body': False},
+    ]
+
+    async def receive():
+        return messages.pop(0)
+
+    body_capture = RequestBodyCapture(receive, 15)
+    assert (await body_capture.receive())['body'] == b'a' * 10
+    assert (await body_capture.receive())['body'] == b'b' * 10
+    assert body_capture.body == b'a' * 10 + b'b' * 5
+    assert body_capture.size == 20
+
+
+@pytest.mark.asyncio
+async def test_shutdown_flushes_asyncio_transports(sync_fastapi_app):
+    """The queued traces are sent when the application shuts down."""
+    calls = []
+
+    class Transport(object):
+        async def flush(self):
+            calls.append('flush')
+
+        async def close(self):
+            calls.append('close')
+
+    ASYNCIO_TRANSPORTS[('collector', 'token')] = Transport()
+    try:
+        await sync_fastapi_app.router.shutdown()
+    finally:
+        ASYNCIO_TRANSPORTS.pop(('collector', 'token'))
+    assert calls == ['flush', 'close']
+
+
 @pytest.mark.asyncio
 @pytest.mark.parametrize(
     "fastapi_app",
@@ -0,0 +1,69 @@
+import time
+import mock
+import pytest
+import tornado.web
+import tornado.ioloop
+import tornado.testing
+import tornado.httpserver
+import tornado.httpclient
+from epsagon import trace_factory
+from epsagon.modules.tornado import TornadoWrapper
+from epsagon.trace_transports import HTTPTransport
+
+COLLECTOR_URL = 'https://collector.test'
+COLLECTOR_DELAY = 0.3
+REQUESTS_COUNT = 3
+
+
+class MainHandler(tornado.web.RequestHandler):
+    def get(self):
+        self.write('ok')
+
+
+@pytest.fixture
+def http_transport():
+    original_transport = trace_factory.transport
+    trace_factory.use_single_trace = False
+    trace_factory.transport = HTTPTransport(COLLECTOR_URL, 'token')
+    yield trace_factory.transport
+    trace_factory.transport = original_transport
+    TornadoWrapper.TRANSPORTS.clear()
+
+
+def _slow_collector(*args, **kwargs):
+    time.sleep(COLLECTOR_DELAY)
+
+
+@mock.patch('urllib3.PoolManager.request', side_effect=_slow_collector)
+def test_send_does_not_block_ioloop(request_mock, http_transport):
+    sock, port = tornado.testing.bind_unused_port()
+    io_loop = tornado.ioloop.IOLoop()
+    server = tornado.httpserver.HTTPServer(
+        tornado.web.Application([('/', MainHandler)])
+    )
+    server.add_sockets([sock])
+
+    async def fetch_all():
+        client = tornado.httpclient.AsyncHTTPClient()
+        for _ in range(REQUESTS_COUNT):
+            response = await client.fetch(
+                'http://127.0.0.1:{}/'.format(port)
+            )
+            assert response.body == b'ok'
+
+    start_time = time.time()
+    try:
+        io_loop.run_sync(fetch_all)
+    finally:
+        server.stop()
+        io_loop.close(all_fds=True)
+    # A blocking send would delay each request by the collector round-trip
+    assert time.time() - start_time < COLLECTOR_DELAY * REQUESTS_COUNT
+
+    background_transport, = TornadoWrapper.TRANSPORTS.values()
+    assert background_transport.flush(timeout=5)
+    collector_calls = [
+        call for call in request_mock.call_args_list
+        if call[0][1] == COLLECTOR_URL
+    ]
+    assert len(collector_calls) == REQUESTS_COUNT